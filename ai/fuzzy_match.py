@@ -1,4 +1,6 @@
-from rapidfuzz import process
+from app.core.features import lazy_import
+
+process = lazy_import("rapidfuzz.process")
 
 
 def find_best_customer_match(name, customer_list):
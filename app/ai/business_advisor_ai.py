@@ -1,28 +1,37 @@
 from database import get_db_connection
 
 
-def business_advisor():
+def business_advisor(username=None):
 
-    with get_db_connection() as conn:
+    # a username picks the tenant's shard, and its rows within it
+    tenant = "WHERE username=?" if username else ""
+    tenant_entries = "WHERE e.username=?" if username else ""
+    tenant_params = (username,) if username else ()
+
+    with get_db_connection(username=username) as conn:
 
         cursor = conn.cursor()
 
         # total sales
-        cursor.execute("SELECT SUM(total) as sales FROM invoices")
+        cursor.execute(
+            f"SELECT SUM(total) as sales FROM invoices {tenant}",
+            tenant_params
+        )
         sales = cursor.fetchone()["sales"]
 
         if not sales:
             sales = 0
 
         # risky customer
-        cursor.execute("""
+        cursor.execute(f"""
         SELECT c.name, SUM(e.amount) as balance
         FROM entries e
         JOIN customers c ON e.customer_id=c.id
+        {tenant_entries}
         GROUP BY c.name
         ORDER BY balance DESC
         LIMIT 1
-        """)
+        """, tenant_params)
 
         risky = cursor.fetchone()
 
@@ -1,22 +1,27 @@
 from database import get_db_connection
 
 
-def khata_ai(question: str):
+def khata_ai(question: str, username=None):
 
     q = question.lower()
 
+    # a username picks the tenant's shard, and its rows within it
+    tenant = " AND username=?" if username else ""
+    tenant_params = (username,) if username else ()
+
     # ===============================
     # TOTAL SALES
     # ===============================
 
     if "कुल बिक्री" in q or "total sale" in q:
 
-        with get_db_connection() as conn:
+        with get_db_connection(username=username) as conn:
 
             cursor = conn.cursor()
 
             cursor.execute(
-                "SELECT SUM(total) as total_sales FROM invoices"
+                f"SELECT SUM(total) as total_sales FROM invoices WHERE 1=1{tenant}",
+                tenant_params
             )
 
             row = cursor.fetchone()
@@ -37,20 +42,20 @@ def khata_ai(question: str):
 
             customer = words[0]
 
-            with get_db_connection() as conn:
+            with get_db_connection(username=username) as conn:
 
                 cursor = conn.cursor()
 
                 cursor.execute(
-                    """
+                    f"""
                     SELECT SUM(amount) as total
                     FROM entries
                     WHERE customer_id IN (
                         SELECT id FROM customers
-                        WHERE name LIKE ?
-                    )
+                        WHERE name LIKE ?{tenant}
+                    ){tenant}
                     """,
-                    (f"%{customer}%",)
+                    (f"%{customer}%", *tenant_params, *tenant_params)
                 )
 
                 row = cursor.fetchone()
@@ -1,11 +1,16 @@
 from app.core.database import get_connection
 
 
-def learn_product(username, product_name):
+def learn_product(username, product_name, conn=None):
+
+    # reuse the caller's connection (and transaction) when one is given
+    own_conn = conn is None
 
     try:
 
-        conn = get_connection()
+        if own_conn:
+            conn = get_connection()
+
         cursor = conn.cursor()
 
         # Check if product already exists
@@ -32,9 +37,14 @@ def learn_product(username, product_name):
                 (username, product_name, 1)
             )
 
-        conn.commit()
-        conn.close()
+        if own_conn:
+            conn.commit()
 
     except Exception as e:
 
         print("AI Learning Error:", e)
+
+    finally:
+
+        if own_conn and conn is not None:
+            conn.close()
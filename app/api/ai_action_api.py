@@ -1,7 +1,8 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
 import re
-from database import get_db_connection
+from database import get_db_connection, get_db_writer
+from app.repositories.entry_repository import insert_entry
 
 router = APIRouter()
 
@@ -33,7 +34,7 @@ def ai_execute(data: AIAction):
     amount = detect_amount(command)
     customer_name = detect_customer(command)
 
-    with get_db_connection() as conn:
+    with get_db_connection(username=data.username) as conn:
         cursor = conn.cursor()
 
         cursor.execute("""
@@ -43,28 +44,26 @@ def ai_execute(data: AIAction):
 
         customer = cursor.fetchone()
 
-        if not customer:
-            return {"error": "customer not found"}
-
-        customer_id = customer["id"]
-
-        if "udhar" in command or "credit" in command:
-
-            cursor.execute("""
-            INSERT INTO entries (username, customer_id, type, amount, note)
-            VALUES (?, ?, ?, ?, ?)
-            """, (
-                data.username,
-                customer_id,
-                "credit",
-                amount,
-                "AI auto action"
-            ))
-
-            return {
-                "status": "ledger updated",
-                "customer": customer_name,
-                "amount": amount
-            }
+    if not customer:
+        return {"error": "customer not found"}
+
+    customer_id = customer["id"]
+
+    if "udhar" in command or "credit" in command:
+
+        get_db_writer(data.username).execute(
+            insert_entry,
+            data.username,
+            customer_id,
+            "credit",
+            amount,
+            "AI auto action"
+        )
+
+        return {
+            "status": "ledger updated",
+            "customer": customer_name,
+            "amount": amount
+        }
 
     return {"message": "command processed"}
@@ -7,16 +7,16 @@ router = APIRouter()
 @router.get("/ai/learning/update")
 def update_learning(username: str):
 
-    with get_db_connection() as conn:
+    with get_db_connection(username=username) as conn:
         cursor = conn.cursor()
 
         # customer credit/debit behaviour
         cursor.execute("""
         SELECT c.name,
-               SUM(CASE WHEN e.type='credit' THEN e.amount ELSE 0 END) AS credit_total,
-               SUM(CASE WHEN e.type='debit' THEN e.amount ELSE 0 END) AS debit_total
+               SUM(b.credit_total) AS credit_total,
+               SUM(b.debit_total) AS debit_total
         FROM customers c
-        LEFT JOIN entries e ON c.id = e.customer_id
+        LEFT JOIN customer_balances b ON c.id = b.customer_id
         WHERE c.username=?
         GROUP BY c.id
         """, (username,))
@@ -1,18 +1,24 @@
 from fastapi import APIRouter, UploadFile, File
-import speech_recognition as sr
+from fastapi.concurrency import run_in_threadpool
 import tempfile
 import shutil
-import requests
+
+from app.core.features import lazy_import
+
+sr = lazy_import("speech_recognition")
+requests = lazy_import("requests")
 
 router = APIRouter()
 
 
-@router.post("/ai/voice-command")
-async def voice_command(file: UploadFile = File(...)):
+def recognize_upload(upload):
+    """
+    Save + recognise the upload. Blocking; called via run_in_threadpool.
+    """
 
     # save audio temporarily
     with tempfile.NamedTemporaryFile(delete=False) as tmp:
-        shutil.copyfileobj(file.file, tmp)
+        shutil.copyfileobj(upload, tmp)
         temp_audio = tmp.name
 
     recognizer = sr.Recognizer()
@@ -21,9 +27,12 @@ async def voice_command(file: UploadFile = File(...)):
         audio = recognizer.record(source)
 
     try:
-        text = recognizer.recognize_google(audio)
+        return recognizer.recognize_google(audio)
     except:
-        return {"error": "voice not understood"}
+        return None
+
+
+def call_ai_execute(text):
 
     # call AI command engine
     response = requests.post(
@@ -34,7 +43,21 @@ async def voice_command(file: UploadFile = File(...)):
         }
     )
 
+    return response.json()
+
+
+@router.post("/ai/voice-command")
+async def voice_command(file: UploadFile = File(...)):
+
+    text = await run_in_threadpool(recognize_upload, file.file)
+
+    if text is None:
+        return {"error": "voice not understood"}
+
+    # a blocking call back into this same server must not hold the loop
+    ai_result = await run_in_threadpool(call_ai_execute, text)
+
     return {
         "voice_text": text,
-        "ai_result": response.json()
+        "ai_result": ai_result
     }
@@ -1,7 +1,8 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
 from typing import List
-from database import get_db_connection
+from database import get_db_writer
+from app.repositories.entry_repository import insert_entry
 
 router = APIRouter()
 
@@ -41,19 +42,14 @@ def create_bill(data: BillRequest):
     total = subtotal + gst_amount
 
     # Save in ledger
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-
-        cursor.execute("""
-        INSERT INTO entries (username, customer_id, type, amount, note)
-        VALUES (?, ?, ?, ?, ?)
-        """, (
-            data.username,
-            data.customer_id,
-            "credit",
-            total,
-            "Bill generated"
-        ))
+    get_db_writer(data.username).execute(
+        insert_entry,
+        data.username,
+        data.customer_id,
+        "credit",
+        total,
+        "Bill generated"
+    )
 
     return {
         "subtotal": subtotal,
@@ -1,6 +1,8 @@
 from fastapi import APIRouter
-from database import get_db_connection
+from typing import Optional
+from database import get_db_connection, tenant_required
 from app.ai.business_advisor_ai import business_advisor
+from app.core.response import tenant_required_response
 
 router = APIRouter()
 
@@ -8,35 +10,30 @@ router = APIRouter()
 @router.get("/ai/business-insights")
 def business_insights(username: str):
 
-    with get_db_connection() as conn:
+    with get_db_connection(username=username) as conn:
         cursor = conn.cursor()
 
-        # total outstanding
+        # total outstanding (from the customer_balances projection)
         cursor.execute("""
-        SELECT SUM(amount) as total_credit
-        FROM entries
-        WHERE username=? AND type='credit'
+        SELECT SUM(credit_total) as total_credit,
+               SUM(debit_total) as total_debit
+        FROM customer_balances
+        WHERE username=?
         """, (username,))
 
-        credit = cursor.fetchone()["total_credit"] or 0
+        totals = cursor.fetchone()
 
-        cursor.execute("""
-        SELECT SUM(amount) as total_debit
-        FROM entries
-        WHERE username=? AND type='debit'
-        """, (username,))
-
-        debit = cursor.fetchone()["total_debit"] or 0
+        credit = totals["total_credit"] or 0
+        debit = totals["total_debit"] or 0
 
         outstanding = credit - debit
 
         # top customers
         cursor.execute("""
-        SELECT c.name, SUM(e.amount) as total
-        FROM entries e
-        JOIN customers c ON e.customer_id = c.id
-        WHERE e.username=? AND e.type='credit'
-        GROUP BY e.customer_id
+        SELECT c.name, b.credit_total as total
+        FROM customer_balances b
+        JOIN customers c ON b.customer_id = c.id
+        WHERE b.username=? AND b.credit_total <> 0
         ORDER BY total DESC
         LIMIT 5
         """, (username,))
@@ -56,5 +53,9 @@ def business_insights(username: str):
     }
 
 @router.get("/ai/business/advisor")
-def advisor():
-    return business_advisor()
+def advisor(username: Optional[str] = None):
+
+    if tenant_required(username):
+        return tenant_required_response()
+
+    return business_advisor(username)
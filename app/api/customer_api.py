@@ -1,4 +1,7 @@
 from fastapi import APIRouter
+from typing import Optional
+from app.core.response import success_response, error_response
+from app.core.pagination import InvalidCursor, PAGE_SIZE_DEFAULT
 from app.repositories.customer_repository import (
     create_customer,
     get_customers,
@@ -14,10 +17,21 @@ def add_customer(username: str, name: str, phone: str = None, address: str = Non
 
 
 @router.get("/customer/list")
-def customer_list(username: str):
-    return get_customers(username)
+def customer_list(username: str, cursor: Optional[str] = None, limit: int = PAGE_SIZE_DEFAULT):
+
+    try:
+        rows, next_cursor = get_customers(username, cursor, limit)
+    except InvalidCursor as e:
+        return error_response(message="Invalid cursor", error=str(e))
+
+    return success_response(
+        data=rows,
+        message="Customers fetched successfully",
+        count=len(rows),
+        next_cursor=next_cursor
+    )
 
 
 @router.delete("/customer/delete/{customer_id}")
-def remove_customer(customer_id: int):
-    return delete_customer(customer_id)
+def remove_customer(customer_id: int, username: Optional[str] = None):
+    return delete_customer(customer_id, username)
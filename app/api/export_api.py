@@ -0,0 +1,221 @@
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from datetime import date, timedelta
+import csv
+import io
+import json
+import zlib
+
+from database import get_db_connection
+from app.core.response import error_response
+
+router = APIRouter()
+
+
+FETCH_SIZE = 500
+
+EXPORT_TABLES = ["entries", "customers", "invoices"]
+
+
+# =========================
+# FILTERS
+# =========================
+
+def plain_date(value):
+    """
+    `value` as a date when it is only a YYYY-MM-DD date, else None.
+    """
+
+    if len(value) != 10:
+        return None
+
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def build_query(table, username, date_from=None, date_to=None, customer_id=None):
+
+    where = ["username=?"]
+    params = [username]
+
+    if date_from:
+        where.append("created_at >= ?")
+        params.append(date_from)
+
+    if date_to:
+
+        day = plain_date(date_to)
+
+        if day:
+            # created_at carries a time: a bare date means up to the end of that day
+            where.append("created_at < ?")
+            params.append((day + timedelta(days=1)).isoformat())
+        else:
+            where.append("created_at <= ?")
+            params.append(date_to)
+
+    if customer_id is not None:
+
+        if table == "entries":
+            where.append("customer_id=?")
+
+        elif table == "customers":
+            where.append("id=?")
+
+        else:
+            # invoices store the customer's name, not its id
+            where.append("customer IN (SELECT name FROM customers WHERE id=?)")
+
+        params.append(customer_id)
+
+    sql = f"SELECT * FROM {table} WHERE {' AND '.join(where)} ORDER BY id"
+
+    return sql, params
+
+
+# =========================
+# ROW STREAMS
+# =========================
+
+def iter_rows(conn, table, sql, params):
+    """
+    Walk a sqlite cursor in FETCH_SIZE batches; never materialises the
+    whole result set.
+    """
+
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+
+    columns = [col[0] for col in cursor.description]
+
+    while True:
+
+        rows = cursor.fetchmany(FETCH_SIZE)
+
+        if not rows:
+            break
+
+        yield columns, rows
+
+
+def ndjson_chunks(conn, queries):
+
+    for table, sql, params in queries:
+
+        for columns, rows in iter_rows(conn, table, sql, params):
+
+            lines = []
+
+            for row in rows:
+                record = dict(zip(columns, row))
+                record["_table"] = table
+                lines.append(json.dumps(record, ensure_ascii=False, default=str))
+
+            yield ("\n".join(lines) + "\n").encode()
+
+
+def csv_chunks(conn, queries):
+
+    table, sql, params = queries[0]
+
+    header_sent = False
+
+    for columns, rows in iter_rows(conn, table, sql, params):
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        if not header_sent:
+            writer.writerow(columns)
+            header_sent = True
+
+        writer.writerows(rows)
+
+        yield buffer.getvalue().encode()
+
+
+def gzip_chunks(chunks):
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    for chunk in chunks:
+
+        data = compressor.compress(chunk)
+
+        if data:
+            yield data
+
+    yield compressor.flush()
+
+
+def export_stream(username, queries, fmt, gzip):
+
+    # held for the whole download, across threadpool hops
+    conn = get_db_connection(reentrant=False, username=username)
+
+    try:
+        chunks = ndjson_chunks(conn, queries) if fmt == "ndjson" else csv_chunks(conn, queries)
+
+        if gzip:
+            chunks = gzip_chunks(chunks)
+
+        yield from chunks
+
+    finally:
+        conn.close()
+
+
+# =========================
+# EXPORT ENDPOINT
+# =========================
+
+@router.get("/export/ledger")
+def export_ledger(
+    username: str,
+    format: str = "ndjson",
+    tables: str = "entries,customers,invoices",
+    gzip: bool = False,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    customer_id: Optional[int] = None
+):
+
+    selected = [t.strip() for t in tables.split(",") if t.strip()]
+
+    if not selected or any(t not in EXPORT_TABLES for t in selected):
+        return error_response(
+            message="Invalid tables",
+            error=f"choose from {', '.join(EXPORT_TABLES)}"
+        )
+
+    if format not in ("ndjson", "csv"):
+        return error_response(message="Invalid format", error="use ndjson or csv")
+
+    if format == "csv" and len(selected) != 1:
+        return error_response(message="CSV export takes exactly one table")
+
+    queries = []
+
+    for table in selected:
+        sql, params = build_query(table, username, date_from, date_to, customer_id)
+        queries.append((table, sql, params))
+
+    if format == "ndjson":
+        media_type = "application/x-ndjson"
+        filename = f"{username}-ledger.ndjson"
+    else:
+        media_type = "text/csv"
+        filename = f"{username}-{selected[0]}.csv"
+
+    if gzip:
+        media_type = "application/gzip"
+        filename += ".gz"
+
+    return StreamingResponse(
+        export_stream(username, queries, format, gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -1,32 +1,93 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from pydantic import BaseModel
-from fastapi.responses import FileResponse
-from typing import List
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from email.utils import formatdate, parsedate_to_datetime
+from typing import List, Optional
+from concurrent.futures.process import BrokenProcessPool
+import asyncio
+import io
+import json
 import os
+import time
+import zipfile
 
-from app.services.invoice_service import generate_invoice
+from app.services.invoice_service import (
+    create_invoice_batch,
+    create_invoice_record,
+    load_business_settings,
+    prepare_invoice,
+    download_path,
+    invoice_owner,
+    invoice_pdf,
+    invoice_cache,
+    load_invoice,
+    resolve_invoice_pdf
+)
+from app.services.invoice_cache import invoice_key
+from app.services.invoice_jobs import (
+    INVOICE_RENDER_MAX_PENDING,
+    RenderQueueFull,
+    job_status,
+    jobs_stats,
+    render_bytes,
+    render_queue_full,
+    render_slots,
+    retry_after,
+    submit_render
+)
+from app.services.invoice_numbers import invoice_numbers
+from app.core.pagination import fetch_page, InvalidCursor, PAGE_SIZE_DEFAULT
+from app.core.response import busy_response, success_response, error_response
+from database import get_db_connection
 
 router = APIRouter()
 
 
+# longest a client may block on ?wait=
+INVOICE_WAIT_MAX = 30
+
+INVOICE_BATCH_MAX = int(os.environ.get("INVOICE_BATCH_MAX", "200"))
+
+# issued invoices never change, so clients may reuse a copy for a while
+INVOICE_DOWNLOAD_MAX_AGE = int(os.environ.get("INVOICE_DOWNLOAD_MAX_AGE", "3600"))
+
+
 class Item(BaseModel):
     name: str
     qty: float
     price: float
 
 
-class InvoiceRequest(BaseModel):
+class InvoiceSpec(BaseModel):
     customer_name: str
     note: str = ""
     items: List[Item]
-    template: str = "1"
+    template: Optional[str] = None   # default: business_settings.default_template
     apply_gst: bool = False   # GST optional (OKCredit style)
 
 
+class InvoiceRequest(InvoiceSpec):
+    username: str = "default"
+
+
+class BatchInvoiceRequest(BaseModel):
+    username: str = "default"
+    invoices: List[InvoiceSpec]
+
+
 @router.post("/invoice/create")
-def create_invoice(data: InvoiceRequest):
+def create_invoice(data: InvoiceRequest, wait: float = 0):
+
+    # refuse before storing anything rather than pile up renders
+    if render_queue_full():
+        return busy_response(
+            message="Invoice renderer busy",
+            error=f"{INVOICE_RENDER_MAX_PENDING} invoices already waiting, retry shortly",
+            retry_after=retry_after()
+        )
 
-    invoice = generate_invoice(
+    invoice, items, settings = create_invoice_record(
+        username=data.username,
         customer_name=data.customer_name,
         items=[item.dict() for item in data.items],
         note=data.note,
@@ -34,23 +95,371 @@ def create_invoice(data: InvoiceRequest):
         apply_gst=data.apply_gst
     )
 
+    invoice_id = invoice["invoice_id"]
+
+    try:
+        submit_render(invoice, items, settings)
+        job = job_status(invoice_key(data.username, invoice_id), wait=min(wait, INVOICE_WAIT_MAX))
+
+    except RenderQueueFull:
+        # stored already; the first download renders it
+        job = {"invoice_id": invoice_id, "state": "deferred", "error": None, "render_ms": None}
+
+    return {
+        "status": "success",
+        "invoice_id": invoice_id,
+        "file_path": download_path(data.username, invoice_id),
+        "job": job
+    }
+
+
+# =========================
+# BATCH INVOICES
+# =========================
+
+class _ZipBuffer:
+    """
+    Write-only sink for zipfile; the streamed response drains it after
+    every member, so only one PDF is ever held in memory.
+    """
+
+    def __init__(self):
+        self._buffer = io.BytesIO()
+
+    def write(self, data):
+        return self._buffer.write(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+
+def zip_stream(manifest, username):
+
+    sink = _ZipBuffer()
+
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as archive:
+
+        for entry in manifest:
+
+            invoice_id = entry["invoice_id"]
+
+            job_status(invoice_key(username, invoice_id), wait=INVOICE_WAIT_MAX)
+
+            # a failed or evicted render is redrawn here
+            path = invoice_pdf(invoice_id, username)
+
+            archive.write(path, f"{invoice_id}.pdf")
+
+            yield sink.drain()
+
+        archive.writestr("manifest.json", json.dumps(manifest, indent=2))
+
+    yield sink.drain()
+
+
+@router.post("/invoice/batch")
+def create_invoices_batch(data: BatchInvoiceRequest, zip: bool = False):
+
+    if not data.invoices:
+        return error_response(message="No invoices to create")
+
+    if len(data.invoices) > INVOICE_BATCH_MAX:
+        return error_response(
+            message="Too many invoices",
+            error=f"at most {INVOICE_BATCH_MAX} invoices per request"
+        )
+
+    empty = [n for n, spec in enumerate(data.invoices) if not spec.items]
+
+    if empty:
+        return error_response(
+            message="Invoice items missing",
+            error=f"invoices at positions {empty} have no items"
+        )
+
+    if len(data.invoices) > render_slots():
+        return busy_response(
+            message="Invoice renderer busy",
+            error=f"{render_slots()} render slots free, retry shortly",
+            retry_after=retry_after()
+        )
+
+    started = time.perf_counter()
+
+    created = create_invoice_batch(
+        data.username,
+        [
+            {**spec.dict(), "items": [item.dict() for item in spec.items]}
+            for spec in data.invoices
+        ]
+    )
+
+    manifest = []
+
+    for invoice, items, settings in created:
+
+        try:
+            submit_render(invoice, items, settings)
+            state = "queued"
+        except RenderQueueFull:
+            state = "deferred"
+
+        manifest.append({
+            "invoice_id": invoice["invoice_id"],
+            "customer": invoice["customer"],
+            "total": invoice["total"],
+            "file_path": download_path(data.username, invoice["invoice_id"]),
+            "state": state
+        })
+
+    if zip:
+        return StreamingResponse(
+            zip_stream(manifest, data.username),
+            media_type="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="{data.username}-invoices.zip"'}
+        )
+
     return {
         "status": "success",
-        "invoice_id": invoice["invoice_id"],
-        "file_path": invoice["file_path"]
+        "count": len(manifest),
+        "stored_ms": round((time.perf_counter() - started) * 1000, 1),
+        "invoices": manifest
     }
 
 
+# =========================
+# LIST
+# =========================
+
+@router.get("/invoice/list")
+def list_invoices(
+    username: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = PAGE_SIZE_DEFAULT
+):
+
+    if username:
+        where, params = "username=?", (username,)
+    else:
+        where, params = "1=1", ()
+
+    try:
+        with get_db_connection(username=username) as conn:
+
+            rows, next_cursor = fetch_page(
+                conn.cursor(),
+                "invoices",
+                where,
+                params,
+                page_cursor=cursor,
+                limit=limit
+            )
+
+    except InvalidCursor as e:
+        return error_response(message="Invalid cursor", error=str(e))
+
+    return success_response(
+        data=rows,
+        message="Invoices fetched successfully",
+        count=len(rows),
+        next_cursor=next_cursor
+    )
+
+
+# =========================
+# IN-MEMORY RENDER
+# =========================
+
+@router.post("/invoice/render")
+async def render_invoice_pdf(data: InvoiceRequest, persist: bool = False):
+    """
+    Render straight to the response body; nothing touches the disk.
+    With persist=true the invoice rows are stored first (so the same PDF
+    can be downloaded later), otherwise this is a draft preview.
+    """
+
+    if not data.items:
+        return error_response(message="Invoice items missing")
+
+    # refuse before storing anything, as /invoice/create does
+    if render_queue_full():
+        return busy_response(
+            message="Invoice renderer busy",
+            error=f"{INVOICE_RENDER_MAX_PENDING} invoices already waiting, retry shortly",
+            retry_after=retry_after()
+        )
+
+    items = [item.dict() for item in data.items]
+
+    if persist:
+
+        invoice, stored_items, settings = await asyncio.to_thread(
+            create_invoice_record,
+            username=data.username,
+            customer_name=data.customer_name,
+            items=items,
+            note=data.note,
+            template=data.template,
+            apply_gst=data.apply_gst
+        )
+
+    else:
+
+        invoice = prepare_invoice(
+            f"DRAFT-{int(time.time())}",
+            data.customer_name,
+            items,
+            template=data.template,
+            apply_gst=data.apply_gst,
+            note=data.note
+        )
+        stored_items = invoice.pop("items")
+        settings = await asyncio.to_thread(load_business_settings, data.username)
+
+    # rendered on the invoice pool, off the event loop and the GIL
+    try:
+        pdf = await asyncio.wrap_future(render_bytes(invoice, stored_items, settings))
+
+    except (RenderQueueFull, BrokenProcessPool) as e:
+
+        # queue filled up meanwhile (429), or a render worker died (503)
+        busy = isinstance(e, RenderQueueFull)
+        error = f"{e}, retry shortly" if busy else f"renderer restarting: {e}"
+
+        if persist:
+            # stored already, the first download renders it
+            error += f"; {invoice['invoice_id']} is stored, download it from {download_path(data.username, invoice['invoice_id'])}"
+
+        return busy_response(
+            message="Invoice renderer busy" if busy else "Invoice renderer unavailable",
+            error=error,
+            retry_after=retry_after(),
+            status_code=429 if busy else 503
+        )
+
+    return Response(
+        content=pdf,
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f'inline; filename="{invoice["invoice_id"]}.pdf"',
+            "X-Invoice-Id": invoice["invoice_id"]
+        }
+    )
+
+
+@router.get("/invoice/status/{invoice_id}")
+def invoice_status(invoice_id: str, wait: float = 0, username: Optional[str] = None):
+
+    if username is None:
+        _, username = invoice_owner(invoice_id)
+
+    job = job_status(invoice_key(username, invoice_id), wait=min(wait, INVOICE_WAIT_MAX))
+
+    if job:
+        return job
+
+    # queued on another worker, or from before a restart
+    invoice, _ = load_invoice(invoice_id, username)
+
+    if invoice is None:
+        return {"error": "Invoice not found"}
+
+    return {"invoice_id": invoice_id, "state": "stored", "error": None, "render_ms": None}
+
+
+# =========================
+# DOWNLOAD
+# =========================
+
+def etag_matches(header, etag):
+    """
+    If-None-Match uses weak comparison: W/"x" matches "x".
+    """
+
+    if header.strip() == "*":
+        return True
+
+    tags = [tag.strip() for tag in header.split(",")]
+
+    return any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def not_modified_since(header, mtime):
+
+    try:
+        since = parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+    # HTTP dates have whole-second precision
+    return int(mtime) <= since
+
+
 @router.get("/invoice/download/{invoice_id}")
-def download_invoice(invoice_id: str):
+def download_invoice(request: Request, invoice_id: str, username: Optional[str] = None):
+    """
+    The one invoice download: (username, invoice_id) index lookup, the
+    LRU cache (re-rendering after eviction), strong ETag and
+    Last-Modified with 304 revalidation, and Range / If-Range handled
+    by FileResponse, which can hand the file to the server's zero-copy
+    sendfile path.
+    """
 
-    file_path = f"invoices/{invoice_id}.pdf"
+    if username is None:
 
-    if not os.path.exists(file_path):
+        # old links carry no username
+        found, username = invoice_owner(invoice_id)
+
+        if not found:
+            return {"error": "Invoice not found"}
+
+    # let an in-flight render finish instead of drawing it twice
+    job_status(invoice_key(username, invoice_id), wait=INVOICE_WAIT_MAX)
+
+    key, file_path = resolve_invoice_pdf(invoice_id, username)
+
+    if not key:
         return {"error": "Invoice not found"}
 
+    if not file_path:
+        # issued before items and settings were stored, and its PDF is gone
+        return {"error": "Invoice PDF not available"}
+
+    stat = os.stat(file_path)
+    etag = invoice_cache.etag(key)
+
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": f"private, max-age={INVOICE_DOWNLOAD_MAX_AGE}"
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+
+    if if_none_match is not None:
+        not_modified = etag_matches(if_none_match, etag)
+    else:
+        not_modified = bool(if_modified_since) and not_modified_since(if_modified_since, stat.st_mtime)
+
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+
     return FileResponse(
         path=file_path,
         filename=f"{invoice_id}.pdf",
-        media_type="application/pdf"
+        media_type="application/pdf",
+        headers=headers,
+        stat_result=stat
     )
+
+
+@router.get("/invoice/cache/stats")
+def invoice_cache_stats():
+    return {**invoice_cache.stats(), "render": jobs_stats(), "numbers": invoice_numbers.stats()}
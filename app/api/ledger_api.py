@@ -1,9 +1,23 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from database import get_db_connection
+from typing import List, Optional
+import datetime
+import os
+import uuid
+from database import get_db_connection, get_db_writer, tenant_required
+from app.core.writer import writer_stats
+from app.repositories.entry_repository import insert_entry
+from app.core.response import success_response, error_response, tenant_required_response
+from app.core.pagination import fetch_page, InvalidCursor, PAGE_SIZE_DEFAULT
+from app.core.in_query import select_in
 
 router = APIRouter()
 
+BULK_MAX_ENTRIES = int(os.environ.get("BULK_MAX_ENTRIES", "5000"))
+
+ENTRY_TYPES = ("credit", "debit")
+
 # =========================
 # DATA MODEL
 # =========================
@@ -14,69 +28,274 @@ class LedgerEntry(BaseModel):
     amount: float
     note: str = ""
 
+
+class BulkLedgerEntry(LedgerEntry):
+    idempotency_key: Optional[str] = None
+    created_at: Optional[str] = None   # ISO 8601, when captured offline; UTC if no offset
+
+
+class BulkLedgerRequest(BaseModel):
+    username: str
+    entries: List[BulkLedgerEntry]
+
 # =========================
 # ADD ENTRY
 # =========================
 
 @router.post("/ledger/add")
-def add_entry(data: LedgerEntry):
-
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
+def add_entry(data: LedgerEntry, username: Optional[str] = None):
 
-        cursor.execute("""
-        INSERT INTO entries (customer_id, type, amount, note)
-        VALUES (?, ?, ?, ?)
-        """, (
-            data.customer_id,
-            data.type,
-            data.amount,
-            data.note
-        ))
+    if tenant_required(username):
+        return tenant_required_response()
 
-        conn.commit()
+    get_db_writer(username).execute(
+        insert_entry,
+        username,
+        data.customer_id,
+        data.type,
+        data.amount,
+        data.note
+    )
 
     return {
         "status": "success",
         "message": "Entry added"
     }
 
+# =========================
+# BULK INGESTION
+# =========================
+
+def _lookup(cursor, sql, username, values):
+    """
+    {first column: second column} of `sql` for one tenant's values.
+    """
+
+    return {row[0]: row[1] for row in select_in(cursor, sql, (username,), values)}
+
+
+def parse_created_at(value):
+    """
+    An ISO 8601 date or time as stored by CURRENT_TIMESTAMP: UTC,
+    "YYYY-MM-DD HH:MM:SS". Times without an offset are taken as UTC.
+    Raises ValueError for anything else.
+    """
+
+    text = value.strip()
+
+    if text.endswith(("Z", "z")):
+        text = text[:-1] + "+00:00"
+
+    moment = datetime.datetime.fromisoformat(text)
+
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def write_bulk_entries(conn, username, pending, created_at):
+    """
+    Writer job for one /ledger/bulk request: marks each pending result
+    duplicate or rejected, inserts the rest and returns
+    {idempotency_key: entry_id} of the inserted entries.
+    """
+
+    cursor = conn.cursor()
+
+    customer_ids = sorted({entry.customer_id for entry, _ in pending.values()})
+
+    known_customers = _lookup(
+        cursor,
+        "SELECT id, id FROM customers WHERE username=? AND id IN ({})",
+        username,
+        customer_ids
+    )
+
+    existing = _lookup(
+        cursor,
+        "SELECT idempotency_key, id FROM entries WHERE username=? AND idempotency_key IN ({})",
+        username,
+        list(pending)
+    )
+
+    rows = []
+
+    for key, (entry, result) in pending.items():
+
+        if key in existing:
+            result.update(status="duplicate", entry_id=existing[key])
+
+        elif entry.customer_id not in known_customers:
+            result.update(status="rejected", error="customer not found")
+
+        else:
+            rows.append((
+                username,
+                entry.customer_id,
+                entry.type,
+                entry.amount,
+                entry.note,
+                created_at.get(result["index"]),
+                key
+            ))
+
+    # customer_balances follows via the entries triggers
+    cursor.executemany("""
+    INSERT INTO entries
+    (username, customer_id, type, amount, note, created_at, idempotency_key)
+    VALUES (?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?)
+    """, rows)
+
+    return _lookup(
+        cursor,
+        "SELECT idempotency_key, id FROM entries WHERE username=? AND idempotency_key IN ({})",
+        username,
+        [row[-1] for row in rows]
+    )
+
+
+@router.post("/ledger/bulk")
+def bulk_add_entries(data: BulkLedgerRequest):
+
+    if len(data.entries) > BULK_MAX_ENTRIES:
+        return JSONResponse(
+            status_code=413,
+            content=error_response(
+                message="Too many entries",
+                error=f"at most {BULK_MAX_ENTRIES} entries per request"
+            )
+        )
+
+    # created_at is compared as text by the listings and exports, so only
+    # the stored format gets in
+    created_at = {}
+    invalid = []
+
+    for index, entry in enumerate(data.entries):
+
+        if entry.created_at is None:
+            continue
+
+        try:
+            created_at[index] = parse_created_at(entry.created_at)
+        except ValueError:
+            invalid.append(index)
+
+    if invalid:
+        return JSONResponse(
+            status_code=422,
+            content=error_response(
+                message="Invalid created_at",
+                error=f"entries {invalid[:20]}: expected an ISO 8601 time, e.g. 2024-05-31T14:05:00+05:30"
+            )
+        )
+
+    results = []
+    pending = {}
+
+    # validate and assign keys before touching the database
+    for index, entry in enumerate(data.entries):
+
+        key = entry.idempotency_key or uuid.uuid4().hex
+        result = {"index": index, "idempotency_key": key, "status": None, "entry_id": None}
+        results.append(result)
+
+        if entry.type not in ENTRY_TYPES:
+            result.update(status="rejected", error="type must be credit or debit")
+
+        elif entry.amount <= 0:
+            result.update(status="rejected", error="amount must be positive")
+
+        elif key in pending:
+            result.update(status="duplicate")
+
+        else:
+            pending[key] = (entry, result)
+
+    # one writer job: the whole batch commits together, in line with
+    # every other ledger write
+    inserted = get_db_writer(data.username).execute(
+        write_bulk_entries,
+        data.username,
+        pending,
+        created_at
+    )
+
+    for key, entry_id in inserted.items():
+        pending[key][1].update(status="created", entry_id=entry_id)
+
+    # in-request repeats point at whatever their first occurrence became
+    for result in results:
+        if result["status"] == "duplicate" and result["entry_id"] is None:
+            first = pending.get(result["idempotency_key"])
+            if first:
+                result["entry_id"] = first[1]["entry_id"]
+
+    summary = {
+        status: sum(1 for r in results if r["status"] == status)
+        for status in ("created", "duplicate", "rejected")
+    }
+
+    return success_response(
+        data={"summary": summary, "results": results},
+        message="Bulk entries processed",
+        count=summary["created"]
+    )
+
 # =========================
 # CUSTOMER LEDGER
 # =========================
 
 @router.get("/ledger/customer/{customer_id}")
-def customer_ledger(customer_id: int):
+def customer_ledger(
+    customer_id: int,
+    cursor: Optional[str] = None,
+    limit: int = PAGE_SIZE_DEFAULT,
+    username: Optional[str] = None
+):
 
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
+    if tenant_required(username):
+        return tenant_required_response()
 
-        cursor.execute("""
-        SELECT * FROM entries
-        WHERE customer_id=?
-        ORDER BY created_at DESC
-        """, (customer_id,))
+    try:
+        with get_db_connection(username=username) as conn:
+            rows, next_cursor = fetch_page(
+                conn.cursor(),
+                "entries",
+                "customer_id=?",
+                (customer_id,),
+                page_cursor=cursor,
+                limit=limit
+            )
 
-        rows = cursor.fetchall()
+    except InvalidCursor as e:
+        return error_response(message="Invalid cursor", error=str(e))
 
-    return [dict(row) for row in rows]
+    return success_response(
+        data=rows,
+        message="Ledger fetched successfully",
+        count=len(rows),
+        next_cursor=next_cursor
+    )
 
 # =========================
 # CUSTOMER BALANCE
 # =========================
 
 @router.get("/ledger/balance/{customer_id}")
-def customer_balance(customer_id: int):
+def customer_balance(customer_id: int, username: Optional[str] = None):
+
+    if tenant_required(username):
+        return tenant_required_response()
 
-    with get_db_connection() as conn:
+    with get_db_connection(username=username) as conn:
         cursor = conn.cursor()
 
+        # maintained by the entries triggers (see migrations)
         cursor.execute("""
-        SELECT
-        COALESCE(SUM(CASE WHEN type='credit' THEN amount END),0) -
-        COALESCE(SUM(CASE WHEN type='debit' THEN amount END),0)
-        as balance
-        FROM entries
+        SELECT COALESCE(SUM(balance), 0) as balance
+        FROM customer_balances
         WHERE customer_id=?
         """, (customer_id,))
 
@@ -85,3 +304,11 @@ def customer_balance(customer_id: int):
     return {
         "balance": result["balance"]
     }
+
+# =========================
+# WRITER STATS
+# =========================
+
+@router.get("/ledger/writer/stats")
+def ledger_writer_stats():
+    return {"writers": writer_stats()}
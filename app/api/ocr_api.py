@@ -1,7 +1,8 @@
 from fastapi import APIRouter, UploadFile, File
-import pytesseract
-from PIL import Image
-import io
+
+from app.core.response import busy_response
+from app.services.ocr_preprocess import preprocess_bill
+from app.services.ocr_service import OcrBusy, OcrUnavailable, run_ocr
 
 router = APIRouter()
 
@@ -11,10 +12,20 @@ async def scan_bill(file: UploadFile = File(...)):
 
     contents = await file.read()
 
-    image = Image.open(io.BytesIO(contents))
+    # nothing is stored and the caller is anonymous: answer repeats of
+    # the exact same upload from the cache, but never hand back another
+    # caller's text for a merely similar image
+    try:
+        result = await run_ocr(contents, preprocess=preprocess_bill, scope=("scan",), similar=False)
+
+    except OcrBusy as e:
+        return busy_response(message="OCR busy, retry shortly", error=str(e), retry_after=e.retry_after)
 
-    text = pytesseract.image_to_string(image)
+    except OcrUnavailable as e:
+        return busy_response(message="OCR unavailable", error=str(e), retry_after=e.retry_after, status_code=503)
 
     return {
-        "extracted_text": text
+        "extracted_text": result["text"],
+        "duplicate": bool(result["duplicate"]),
+        "timings": result["timings"]
     }
@@ -1,26 +1,32 @@
 from fastapi import APIRouter, UploadFile, File
-import pytesseract
-from PIL import Image
-import io
-import re
-from database import get_db_connection
+from database import async_db
+from app.core.response import busy_response
+from app.services.ocr_cache import ocr_cache
+from app.services.ocr_extract import BillExtractor
+from app.services.ocr_preprocess import preprocess_bill
+from app.services.ocr_service import OcrBusy, OcrUnavailable, ocr_stats, run_ocr
 
 router = APIRouter()
 
 
-def extract_amount(text: str):
+# word boxes, not the biggest number on the page (which is as often a
+# phone or bill number as the total)
+extract_bill = BillExtractor()
+
+
+def bill_amount(bill):
     """
-    Detect numbers from OCR text
+    (amount, confidence): the printed grand total, else the sum of the
+    item lines (confidence of the weakest), else (None, 0).
     """
-    numbers = re.findall(r"\d+", text)
 
-    if not numbers:
-        return None
+    if bill["total"]:
+        return bill["total"]["amount"], bill["total"]["confidence"]
 
-    # biggest number usually total
-    numbers = [int(n) for n in numbers]
+    if bill["items"]:
+        return bill["items_total"], min(item["confidence"] for item in bill["items"])
 
-    return max(numbers)
+    return None, 0
 
 
 @router.post("/ocr/bill-ledger")
@@ -32,12 +38,24 @@ async def scan_bill_and_add_ledger(
 
     contents = await file.read()
 
-    image = Image.open(io.BytesIO(contents))
-    image = image.convert("L")
+    # decode, preprocess, OCR and parse on the bounded OCR pool; a bill
+    # already entered for this customer comes back from the OCR cache
+    try:
+        result = await run_ocr(
+            contents,
+            preprocess=preprocess_bill,
+            parse=extract_bill,
+            scope=("bill-ledger", username, customer_id)
+        )
 
-    text = pytesseract.image_to_string(image)
+    except OcrBusy as e:
+        return busy_response(message="OCR busy, retry shortly", error=str(e), retry_after=e.retry_after)
 
-    amount = extract_amount(text)
+    except OcrUnavailable as e:
+        return busy_response(message="OCR unavailable", error=str(e), retry_after=e.retry_after, status_code=503)
+
+    text = result["text"]
+    amount, confidence = bill_amount(result["parsed"])
 
     if not amount:
         return {
@@ -45,10 +63,19 @@ async def scan_bill_and_add_ledger(
             "ocr_text": text
         }
 
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
+    if result["duplicate"]:
+        return {
+            "amount_detected": amount,
+            "confidence": confidence,
+            "status": "duplicate, ledger unchanged",
+            "duplicate": True,
+            "match": result["duplicate"],
+            "ocr_text": text,
+            "timings": result["timings"]
+        }
 
-        cursor.execute("""
+    try:
+        await async_db.execute("""
         INSERT INTO entries (username, customer_id, type, amount, note)
         VALUES (?, ?, ?, ?, ?)
         """, (
@@ -57,10 +84,22 @@ async def scan_bill_and_add_ledger(
             "credit",
             amount,
             "OCR bill entry"
-        ))
+        ), username=username)
+
+    except Exception:
+        ocr_cache.invalidate(result["key"])
+        raise
 
     return {
         "amount_detected": amount,
+        "confidence": confidence,
         "status": "ledger updated",
-        "ocr_text": text
+        "duplicate": False,
+        "ocr_text": text,
+        "timings": result["timings"]
     }
+
+
+@router.get("/ocr/stats")
+def ocr_pool_stats():
+    return ocr_stats()
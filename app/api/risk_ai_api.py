@@ -7,15 +7,13 @@ router = APIRouter()
 @router.get("/ai/risk-customers")
 def risk_customers(username: str):
 
-    with get_db_connection() as conn:
+    with get_db_connection(username=username) as conn:
         cursor = conn.cursor()
 
         cursor.execute("""
-        SELECT c.name,
-               SUM(CASE WHEN e.type='credit' THEN e.amount ELSE 0 END) -
-               SUM(CASE WHEN e.type='debit' THEN e.amount ELSE 0 END) AS balance
+        SELECT c.name, SUM(b.balance) AS balance
         FROM customers c
-        LEFT JOIN entries e ON c.id = e.customer_id
+        LEFT JOIN customer_balances b ON c.id = b.customer_id
         WHERE c.username = ?
         GROUP BY c.id
         """, (username,))
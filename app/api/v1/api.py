@@ -1,47 +1,43 @@
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import health
-from app.api.v1.endpoints import entries
-from app.api.v1.endpoints import reminders
-from app.api.v1.endpoints import ai
-from app.api.v1.endpoints import auth
-from app.api.v1.endpoints import intelligence
-from app.api.v1.endpoints import chat_ai
-from app.api.v1.endpoints import voice_ai
-from app.api.v1.endpoints import product_ai
-
-from app.api.v1 import ocr
+from app.core.features import include_routers
 
 
 api_router = APIRouter()
 
 
-# Health API
-api_router.include_router(health.router, prefix="/health", tags=["Health"])
+# (feature group, module, include options); disabled groups are never imported
+V1_ROUTERS = [
+
+    # Health API
+    ("core", "app.api.v1.endpoints.health", {"prefix": "/health", "tags": ["Health"]}),
+
+    # Auth API
+    ("core", "app.api.v1.endpoints.auth", {"prefix": "/auth", "tags": ["Auth"]}),
 
-# Auth API
-api_router.include_router(auth.router, prefix="/auth", tags=["Auth"])
+    # Entries API
+    ("core", "app.api.v1.endpoints.entries", {"prefix": "/entries", "tags": ["Entries"]}),
 
-# Entries API
-api_router.include_router(entries.router, prefix="/entries", tags=["Entries"])
+    # Reminders API
+    ("core", "app.api.v1.endpoints.reminders", {"prefix": "/reminders", "tags": ["Reminders"]}),
 
-# Reminders API
-api_router.include_router(reminders.router, prefix="/reminders", tags=["Reminders"])
+    # Basic AI
+    ("ai", "app.api.v1.endpoints.ai", {"prefix": "/ai", "tags": ["AI"]}),
 
-# Basic AI
-api_router.include_router(ai.router, prefix="/ai", tags=["AI"])
+    # OCR API
+    ("ocr", "app.api.v1.ocr", {"prefix": "/ocr", "tags": ["OCR"]}),
 
-# OCR API
-api_router.include_router(ocr.router, prefix="/ocr", tags=["OCR"])
+    # Business Intelligence
+    ("ai", "app.api.v1.endpoints.intelligence", {"prefix": "/intelligence", "tags": ["AI Intelligence"]}),
 
-# Business Intelligence
-api_router.include_router(intelligence.router, prefix="/intelligence", tags=["AI Intelligence"])
+    # AI Chat
+    ("ai", "app.api.v1.endpoints.chat_ai", {"prefix": "/chat-ai", "tags": ["AI Chat"]}),
 
-# AI Chat
-api_router.include_router(chat_ai.router, prefix="/chat-ai", tags=["AI Chat"])
+    # Voice AI
+    ("voice", "app.api.v1.endpoints.voice_ai", {"prefix": "/voice-ai", "tags": ["Voice AI"]}),
 
-# Voice AI
-api_router.include_router(voice_ai.router, prefix="/voice-ai", tags=["Voice AI"])
+    # Product Suggestion AI
+    ("ai", "app.api.v1.endpoints.product_ai", {"prefix": "/products", "tags": ["AI Products"]}),
+]
 
-# Product Suggestion AI
-api_router.include_router(product_ai.router, prefix="/products", tags=["AI Products"])
+include_routers(api_router, V1_ROUTERS)
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends
 from pydantic import BaseModel
 
 from app.services.ai_service import AIEntryParser
-from app.core.database import get_connection
+from app.core.database import get_connection, get_db
 from app.core.response import success_response, error_response
 from app.api.v1.endpoints.auth import get_current_user
 
@@ -102,12 +102,11 @@ def ai_auto_entry(request: AIRequest, current_user: dict = Depends(get_current_u
 
 # -------- BUSINESS REPORT --------
 @router.get("/business-report")
-def ai_business_report(current_user: dict = Depends(get_current_user)):
+def ai_business_report(current_user: dict = Depends(get_current_user), conn=Depends(get_db)):
 
     try:
         username = current_user["sub"]
 
-        conn = get_connection()
         cursor = conn.cursor()
 
         cursor.execute(
@@ -118,7 +117,6 @@ def ai_business_report(current_user: dict = Depends(get_current_user)):
         user = cursor.fetchone()
 
         if not user:
-            conn.close()
             return error_response(message="User not found")
 
         user_id = user["id"]
@@ -135,7 +133,6 @@ def ai_business_report(current_user: dict = Depends(get_current_user)):
         )
 
         rows = cursor.fetchall()
-        conn.close()
 
         data = [dict(row) for row in rows]
 
@@ -154,12 +151,11 @@ def ai_business_report(current_user: dict = Depends(get_current_user)):
 
 # -------- RECOVERY ADVICE --------
 @router.get("/recovery-advice")
-def ai_recovery_advice(current_user: dict = Depends(get_current_user)):
+def ai_recovery_advice(current_user: dict = Depends(get_current_user), conn=Depends(get_db)):
 
     try:
         username = current_user["sub"]
 
-        conn = get_connection()
         cursor = conn.cursor()
 
         cursor.execute(
@@ -170,7 +166,6 @@ def ai_recovery_advice(current_user: dict = Depends(get_current_user)):
         user = cursor.fetchone()
 
         if not user:
-            conn.close()
             return error_response(message="User not found")
 
         user_id = user["id"]
@@ -187,7 +182,6 @@ def ai_recovery_advice(current_user: dict = Depends(get_current_user)):
         )
 
         rows = cursor.fetchall()
-        conn.close()
 
         advice = []
 
@@ -5,7 +5,7 @@ from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
-from app.core.database import get_connection
+from app.core.database import get_connection, get_db
 from app.core.response import success_response, error_response
 
 
@@ -90,28 +90,22 @@ def register(user: UserCreate):
 
 
 @router.post("/login")
-def login(user: UserLogin):
+def login(user: UserLogin, conn=Depends(get_db)):
 
-    conn = get_connection()
     cursor = conn.cursor()
 
-    try:
-
-        cursor.execute("SELECT * FROM users WHERE username=?", (user.username,))
-        db_user = cursor.fetchone()
+    cursor.execute("SELECT * FROM users WHERE username=?", (user.username,))
+    db_user = cursor.fetchone()
 
-        if not db_user:
-            raise HTTPException(status_code=401, detail="Invalid username")
+    if not db_user:
+        raise HTTPException(status_code=401, detail="Invalid username")
 
-        if not pwd_context.verify(user.password, db_user["hashed_password"]):
-            raise HTTPException(status_code=401, detail="Invalid password")
+    if not pwd_context.verify(user.password, db_user["hashed_password"]):
+        raise HTTPException(status_code=401, detail="Invalid password")
 
-        access_token = create_access_token({"sub": user.username})
+    access_token = create_access_token({"sub": user.username})
 
-        return success_response(
-            message="Login successful",
-            data={"access_token": access_token}
-        )
-
-    finally:
-        conn.close()
+    return success_response(
+        message="Login successful",
+        data={"access_token": access_token}
+    )
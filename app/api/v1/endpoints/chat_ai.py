@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel
-from app.core.database import get_connection
+from app.core.database import get_db
 from app.api.v1.endpoints.auth import get_current_user
 from app.core.response import success_response
 
@@ -11,12 +11,11 @@ class Question(BaseModel):
 
 
 @router.post("/ask")
-def ask_ai(question: Question, current_user: dict = Depends(get_current_user)):
+def ask_ai(question: Question, current_user: dict = Depends(get_current_user), conn=Depends(get_db)):
 
     username = current_user["sub"]
     text = question.text.lower()
 
-    conn = get_connection()
     cursor = conn.cursor()
 
     # Find customer name
@@ -27,8 +26,6 @@ def ask_ai(question: Question, current_user: dict = Depends(get_current_user)):
 
     rows = cursor.fetchall()
 
-    conn.close()
-
     customers = [dict(row) for row in rows]
 
     for c in customers:
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel
+from typing import Optional
 
-from app.core.database import get_connection
+from app.core.database import get_connection, get_db, get_db_writer
 from app.core.response import success_response, error_response
+from app.core.pagination import fetch_page, InvalidCursor, PAGE_SIZE_DEFAULT
 from app.api.v1.endpoints.auth import get_current_user
 
 # AI Learning
@@ -19,6 +21,31 @@ class HisabEntry(BaseModel):
     price_per_unit: float
 
 
+def insert_hisab_entry(conn, username, data, total):
+    """
+    Writer job: the entry and its product learning commit together.
+    """
+
+    conn.execute(
+        """
+        INSERT INTO entries
+        (username, customer_name, item, quantity, price_per_unit, total)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        (
+            username,
+            data.customer_name,
+            data.item,
+            data.quantity,
+            data.price_per_unit,
+            total
+        )
+    )
+
+    # AI Learning System (same connection, same commit)
+    learn_product(username, data.item, conn=conn)
+
+
 @router.post("/")
 def create_entry(
     data: HisabEntry,
@@ -30,30 +57,7 @@ def create_entry(
 
         total = data.quantity * data.price_per_unit
 
-        conn = get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-            INSERT INTO entries
-            (username, customer_name, item, quantity, price_per_unit, total)
-            VALUES (?, ?, ?, ?, ?, ?)
-            """,
-            (
-                username,
-                data.customer_name,
-                data.item,
-                data.quantity,
-                data.price_per_unit,
-                total
-            )
-        )
-
-        conn.commit()
-        conn.close()
-
-        # AI Learning System
-        learn_product(username, data.item)
+        get_db_writer().execute(insert_hisab_entry, username, data, total)
 
         return success_response(
             message="Entry created successfully",
@@ -69,32 +73,37 @@ def create_entry(
 
 
 @router.get("/")
-def get_entries(current_user: dict = Depends(get_current_user)):
+def get_entries(
+    cursor: Optional[str] = None,
+    limit: int = PAGE_SIZE_DEFAULT,
+    current_user: dict = Depends(get_current_user),
+    conn=Depends(get_db)
+):
 
     try:
 
         username = current_user["sub"]
 
-        conn = get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute(
-            "SELECT * FROM entries WHERE username=? ORDER BY id DESC",
-            (username,)
+        data, next_cursor = fetch_page(
+            conn.cursor(),
+            "entries",
+            "username=?",
+            (username,),
+            page_cursor=cursor,
+            limit=limit
         )
 
-        rows = cursor.fetchall()
-
-        conn.close()
-
-        data = [dict(row) for row in rows]
-
         return success_response(
             message="Entries fetched successfully",
             data=data,
-            count=len(data)
+            count=len(data),
+            next_cursor=next_cursor
         )
 
+    except InvalidCursor as e:
+
+        return error_response(message="Invalid cursor", error=str(e))
+
     except Exception as e:
 
         return error_response(
@@ -1,6 +1,8 @@
 from fastapi import APIRouter
 from datetime import datetime
 
+from app.core.database import get_pool_stats, get_writer_stats
+
 router = APIRouter()
 
 @router.get("/")
@@ -11,3 +13,12 @@ def health_check():
         "version": "v1",
         "timestamp": datetime.utcnow()
     }
+
+
+@router.get("/db")
+def db_pool_health():
+    return {
+        "status": "ok",
+        "pools": get_pool_stats(),
+        "writers": get_writer_stats()
+    }
@@ -1,16 +1,15 @@
 from fastapi import APIRouter, Depends
-from app.core.database import get_connection
+from app.core.database import get_db
 from app.api.v1.endpoints.auth import get_current_user
 from app.core.response import success_response
 
 router = APIRouter()
 
 @router.get("/business-report")
-def business_report(current_user: dict = Depends(get_current_user)):
+def business_report(current_user: dict = Depends(get_current_user), conn=Depends(get_db)):
 
     username = current_user["sub"]
 
-    conn = get_connection()
     cursor = conn.cursor()
 
     cursor.execute(
@@ -19,7 +18,6 @@ def business_report(current_user: dict = Depends(get_current_user)):
     )
 
     rows = cursor.fetchall()
-    conn.close()
 
     customers = [dict(row) for row in rows]
 
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, Query
-from app.core.database import get_connection
+from app.core.database import get_db
 from app.api.v1.endpoints.auth import get_current_user
 from app.core.response import success_response, error_response
 
@@ -9,14 +9,14 @@ router = APIRouter()
 @router.get("/suggest")
 def suggest_product(
     q: str = Query(...),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    conn=Depends(get_db)
 ):
 
     try:
 
         username = current_user["sub"]
 
-        conn = get_connection()
         cursor = conn.cursor()
 
         cursor.execute(
@@ -32,8 +32,6 @@ def suggest_product(
 
         rows = cursor.fetchall()
 
-        conn.close()
-
         suggestions = [row["product_name"] for row in rows]
 
         return success_response(
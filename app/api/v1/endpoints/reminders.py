@@ -1,7 +1,9 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from pydantic import BaseModel
-from app.core.database import get_connection
+from typing import Optional
+from app.core.database import get_connection, get_db
 from app.core.response import success_response, error_response
+from app.core.pagination import fetch_page, InvalidCursor, PAGE_SIZE_DEFAULT
 
 router = APIRouter()
 
@@ -33,22 +35,24 @@ def add_reminder(reminder: Reminder):
 
 
 @router.get("/")
-def list_reminders():
+def list_reminders(cursor: Optional[str] = None, limit: int = PAGE_SIZE_DEFAULT, conn=Depends(get_db)):
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT * FROM reminders ORDER BY id DESC")
-        rows = cursor.fetchall()
-        conn.close()
-
-        data = [dict(row) for row in rows]
+        data, next_cursor = fetch_page(
+            conn.cursor(),
+            "reminders",
+            page_cursor=cursor,
+            limit=limit
+        )
 
         return success_response(
             data=data,
             message="Reminders fetched successfully",
-            count=len(data)
+            count=len(data),
+            next_cursor=next_cursor
         )
 
+    except InvalidCursor as e:
+        return error_response(message="Invalid cursor", error=str(e))
+
     except Exception as e:
         return error_response(message="Failed to fetch reminders", error=str(e))
@@ -1,15 +1,47 @@
 from fastapi import APIRouter, UploadFile, File, Depends
-import speech_recognition as sr
-from pydub import AudioSegment
+from fastapi.concurrency import run_in_threadpool
+import io
+import os
 import re
+import tempfile
 
-from app.core.database import get_connection
+from app.core.database import async_db
 from app.api.v1.endpoints.auth import get_current_user
 from app.core.response import success_response, error_response
+from app.core.features import lazy_import
+
+sr = lazy_import("speech_recognition")
+pydub = lazy_import("pydub")
 
 router = APIRouter()
 
 
+def transcribe_audio(contents: bytes):
+    """
+    Convert any uploaded audio to wav and run speech recognition.
+    Blocking (ffmpeg + network call); run it off the event loop.
+    """
+
+    audio = pydub.AudioSegment.from_file(io.BytesIO(contents))
+
+    # per-request temp file; the old shared "temp.wav" raced between uploads
+    fd, wav_path = tempfile.mkstemp(suffix=".wav")
+    os.close(fd)
+
+    try:
+        audio.export(wav_path, format="wav")
+
+        recognizer = sr.Recognizer()
+
+        with sr.AudioFile(wav_path) as source:
+            audio_data = recognizer.record(source)
+
+        return recognizer.recognize_google(audio_data).lower()
+
+    finally:
+        os.remove(wav_path)
+
+
 @router.post("/voice-entry")
 async def voice_entry(
     file: UploadFile = File(...),
@@ -20,20 +52,9 @@ async def voice_entry(
 
         username = current_user["sub"]
 
-        file_location = f"temp_{file.filename}"
-
-        with open(file_location, "wb") as f:
-            f.write(await file.read())
-
-        recognizer = sr.Recognizer()
-
-        audio = AudioSegment.from_file(file_location)
-        audio.export("temp.wav", format="wav")
-
-        with sr.AudioFile("temp.wav") as source:
-            audio_data = recognizer.record(source)
+        contents = await file.read()
 
-        text = recognizer.recognize_google(audio_data).lower()
+        text = await run_in_threadpool(transcribe_audio, contents)
 
         # Example voice command: ram 2 kilo sugar 80
         match = re.search(r"(\w+)\s+(\d+)\s+\w+\s+(\w+)\s+(\d+)", text)
@@ -48,10 +69,7 @@ async def voice_entry(
 
         total = quantity * price
 
-        conn = get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute(
+        await async_db.execute(
             """
             INSERT INTO entries
             (username, customer_name, item, quantity, price_per_unit, total)
@@ -67,9 +85,6 @@ async def voice_entry(
             )
         )
 
-        conn.commit()
-        conn.close()
-
         return success_response(
             message="Voice entry created",
             data={
@@ -1,13 +1,20 @@
 from fastapi import APIRouter, UploadFile, File, Depends
-import pytesseract
-from PIL import Image
-import shutil
-import re
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from typing import List
 import difflib
+import json
 
-from app.core.database import get_connection
+from app.core.database import async_db
 from app.api.v1.endpoints.auth import get_current_user
-from app.core.response import success_response, error_response
+from app.core.response import success_response, error_response, busy_response
+from app.services.ocr_batch import iter_pages, merge_pages, page_labels
+from app.services.ocr_cache import ocr_cache
+from app.services.ocr_extract import BillExtractor
+from app.services.ocr_preprocess import preprocess_bill
+from app.services.ocr_service import (
+    OcrBusy, OcrUnavailable, ocr_capacity, ocr_stats, retry_after, run_ocr, run_ocr_batch
+)
 
 router = APIRouter()
 
@@ -35,86 +42,282 @@ def correct_word(word: str):
     return word_lower
 
 
-@router.post("/read-bill")
-async def read_bill(
-    file: UploadFile = File(...),
-    current_user: dict = Depends(get_current_user)
-):
+def correct_name(name: str):
+    """
+    Item name spell-corrected word by word. Totals are found by their
+    row now, so an item is never renamed "total" ("Toor Dal"), and pack
+    sizes ("70g") are kept as printed.
+    """
 
-    try:
+    words = []
 
-        username = current_user["sub"]
+    for word in name.split():
 
-        file_location = f"temp_{file.filename}"
+        if any(ch.isdigit() for ch in word):
+            words.append(word.lower())
+            continue
 
-        with open(file_location, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        corrected = correct_word(word)
+        words.append(word.lower() if corrected == "total" else corrected)
 
-        img = Image.open(file_location)
+    return " ".join(words)
 
-        text = pytesseract.image_to_string(img)
 
-        lines = text.split("\n")
+# one image_to_data pass, read as a table: qty / price / amount
+# columns and the printed grand total, with confidences
+read_bill_data = BillExtractor(normalize_name=correct_name)
 
-        items = []
-        total = 0
 
-        for line in lines:
+def bill_totals(bill):
+    """
+    (items, total) of an extracted bill: the printed grand total, or
+    the sum of the items when none was found.
+    """
 
-            match = re.search(r"([A-Za-z]+)\s+(\d+)", line)
+    total = printed_total(bill)
 
-            if match:
+    return bill["items"], bill["items_total"] if total is None else total
 
-                raw_name = match.group(1)
-                amount = int(match.group(2))
 
-                name = correct_word(raw_name)
+def printed_total(bill):
+    """
+    The grand total printed on `bill`, or None.
+    """
 
-                if name == "total":
-                    total = amount
-                else:
-                    items.append({
-                        "name": name,
-                        "amount": amount
-                    })
+    return bill["total"]["amount"] if bill["total"] else None
 
-        # DATABASE ENTRY CREATE
 
-        conn = get_connection()
-        cursor = conn.cursor()
-
-        for item in items:
-
-            cursor.execute(
-                """
-                INSERT INTO entries
-                (username, customer_name, item, quantity, price_per_unit, total)
-                VALUES (?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    username,
-                    "OCR Customer",
-                    item["name"],
-                    1,
-                    item["amount"],
-                    item["amount"]
-                )
+ENTRY_INSERT = """
+INSERT INTO entries
+(username, customer_name, item, quantity, price_per_unit, total)
+VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+
+def entry_rows(username, items):
+
+    return [
+        (
+            username,
+            "OCR Customer",
+            item["name"],
+            item["qty"],
+            item["price"],
+            item["amount"]
+        )
+        for item in items
+    ]
+
+
+@router.post("/read-bill")
+async def read_bill(
+    file: UploadFile = File(...),
+    current_user: dict = Depends(get_current_user)
+):
+
+    try:
+
+        username = current_user["sub"]
+
+        contents = await file.read()
+
+        # decode, preprocess, OCR and parse on the bounded OCR pool;
+        # a bill this user already sent comes back from the OCR cache
+        result = await run_ocr(
+            contents,
+            preprocess=preprocess_bill,
+            parse=read_bill_data,
+            scope=("read-bill", username)
+        )
+
+        bill = result["parsed"]
+        items, total = bill_totals(bill)
+
+        if result["duplicate"]:
+
+            # already entered the first time round
+            return success_response(
+                message="Duplicate bill, already recorded",
+                data={
+                    "items": items,
+                    "total": total,
+                    "grand_total": bill["total"],
+                    "duplicate": True,
+                    "match": result["duplicate"],
+                    "timings": result["timings"]
+                }
             )
 
-        conn.commit()
-        conn.close()
+        # DATABASE ENTRY CREATE
+
+        # all line items in one statement / one commit
+        try:
+            await async_db.executemany(ENTRY_INSERT, entry_rows(username, items))
+
+        except Exception:
+            ocr_cache.invalidate(result["key"])
+            raise
 
         return success_response(
             message="OCR entry created successfully",
             data={
                 "items": items,
-                "total": total
+                "total": total,
+                "grand_total": bill["total"],
+                "duplicate": False,
+                "timings": result["timings"]
             }
         )
 
+    except OcrBusy as e:
+
+        return busy_response(
+            message="OCR busy, retry shortly",
+            error=str(e),
+            retry_after=e.retry_after
+        )
+
+    except OcrUnavailable as e:
+
+        return busy_response(
+            message="OCR unavailable",
+            error=str(e),
+            retry_after=e.retry_after,
+            status_code=503
+        )
+
     except Exception as e:
 
         return error_response(
             message="OCR processing failed",
             error=str(e)
         )
+
+
+# =========================
+# BATCH (SEVERAL PHOTOS / PDF)
+# =========================
+
+def _line(record):
+    return (json.dumps(record, ensure_ascii=False) + "\n").encode()
+
+
+async def read_bills_stream(username, uploads, labels):
+    """
+    One NDJSON line per page as it finishes, then, once every page is
+    in, the merged items written in one transaction and a closing line
+    with "done": true.
+    """
+
+    pages = [None] * len(labels)
+    written = False
+
+    try:
+
+        async for index, result in run_ocr_batch(
+            iter_pages(uploads),
+            preprocess=preprocess_bill,
+            parse=read_bill_data,
+            scope=("read-bill", username),
+            # pages of one PDF, or shots of one receipt, look alike:
+            # only an exact re-send counts as a duplicate
+            similar=False
+        ):
+
+            label = labels[index][0]
+
+            if isinstance(result, Exception):
+                yield _line({"page": index + 1, "source": label, "error": str(result)})
+                continue
+
+            pages[index] = result
+            items, total = bill_totals(result["parsed"])
+
+            yield _line({
+                "page": index + 1,
+                "source": label,
+                "items": items,
+                "total": total,
+                "grand_total": result["parsed"]["total"],
+                "duplicate": bool(result["duplicate"]),
+                "timings": result["timings"]
+            })
+
+        # pages already recorded (a re-sent batch, or the same shot
+        # twice) are reported above but not entered again
+        # the printed total only: a page without one must not stand in
+        # for the whole bill with its own items' sum
+        fresh = [
+            (result["parsed"]["items"], printed_total(result["parsed"]), labels[index][1])
+            for index, result in enumerate(pages)
+            if result and not result["duplicate"]
+        ]
+
+        items, total = merge_pages(fresh) if fresh else ([], 0)
+
+        if items:
+            # every page's items in one statement / one commit
+            await async_db.executemany(ENTRY_INSERT, entry_rows(username, items))
+
+        written = True
+
+        yield _line({
+            "done": True,
+            "pages": len(labels),
+            "failed": sum(1 for result in pages if result is None),
+            "duplicates": sum(1 for result in pages if result and result["duplicate"]),
+            "items": items,
+            "total": total,
+            "entries_created": len(items)
+        })
+
+    except Exception as e:
+        yield _line({"done": True, "error": str(e)})
+
+    finally:
+
+        if not written:
+            # nothing was recorded: let a retry read these pages again
+            for result in pages:
+                if result and not result["duplicate"]:
+                    ocr_cache.invalidate(result["key"])
+
+
+@router.post("/read-bills")
+async def read_bills(
+    files: List[UploadFile] = File(...),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Several photos of one bill, or a multi-page PDF, as one entry set.
+    Pages are read in parallel on the OCR pool and streamed back as
+    NDJSON as they finish.
+    """
+
+    username = current_user["sub"]
+
+    uploads = [(file.filename or f"file{n}", await file.read()) for n, file in enumerate(files, 1)]
+
+    try:
+        # opens every PDF: blocking, and serialised on the pdfium lock
+        labels = await run_in_threadpool(page_labels, uploads)
+
+    except ValueError as e:
+        return error_response(message="Cannot read bill pages", error=str(e))
+
+    if ocr_capacity() < 1:
+        return busy_response(
+            message="OCR busy, retry shortly",
+            error="OCR queue full",
+            retry_after=retry_after()
+        )
+
+    return StreamingResponse(
+        read_bills_stream(username, uploads, labels),
+        media_type="application/x-ndjson"
+    )
+
+
+@router.get("/stats")
+def ocr_pool_stats():
+    return success_response(data=ocr_stats())
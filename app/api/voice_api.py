@@ -39,7 +39,7 @@ def voice_entry(data: VoiceText):
 
     customer_name, amount = parsed
 
-    with get_db_connection() as conn:
+    with get_db_connection(username=data.username) as conn:
         cursor = conn.cursor()
 
         cursor.execute("""
@@ -0,0 +1,101 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+# =========================
+# ASYNC SQLITE ACCESS
+# =========================
+#
+# sqlite3 is blocking, so async endpoints hand every query to a small
+# dedicated executor instead of running it on the event loop. The executor
+# is separate from the anyio threadpool that serves sync endpoints, so a
+# burst of uploads cannot starve ordinary requests of threads (or the
+# other way round).
+
+DB_EXECUTOR_WORKERS = int(os.environ.get("DB_EXECUTOR_WORKERS", "4"))
+
+
+class AsyncDatabase:
+
+    def __init__(self, connect, max_workers=DB_EXECUTOR_WORKERS):
+        self._connect = connect
+        self._max_workers = max_workers
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._max_workers,
+                thread_name_prefix="sqlite-async"
+            )
+        return self._executor
+
+    def _call(self, fn, args, username):
+        # username routes to the tenant's shard (see database.get_db_connection)
+        conn = self._connect(username=username) if username else self._connect()
+
+        try:
+            result = fn(conn, *args)
+            conn.commit()
+            return result
+
+        except Exception:
+            conn.rollback()
+            raise
+
+        finally:
+            conn.close()
+
+    async def run(self, fn, *args, username=None):
+        """
+        Run fn(conn, *args) on the executor inside one transaction.
+        """
+
+        loop = asyncio.get_running_loop()
+
+        return await loop.run_in_executor(
+            self._get_executor(), self._call, fn, args, username
+        )
+
+    async def execute(self, sql, params=(), username=None):
+
+        def _execute(conn):
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            return {"rowcount": cursor.rowcount, "lastrowid": cursor.lastrowid}
+
+        return await self.run(_execute, username=username)
+
+    async def executemany(self, sql, seq, username=None):
+
+        def _executemany(conn):
+            cursor = conn.cursor()
+            cursor.executemany(sql, seq)
+            return cursor.rowcount
+
+        return await self.run(_executemany, username=username)
+
+    async def fetchone(self, sql, params=(), username=None):
+
+        def _fetchone(conn):
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+            return dict(row) if row else None
+
+        return await self.run(_fetchone, username=username)
+
+    async def fetchall(self, sql, params=(), username=None):
+
+        def _fetchall(conn):
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            return [dict(row) for row in cursor.fetchall()]
+
+        return await self.run(_fetchall, username=username)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+# =========================
+# TTL + LRU CACHE
+# =========================
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Small process-local cache: at most `max_entries` keys, each fresh
+    for `ttl` seconds, least recently used evicted first.
+
+    get() returns (value, fresh). A stale entry is still handed back so
+    the caller can revalidate it cheaply (e.g. by a version number)
+    instead of reloading; touch() then marks it fresh again.
+    """
+
+    def __init__(self, max_entries=1024, ttl=30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, key, default=None):
+
+        with self._lock:
+
+            entry = self._data.get(key, _MISSING)
+
+            if entry is _MISSING:
+                self._misses += 1
+                return default, False
+
+            self._data.move_to_end(key)
+
+            value, stored_at = entry
+
+            if time.monotonic() - stored_at <= self.ttl:
+                self._hits += 1
+                return value, True
+
+            self._stale += 1
+            return value, False
+
+    def set(self, key, value):
+
+        with self._lock:
+
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def touch(self, key):
+
+        with self._lock:
+
+            entry = self._data.get(key)
+
+            if entry is not None:
+                self._data[key] = (entry[0], time.monotonic())
+
+    def invalidate(self, key):
+
+        with self._lock:
+
+            if self._data.pop(key, _MISSING) is not _MISSING:
+                self._invalidations += 1
+
+    def clear(self):
+
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+
+        with self._lock:
+
+            lookups = self._hits + self._misses + self._stale
+
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "stale": self._stale,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0
+            }
@@ -1,21 +1,54 @@
-import sqlite3
+from app.core.db_pool import get_pool, pool_stats
+from app.core.async_db import AsyncDatabase
+from app.core.writer import get_writer, writer_stats
+from app.core.migrations import run_migrations
 
 
 DB_NAME = "hisabkitab_pro.db"
 
 
-def get_connection():
+def get_connection(reentrant=True):
 
-    conn = sqlite3.connect(DB_NAME)
+    # shared pool with database.get_db_connection() when both point at the
+    # same file; close() returns the connection to the pool
+    return get_pool(DB_NAME).connection(reentrant)
 
-    conn.row_factory = sqlite3.Row
 
-    return conn
+def get_db_writer():
+    # single-writer queue (group commit) for this database file
+    return get_writer(DB_NAME)
+
+
+# executor-backed access for async endpoints
+async_db = AsyncDatabase(get_connection)
+
+
+def get_db():
+    """
+    FastAPI dependency: one pooled connection per request.
+    """
+
+    # held across threadpool hops, so never shared with the thread's
+    # nested checkouts
+    conn = get_connection(reentrant=False)
+
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def get_pool_stats():
+    return pool_stats()
+
+
+def get_writer_stats():
+    return writer_stats()
 
 
 def init_db():
 
-    conn = sqlite3.connect(DB_NAME)
+    conn = get_connection()
 
     cursor = conn.cursor()
 
@@ -58,4 +91,7 @@ def init_db():
 
     conn.commit()
 
+    # indexes and later schema changes
+    run_migrations(conn)
+
     conn.close()
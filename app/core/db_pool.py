@@ -0,0 +1,361 @@
+import os
+import sqlite3
+import threading
+import time
+
+
+# =========================
+# POOL SETTINGS
+# =========================
+
+POOL_MAX_CONNECTIONS = int(os.environ.get("DB_POOL_MAX_CONNECTIONS", "16"))
+POOL_CHECKOUT_TIMEOUT = float(os.environ.get("DB_POOL_CHECKOUT_TIMEOUT", "30"))
+
+BUSY_TIMEOUT_MS = int(os.environ.get("DB_BUSY_TIMEOUT_MS", "5000"))
+CACHE_SIZE_KB = int(os.environ.get("DB_CACHE_SIZE_KB", "20000"))
+MMAP_SIZE = int(os.environ.get("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+# every tenant shard gets a pool; connections left unused this long are
+# closed (each holds its page cache and mmap), and a pool with none left
+# is dropped until its tenant is back. 0 keeps everything open
+POOL_IDLE_TIMEOUT = float(os.environ.get("DB_POOL_IDLE_TIMEOUT", "300"))
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+def open_connection(path):
+    """
+    New sqlite connection with the pool's pragmas, outside any pool.
+    """
+
+    conn = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False
+    )
+    conn.row_factory = sqlite3.Row
+
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+
+    return conn
+
+
+# =========================
+# POOLED CONNECTION
+# =========================
+
+class PooledConnection:
+    """
+    Thin proxy around sqlite3.Connection.
+
+    Behaves like a normal connection, except that close() and the end of a
+    `with` block hand the connection back to the pool instead of closing it.
+    """
+
+    def __init__(self, pool, raw, owner):
+        self._pool = pool
+        self._raw = raw
+        self._owner = owner
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __del__(self):
+        # a caller that forgot close() must not leak a pool slot
+        if not getattr(self, "_released", True):
+            self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._raw.commit()
+            else:
+                self._raw.rollback()
+        finally:
+            self.close()
+
+        return False
+
+    @property
+    def raw(self):
+        return self._raw
+
+    def close(self):
+        if self._released:
+            return
+
+        self._released = True
+        self._pool.release(self._raw, self._owner)
+
+
+# =========================
+# CONNECTION POOL
+# =========================
+
+class ConnectionPool:
+    """
+    Bounded pool of pragma-tuned sqlite connections for one database file.
+
+    A thread that checks out a connection while it already holds one gets
+    the same connection back, so nested helpers (e.g. learn_product inside
+    create_entry) share the caller's connection and transaction. Released
+    connections are reused most-recently-used first to keep page caches warm.
+
+    Connections held across thread hops (request dependencies, streamed
+    responses) must be checked out with reentrant=False, otherwise another
+    request served by the same worker thread would be handed the same one.
+    """
+
+    def __init__(self, path, max_connections=POOL_MAX_CONNECTIONS, timeout=POOL_CHECKOUT_TIMEOUT):
+        self.path = path
+        self.max_connections = max_connections
+        self.timeout = timeout
+
+        # (connection, released at), most recently released last
+        self._idle = []
+        self._open = 0
+        self._held = {}
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self._checkouts = 0
+        self._reuses = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait = 0.0
+
+    def _connect(self):
+        return open_connection(self.path)
+
+    def connection(self, reentrant=True):
+        if not reentrant:
+            return PooledConnection(self, self._checkout(), None)
+
+        owner = threading.get_ident()
+
+        with self._cond:
+            held = self._held.get(owner)
+
+            if held is not None:
+                held[1] += 1
+                self._checkouts += 1
+                self._reuses += 1
+
+                return PooledConnection(self, held[0], owner)
+
+        raw = self._checkout()
+
+        with self._cond:
+            self._held[owner] = [raw, 1]
+
+        return PooledConnection(self, raw, owner)
+
+    def _checkout(self):
+        started = time.perf_counter()
+        waited = False
+
+        with self._cond:
+
+            while True:
+
+                if self._idle:
+                    raw, _ = self._idle.pop()
+                    self._reuses += 1
+                    break
+
+                if self._open < self.max_connections:
+                    self._open += 1
+                    raw = None
+                    break
+
+                waited = True
+                remaining = self.timeout - (time.perf_counter() - started)
+
+                if remaining <= 0:
+                    raise PoolTimeout(
+                        f"no sqlite connection free after {self.timeout}s"
+                    )
+
+                self._cond.wait(remaining)
+
+            self._checkouts += 1
+
+            if waited:
+                elapsed = time.perf_counter() - started
+                self._waits += 1
+                self._wait_time += elapsed
+                self._max_wait = max(self._max_wait, elapsed)
+
+        if raw is None:
+            try:
+                raw = self._connect()
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+
+        return raw
+
+    def release(self, raw, owner):
+        with self._cond:
+            held = self._held.get(owner) if owner is not None else None
+
+            if held is not None and held[0] is raw:
+                held[1] -= 1
+
+                if held[1] > 0:
+                    return
+
+                del self._held[owner]
+
+        # never hand out a connection with a half-finished transaction
+        try:
+            if raw.in_transaction:
+                raw.rollback()
+        except sqlite3.Error:
+            self._discard(raw)
+            return
+
+        with self._cond:
+
+            if not self._closed:
+                self._idle.append((raw, time.monotonic()))
+                self._cond.notify()
+                return
+
+        # the pool was retired while this connection was out
+        self._discard(raw)
+
+    def _discard(self, raw):
+
+        raw.close()
+
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    def close_idle(self, older_than=0):
+        """
+        Close idle connections released more than `older_than` seconds
+        ago. Returns the number of connections still open.
+        """
+
+        cutoff = time.monotonic() - older_than
+
+        with self._cond:
+
+            # oldest first
+            while self._idle and self._idle[0][1] <= cutoff:
+                raw, _ = self._idle.pop(0)
+                raw.close()
+                self._open -= 1
+
+            return self._open
+
+    def close_all(self):
+        self.close_idle()
+
+    def retire(self):
+        """
+        Close the idle connections and any returned later; the pool
+        still serves checkouts, each with a fresh connection.
+        """
+
+        with self._cond:
+            self._closed = True
+
+        self.close_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "path": self.path,
+                "max_connections": self.max_connections,
+                "open_connections": self._open,
+                "idle_connections": len(self._idle),
+                "in_use_connections": self._open - len(self._idle),
+                "checkouts": self._checkouts,
+                "reuses": self._reuses,
+                "waits": self._waits,
+                "total_wait_ms": round(self._wait_time * 1000, 3),
+                "max_wait_ms": round(self._max_wait * 1000, 3)
+            }
+
+
+# =========================
+# POOL REGISTRY
+# =========================
+
+_pools = {}
+_pools_lock = threading.Lock()
+_last_sweep = time.monotonic()
+
+
+def get_pool(path):
+    """
+    One pool per database file, shared by every module that opens it.
+    """
+
+    key = os.path.abspath(path)
+
+    _sweep()
+
+    with _pools_lock:
+
+        pool = _pools.get(key)
+
+        if pool is None:
+            pool = ConnectionPool(key)
+            _pools[key] = pool
+
+        return pool
+
+
+def _sweep():
+    """
+    Every quarter POOL_IDLE_TIMEOUT: close connections idle that long
+    and drop pools left without any, so tenants that went quiet stop
+    holding sqlite handles.
+    """
+
+    global _last_sweep
+
+    if POOL_IDLE_TIMEOUT <= 0:
+        return
+
+    now = time.monotonic()
+
+    if now - _last_sweep < POOL_IDLE_TIMEOUT / 4:
+        return
+
+    with _pools_lock:
+
+        if now - _last_sweep < POOL_IDLE_TIMEOUT / 4:
+            return
+
+        _last_sweep = now
+
+        for key, pool in list(_pools.items()):
+
+            if pool.close_idle(POOL_IDLE_TIMEOUT) == 0:
+                del _pools[key]
+                pool.retire()
+
+
+def pool_stats():
+    with _pools_lock:
+        pools = list(_pools.values())
+
+    return [pool.stats() for pool in pools]
@@ -0,0 +1,76 @@
+import importlib
+import os
+
+
+# =========================
+# FEATURE SWITCHES
+# =========================
+#
+# HISAB_DISABLED_FEATURES=ocr,voice,pdf skips those router groups
+# entirely, so a worker that only serves ledger traffic never imports
+# tesseract, speech or reportlab code.
+
+FEATURE_GROUPS = ("core", "ai", "ocr", "voice", "pdf")
+
+DISABLED_FEATURES = {
+    name.strip().lower()
+    for name in os.environ.get("HISAB_DISABLED_FEATURES", "").split(",")
+    if name.strip()
+}
+
+
+def feature_enabled(name):
+    # core routes (ledger, customers, auth, health) cannot be switched off
+    return name == "core" or name not in DISABLED_FEATURES
+
+
+def include_routers(target, routers):
+    """
+    Import and mount routers for the enabled feature groups only.
+
+    `routers` is a list of (feature, module path, include_router kwargs);
+    the module is imported here, not at the top of the entrypoint.
+    """
+
+    mounted = []
+
+    for feature, module_path, options in routers:
+
+        if not feature_enabled(feature):
+            continue
+
+        module = importlib.import_module(module_path)
+        target.include_router(module.router, **options)
+        mounted.append(module_path)
+
+    return mounted
+
+
+# =========================
+# LAZY IMPORTS
+# =========================
+
+class LazyModule:
+    """
+    Stand-in for a heavy module; the real import happens on first
+    attribute access (i.e. on the first request that needs it).
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
@@ -0,0 +1,32 @@
+import os
+
+
+# =========================
+# CHUNKED IN (...) LOOKUPS
+# =========================
+#
+# sqlite caps the bound parameters of one statement (999 on older
+# builds), so lookups over an unbounded list of keys run once per chunk.
+
+IN_CHUNK = int(os.environ.get("DB_IN_CHUNK", "500"))
+
+
+def select_in(cursor, sql, params, values, size=IN_CHUNK):
+    """
+    Rows of `sql` for every value in `values`. The last placeholders of
+    `sql` are IN ({}), filled with one per value of a chunk; `params`
+    bind the ones before it.
+    """
+
+    values = list(values)
+
+    for start in range(0, len(values), size):
+
+        chunk = values[start:start + size]
+
+        cursor.execute(
+            sql.format(",".join("?" * len(chunk))),
+            (*params, *chunk)
+        )
+
+        yield from cursor.fetchall()
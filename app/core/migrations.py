@@ -0,0 +1,628 @@
+import sys
+
+
+# =========================
+# SCHEMA VERSIONING
+# =========================
+#
+# Every migration is (version, name, function). Applied versions are
+# recorded in schema_migrations, and run_migrations() applies whatever is
+# missing, in order, at startup. Both database modules (database.py and
+# app/core/database.py) call it after their CREATE TABLE IF NOT EXISTS
+# blocks, so tables may have either module's column layout; migrations
+# therefore check columns before touching them.
+#
+# A step that depends on a table the other module creates skips its
+# work when the table is not there yet, so those steps are written to be
+# idempotent and listed in SCHEMA_STEPS as well, which runs on every
+# startup (like ensure_indexes) and adds whatever is still missing.
+
+
+def table_columns(cursor, table):
+
+    cursor.execute(f"PRAGMA table_info({table})")
+
+    return {row[1] for row in cursor.fetchall()}
+
+
+def create_index(cursor, name, table, columns, unique=False, where=None):
+    """
+    CREATE INDEX IF NOT EXISTS, skipped when the table lacks a column.
+    `columns` items may carry a collation, e.g. "product_name COLLATE NOCASE".
+    """
+
+    existing = table_columns(cursor, table)
+    wanted = [col.split()[0] for col in columns]
+
+    if not existing or not all(col in existing for col in wanted):
+        return False
+
+    sql = "CREATE {}INDEX IF NOT EXISTS {} ON {} ({})".format(
+        "UNIQUE " if unique else "",
+        name,
+        table,
+        ", ".join(columns)
+    )
+
+    if where:
+        sql += f" WHERE {where}"
+
+    cursor.execute(sql)
+
+    return True
+
+
+# =========================
+# MIGRATIONS
+# =========================
+
+def _ai_products_table(cursor):
+
+    # used by learn_product and /products/suggest but never created
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS ai_products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT,
+        product_name TEXT,
+        usage_count INTEGER DEFAULT 0
+    )
+    """)
+
+
+# (name, table, columns)
+INDEXES = [
+    # /entries/ listing: WHERE username=? ORDER BY id DESC
+    ("idx_entries_user_id", "entries", ["username", "id"]),
+
+    ("idx_customers_user_name", "customers", ["username", "name"]),
+
+    ("idx_invoices_user_created", "invoices", ["username", "created_at"]),
+
+    # NOCASE so the LIKE 'q%' prefix lookup can range-scan the index
+    ("idx_ai_products_user_name_usage", "ai_products", ["username", "product_name COLLATE NOCASE", "usage_count"]),
+
+    # keyset pagination on (created_at, id); id rides along as the rowid
+    ("idx_entries_user_created", "entries", ["username", "created_at"]),
+    ("idx_entries_customer_created", "entries", ["customer_id", "created_at"]),
+    ("idx_customers_user_created", "customers", ["username", "created_at"]),
+    ("idx_invoices_created", "invoices", ["created_at"]),
+    ("idx_reminders_created", "reminders", ["created_at"]),
+
+    # re-rendering a PDF looks the invoice and its items up by invoice_id
+    ("idx_invoices_invoice_id", "invoices", ["invoice_id"]),
+    ("idx_invoice_items_invoice", "invoice_items", ["invoice_id", "id"]),
+
+    # settings lookups and version revalidation
+    ("idx_business_settings_user", "business_settings", ["username", "id"]),
+]
+
+
+def ensure_indexes(cursor):
+
+    for name, table, columns in INDEXES:
+        create_index(cursor, name, table, columns)
+
+
+# =========================
+# CUSTOMER BALANCES PROJECTION
+# =========================
+#
+# One row per (username, customer_id), kept current by triggers on
+# entries so every insert/delete updates it in the writer's transaction.
+# username is stored as '' when the entry has none (ledger/add).
+
+_CREDIT = "CASE WHEN {e}.type='credit' THEN {e}.amount ELSE 0 END"
+_DEBIT = "CASE WHEN {e}.type='debit' THEN {e}.amount ELSE 0 END"
+
+
+def _apply_sql(e):
+
+    credit = _CREDIT.format(e=e)
+    debit = _DEBIT.format(e=e)
+
+    return f"""
+        INSERT INTO customer_balances
+        (username, customer_id, credit_total, debit_total, balance, last_entry_at, entry_count)
+        SELECT
+            IFNULL({e}.username, ''),
+            {e}.customer_id,
+            {credit},
+            {debit},
+            ({credit}) - ({debit}),
+            {e}.created_at,
+            1
+        WHERE {e}.customer_id IS NOT NULL
+        ON CONFLICT(username, customer_id) DO UPDATE SET
+            credit_total = credit_total + excluded.credit_total,
+            debit_total = debit_total + excluded.debit_total,
+            balance = balance + excluded.balance,
+            last_entry_at = CASE
+                WHEN last_entry_at IS NULL OR excluded.last_entry_at > last_entry_at
+                THEN excluded.last_entry_at
+                ELSE last_entry_at
+            END,
+            entry_count = entry_count + 1;
+    """
+
+
+def _revert_sql(e):
+
+    credit = _CREDIT.format(e=e)
+    debit = _DEBIT.format(e=e)
+
+    return f"""
+        UPDATE customer_balances SET
+            credit_total = credit_total - ({credit}),
+            debit_total = debit_total - ({debit}),
+            balance = balance - (({credit}) - ({debit})),
+            entry_count = entry_count - 1,
+            last_entry_at = (
+                SELECT MAX(created_at) FROM entries
+                WHERE customer_id = {e}.customer_id
+                AND IFNULL(username, '') = IFNULL({e}.username, '')
+            )
+        WHERE username = IFNULL({e}.username, '')
+        AND customer_id = {e}.customer_id;
+    """
+
+
+def rebuild_customer_balances(cursor):
+
+    cursor.execute("DELETE FROM customer_balances")
+
+    cursor.execute(f"""
+    INSERT INTO customer_balances
+    (username, customer_id, credit_total, debit_total, balance, last_entry_at, entry_count)
+    SELECT
+        IFNULL(e.username, ''),
+        e.customer_id,
+        SUM({_CREDIT.format(e="e")}),
+        SUM({_DEBIT.format(e="e")}),
+        SUM({_CREDIT.format(e="e")}) - SUM({_DEBIT.format(e="e")}),
+        MAX(e.created_at),
+        COUNT(*)
+    FROM entries e
+    WHERE e.customer_id IS NOT NULL
+    GROUP BY IFNULL(e.username, ''), e.customer_id
+    """)
+
+
+def _customer_balances(cursor):
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS customer_balances (
+        username TEXT NOT NULL DEFAULT '',
+        customer_id INTEGER NOT NULL,
+        credit_total REAL NOT NULL DEFAULT 0,
+        debit_total REAL NOT NULL DEFAULT 0,
+        balance REAL NOT NULL DEFAULT 0,
+        last_entry_at TIMESTAMP,
+        entry_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (username, customer_id)
+    )
+    """)
+
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_customer_balances_customer "
+        "ON customer_balances (customer_id)"
+    )
+
+    # only the ledger layout of entries (database.py) has these columns
+    if not {"username", "customer_id", "type", "amount"} <= table_columns(cursor, "entries"):
+        return
+
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_entries_balance_insert
+    AFTER INSERT ON entries
+    WHEN NEW.customer_id IS NOT NULL
+    BEGIN
+        {_apply_sql("NEW")}
+    END
+    """)
+
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_entries_balance_delete
+    AFTER DELETE ON entries
+    WHEN OLD.customer_id IS NOT NULL
+    BEGIN
+        {_revert_sql("OLD")}
+    END
+    """)
+
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_entries_balance_update
+    AFTER UPDATE OF username, customer_id, type, amount, created_at ON entries
+    BEGIN
+        {_revert_sql("OLD")}
+        {_apply_sql("NEW")}
+    END
+    """)
+
+    rebuild_customer_balances(cursor)
+
+
+def _entry_idempotency_keys(cursor):
+
+    columns = table_columns(cursor, "entries")
+
+    if not columns:
+        return
+
+    if "idempotency_key" not in columns:
+        cursor.execute("ALTER TABLE entries ADD COLUMN idempotency_key TEXT")
+
+    # partial, so entries written without a key are unaffected
+    create_index(
+        cursor,
+        "idx_entries_user_idempotency",
+        "entries",
+        ["username", "idempotency_key"],
+        unique=True,
+        where="idempotency_key IS NOT NULL"
+    )
+
+
+def _invoice_render_snapshot(cursor):
+    """
+    Everything needed to re-render an invoice PDF from its rows alone.
+    """
+
+    columns = table_columns(cursor, "invoices")
+
+    if not columns:
+        return
+
+    for name, decl in (
+        ("note", "TEXT"),
+        ("template", "TEXT"),
+        ("apply_gst", "INTEGER DEFAULT 0"),
+        ("settings_json", "TEXT"),
+    ):
+        if name not in columns:
+            cursor.execute(f"ALTER TABLE invoices ADD COLUMN {name} {decl}")
+
+    ensure_indexes(cursor)
+
+
+def _invoice_sequences(cursor):
+    """
+    Per-tenant, per-financial-year invoice counters (see invoice_numbers).
+    """
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS invoice_sequences (
+        username TEXT NOT NULL,
+        fy TEXT NOT NULL,
+        next_value INTEGER NOT NULL DEFAULT 1,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (username, fy)
+    )
+    """)
+
+
+def _business_settings_version(cursor):
+    """
+    Columns the settings endpoint already writes, plus a version counter
+    that lets other workers revalidate their cached copy cheaply.
+    """
+
+    columns = table_columns(cursor, "business_settings")
+
+    if not columns:
+        return
+
+    for name, decl in (
+        ("default_template", "TEXT DEFAULT '1'"),
+        ("updated_at", "TIMESTAMP"),
+        ("version", "INTEGER NOT NULL DEFAULT 0"),
+    ):
+        if name not in columns:
+            cursor.execute(f"ALTER TABLE business_settings ADD COLUMN {name} {decl}")
+
+    ensure_indexes(cursor)
+
+
+def _tenant_invoice_lookups(cursor):
+    """
+    Invoice numbers are per tenant, so an invoice is (username,
+    invoice_id). Items get the username too, backfilled from their
+    invoice, and both tables are indexed on the pair.
+    """
+
+    invoices = table_columns(cursor, "invoices")
+    items = table_columns(cursor, "invoice_items")
+
+    if not invoices or not items:
+        return
+
+    # new items are written with their username; only a column added
+    # here has rows to backfill
+    if "username" not in items:
+
+        cursor.execute("ALTER TABLE invoice_items ADD COLUMN username TEXT")
+
+        cursor.execute("""
+        UPDATE invoice_items
+        SET username = (
+            SELECT i.username FROM invoices i
+            WHERE i.invoice_id = invoice_items.invoice_id
+            ORDER BY i.id DESC LIMIT 1
+        )
+        WHERE username IS NULL
+        """)
+
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='index' AND name='idx_invoices_user_invoice'"
+    )
+
+    if cursor.fetchone() is None:
+
+        # old INV-<seconds> ids could repeat within a tenant; only enforce
+        # uniqueness when the existing rows allow it
+        cursor.execute("""
+        SELECT 1 FROM invoices
+        GROUP BY username, invoice_id
+        HAVING COUNT(*) > 1
+        LIMIT 1
+        """)
+
+        create_index(
+            cursor,
+            "idx_invoices_user_invoice",
+            "invoices",
+            ["username", "invoice_id"],
+            unique=cursor.fetchone() is None
+        )
+
+    create_index(
+        cursor,
+        "idx_invoice_items_user_invoice",
+        "invoice_items",
+        ["username", "invoice_id", "id"]
+    )
+
+
+def _drop_entry_aggregate_indexes(cursor):
+
+    # balances are read from customer_balances now; these only slowed
+    # every insert into entries
+    cursor.execute("DROP INDEX IF EXISTS idx_entries_user_customer_type_amount")
+    cursor.execute("DROP INDEX IF EXISTS idx_entries_customer_type_amount")
+
+
+MIGRATIONS = [
+    (1, "ai_products table", _ai_products_table),
+    (2, "covering indexes", ensure_indexes),
+    (3, "customer balances projection", _customer_balances),
+    (4, "keyset pagination indexes", ensure_indexes),
+    (5, "entry idempotency keys", _entry_idempotency_keys),
+    (6, "invoice render snapshot", _invoice_render_snapshot),
+    (7, "invoice number sequences", _invoice_sequences),
+    (8, "business settings version", _business_settings_version),
+    (9, "tenant-scoped invoice lookups", _tenant_invoice_lookups),
+    (10, "drop entry aggregate indexes", _drop_entry_aggregate_indexes),
+]
+
+# steps that add columns/tables to a table the other database module
+# creates; re-run at every startup so a version recorded before that
+# table existed still ends up with its schema
+SCHEMA_STEPS = [
+    _entry_idempotency_keys,
+    _invoice_render_snapshot,
+    _invoice_sequences,
+    _business_settings_version,
+    _tenant_invoice_lookups,
+]
+
+
+def ensure_schema(cursor):
+
+    for step in SCHEMA_STEPS:
+        step(cursor)
+
+
+# =========================
+# RUNNER
+# =========================
+
+def _ensure_version_table(cursor):
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+
+def get_schema_version(conn):
+
+    cursor = conn.cursor()
+
+    _ensure_version_table(cursor)
+
+    cursor.execute("SELECT MAX(version) FROM schema_migrations")
+
+    return cursor.fetchone()[0] or 0
+
+
+def run_migrations(conn):
+    """
+    Apply pending migrations, each in its own transaction.
+    Returns the list of versions applied.
+    """
+
+    applied = []
+
+    current = get_schema_version(conn)
+    conn.commit()
+
+    for version, name, migrate in MIGRATIONS:
+
+        if version <= current:
+            continue
+
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+
+            # another worker may have applied it while we waited for the lock
+            cursor.execute(
+                "SELECT 1 FROM schema_migrations WHERE version=?",
+                (version,)
+            )
+
+            if cursor.fetchone():
+                conn.commit()
+                continue
+
+            migrate(cursor)
+
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (?, ?)",
+                (version, name)
+            )
+
+            conn.commit()
+
+        except Exception:
+            conn.rollback()
+            raise
+
+        applied.append(version)
+
+    # the two database modules create different tables, so a column or
+    # index whose table did not exist when its migration ran is picked
+    # up here later
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        ensure_schema(cursor)
+        ensure_indexes(cursor)
+        conn.commit()
+
+    except Exception:
+        conn.rollback()
+        raise
+
+    return applied
+
+
+# =========================
+# QUERY PLAN CHECKS
+# =========================
+
+HOT_QUERIES = [
+    (
+        "ledger balance",
+        "SELECT COALESCE(SUM(balance), 0) FROM customer_balances WHERE customer_id=?",
+        (1,)
+    ),
+    (
+        "business insights",
+        "SELECT SUM(credit_total), SUM(debit_total) FROM customer_balances WHERE username=?",
+        ("u",)
+    ),
+    (
+        "top customers",
+        "SELECT c.name, b.credit_total AS total FROM customer_balances b "
+        "JOIN customers c ON b.customer_id = c.id "
+        "WHERE b.username=? AND b.credit_total <> 0 ORDER BY total DESC LIMIT 5",
+        ("u",)
+    ),
+    (
+        "customer risk",
+        "SELECT c.name, SUM(b.balance) AS balance FROM customers c "
+        "LEFT JOIN customer_balances b ON c.id = b.customer_id "
+        "WHERE c.username=? GROUP BY c.id",
+        ("u",)
+    ),
+    (
+        "entries page",
+        "SELECT * FROM entries WHERE username=? AND (created_at, id) < (?, ?) "
+        "ORDER BY created_at DESC, id DESC LIMIT 51",
+        ("u", "2030-01-01", 1)
+    ),
+    (
+        "customer ledger page",
+        "SELECT * FROM entries WHERE customer_id=? AND (created_at, id) < (?, ?) "
+        "ORDER BY created_at DESC, id DESC LIMIT 51",
+        (1, "2030-01-01", 1)
+    ),
+    (
+        "customer lookup",
+        "SELECT id FROM customers WHERE name=? AND username=?",
+        ("n", "u")
+    ),
+    (
+        "invoice list",
+        "SELECT * FROM invoices WHERE username=? ORDER BY created_at DESC, id DESC LIMIT 51",
+        ("u",)
+    ),
+    (
+        "product suggest",
+        "SELECT product_name, usage_count FROM ai_products "
+        "WHERE username=? AND product_name LIKE ? ORDER BY usage_count DESC LIMIT 5",
+        ("u", "a%")
+    ),
+]
+
+
+def explain(conn, sql, params=()):
+
+    cursor = conn.cursor()
+    cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+
+    return [row[3] for row in cursor.fetchall()]
+
+
+def verify_query_plans(conn):
+    """
+    EXPLAIN every hot query; a query is ok when no step is a full SCAN.
+    Queries against columns this database does not have are skipped.
+    """
+
+    report = []
+
+    for name, sql, params in HOT_QUERIES:
+
+        try:
+            plan = explain(conn, sql, params)
+        except Exception as e:
+            report.append({"query": name, "ok": None, "plan": [], "error": str(e)})
+            continue
+
+        full_scan = any(
+            step.startswith("SCAN") and "INDEX" not in step
+            for step in plan
+        )
+
+        report.append({"query": name, "ok": not full_scan, "plan": plan})
+
+    return report
+
+
+if __name__ == "__main__":
+
+    # python -m app.core.migrations [--verify]
+    from database import get_db_connection, init_database
+
+    # creates tables and applies pending migrations
+    init_database()
+
+    conn = get_db_connection()
+
+    try:
+        print("schema version:", get_schema_version(conn))
+
+        if "--verify" in sys.argv:
+
+            for item in verify_query_plans(conn):
+                status = {True: "OK  ", False: "SCAN", None: "SKIP"}[item["ok"]]
+                print(status, item["query"], "|", "; ".join(item["plan"]) or item.get("error", ""))
+
+    finally:
+        conn.close()
@@ -0,0 +1,91 @@
+import base64
+import json
+import os
+
+
+# =========================
+# PAGE SIZE
+# =========================
+
+PAGE_SIZE_DEFAULT = int(os.environ.get("PAGE_SIZE_DEFAULT", "50"))
+PAGE_SIZE_MAX = int(os.environ.get("PAGE_SIZE_MAX", "200"))
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def clamp_limit(limit):
+
+    if not limit or limit < 1:
+        return PAGE_SIZE_DEFAULT
+
+    return min(limit, PAGE_SIZE_MAX)
+
+
+# =========================
+# OPAQUE CURSORS
+# =========================
+
+def encode_cursor(created_at, row_id):
+
+    raw = json.dumps([created_at, row_id], separators=(",", ":"))
+
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise InvalidCursor("Invalid cursor")
+
+    if not isinstance(row_id, int):
+        raise InvalidCursor("Invalid cursor")
+
+    return created_at, row_id
+
+
+# =========================
+# KEYSET QUERY
+# =========================
+
+def fetch_page(cursor, table, where="1=1", params=(), page_cursor=None, limit=None):
+    """
+    One page of `table` ordered newest first by (created_at, id).
+
+    Seeks past the cursor with a row-value comparison, so with an index on
+    (<filter columns>, created_at) every page costs the same as the first.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+
+    limit = clamp_limit(limit)
+    params = list(params)
+
+    if page_cursor:
+        created_at, row_id = decode_cursor(page_cursor)
+        where = f"({where}) AND (created_at, id) < (?, ?)"
+        params += [created_at, row_id]
+
+    cursor.execute(
+        f"""
+        SELECT * FROM {table}
+        WHERE {where}
+        ORDER BY created_at DESC, id DESC
+        LIMIT ?
+        """,
+        params + [limit + 1]
+    )
+
+    rows = [dict(row) for row in cursor.fetchall()]
+
+    next_cursor = None
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last["created_at"], last["id"])
+
+    return rows, next_cursor
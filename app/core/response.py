@@ -1,10 +1,13 @@
 from typing import Any, Optional
 
+from fastapi.responses import JSONResponse
+
 
 def success_response(
     data: Any = None,
     message: str = "Request successful",
-    count: Optional[int] = None
+    count: Optional[int] = None,
+    next_cursor: Optional[str] = None
 ):
     response = {
         "success": True,
@@ -16,6 +19,10 @@ def success_response(
     if count is not None:
         response["count"] = count
 
+    # keyset pagination: absent on the last page
+    if next_cursor is not None:
+        response["next_cursor"] = next_cursor
+
     return response
 
 
@@ -29,3 +36,35 @@ def error_response(
         "data": None,
         "error": error
     }
+
+
+def tenant_required_response():
+    """
+    422 for a call that needs a username to find its tenant's shard.
+    """
+
+    return JSONResponse(
+        status_code=422,
+        content=error_response(
+            message="username required",
+            error="tenant databases are sharded: pass the username"
+        )
+    )
+
+
+def busy_response(
+    message: str = "Server busy",
+    error: Any = None,
+    retry_after: int = 1,
+    status_code: int = 429
+):
+    """
+    error_response with a status code and Retry-After, for work that
+    was turned away rather than failed (429 queue full, 503 shed).
+    """
+
+    return JSONResponse(
+        status_code=status_code,
+        content=error_response(message=message, error=error),
+        headers={"Retry-After": str(int(retry_after))}
+    )
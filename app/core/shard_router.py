@@ -0,0 +1,231 @@
+import hashlib
+import os
+import re
+import sys
+import threading
+import zlib
+
+from app.core.db_pool import get_pool
+
+
+# =========================
+# SHARD SETTINGS
+# =========================
+#
+# off    : every tenant uses the main database file (default)
+# tenant : one sqlite file per username
+# hash   : DB_SHARD_BUCKETS files, username -> crc32 bucket
+#
+# Each shard in use has a connection pool and a writer thread; a tenant
+# that goes quiet gives both back after DB_POOL_IDLE_TIMEOUT and
+# DB_WRITER_IDLE_TIMEOUT (see db_pool and writer).
+
+SHARD_MODE = os.environ.get("DB_SHARD_MODE", "off")
+SHARD_BUCKETS = int(os.environ.get("DB_SHARD_BUCKETS", "16"))
+SHARD_DIR = os.environ.get("DB_SHARD_DIR", "")
+
+
+class ShardRouter:
+    """
+    Maps a username to the sqlite file holding that tenant's rows.
+
+    Shards get the full schema (tables, migrations, triggers) the first
+    time they are routed to. Without a username, or with sharding off,
+    the main database is used.
+    """
+
+    def __init__(self, default_path, init_schema, mode=SHARD_MODE,
+                 buckets=SHARD_BUCKETS, directory=SHARD_DIR):
+        self.default_path = default_path
+        self.init_schema = init_schema
+        self.mode = mode
+        self.buckets = buckets
+        self.directory = directory or os.path.join(
+            os.path.dirname(default_path), "shards"
+        )
+
+        self._ready = set()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.mode in ("tenant", "hash")
+
+    def shard_name(self, username):
+
+        if self.mode == "hash":
+            bucket = zlib.crc32(username.encode()) % self.buckets
+            return f"bucket_{bucket:03d}.db"
+
+        # readable but filesystem-safe; the digest keeps names unique
+        safe = re.sub(r"[^A-Za-z0-9_-]", "_", username)[:40]
+        digest = hashlib.sha1(username.encode()).hexdigest()[:8]
+
+        return f"tenant_{safe}_{digest}.db"
+
+    def shard_path(self, username):
+
+        if not self.enabled or not username:
+            return self.default_path
+
+        path = os.path.join(self.directory, self.shard_name(username))
+
+        if path not in self._ready:
+            self._prepare(path)
+
+        return path
+
+    def _prepare(self, path):
+
+        with self._lock:
+
+            if path in self._ready:
+                return
+
+            os.makedirs(self.directory, exist_ok=True)
+            self.init_schema(path)
+            self._ready.add(path)
+
+    def connection(self, username=None, reentrant=True):
+        return get_pool(self.shard_path(username)).connection(reentrant)
+
+    def shard_paths(self):
+        """
+        Every database file currently in use, main database first.
+        """
+
+        paths = [self.default_path]
+
+        if self.enabled and os.path.isdir(self.directory):
+            paths += sorted(
+                os.path.join(self.directory, name)
+                for name in os.listdir(self.directory)
+                if name.endswith(".db")
+            )
+
+        return paths
+
+
+# =========================
+# MIGRATE INTO SHARDS
+# =========================
+
+# (table, SELECT for one tenant); entries without a username belong to
+# their customer's tenant; invoice_items rows from before migration 9
+# have no username and follow their invoice's tenant
+TENANT_ROWS = [
+    ("business_settings", "SELECT * FROM business_settings WHERE username=?"),
+    ("customers", "SELECT * FROM customers WHERE username=?"),
+    ("entries", """
+        SELECT e.* FROM entries e
+        WHERE e.username=?1
+        OR (e.username IS NULL AND e.customer_id IN (
+            SELECT id FROM customers WHERE username=?1
+        ))
+    """),
+    ("invoices", "SELECT * FROM invoices WHERE username=?"),
+    ("invoice_items", """
+        SELECT * FROM invoice_items
+        WHERE username=?1
+        OR (username IS NULL AND invoice_id IN (
+            SELECT invoice_id FROM invoices WHERE username=?1
+        ))
+    """),
+    ("ai_products", "SELECT * FROM ai_products WHERE username=?"),
+]
+
+
+def _tenants(cursor):
+
+    names = set()
+
+    for table in ("customers", "entries", "invoices", "business_settings", "ai_products"):
+        try:
+            cursor.execute(f"SELECT DISTINCT username FROM {table} WHERE username IS NOT NULL")
+        except Exception:
+            continue
+        names.update(row[0] for row in cursor.fetchall())
+
+    return sorted(names)
+
+
+def migrate_to_shards(router, dry_run=False):
+    """
+    Copy each tenant's rows from the main database into its shard,
+    keeping primary keys so ids already held by clients stay valid.
+    Safe to re-run (INSERT OR IGNORE); the main database is left as is.
+    """
+
+    if not router.enabled:
+        raise RuntimeError("set DB_SHARD_MODE=tenant or hash first")
+
+    source = get_pool(router.default_path).connection()
+    report = {}
+
+    try:
+        cursor = source.cursor()
+
+        for username in _tenants(cursor):
+
+            path = router.shard_path(username)
+            copied = {}
+
+            target = get_pool(path).connection()
+
+            try:
+                target_cursor = target.cursor()
+                target_cursor.execute("BEGIN IMMEDIATE")
+
+                for table, sql in TENANT_ROWS:
+
+                    try:
+                        cursor.execute(sql, (username,))
+                    except Exception:
+                        continue
+
+                    columns = [col[0] for col in cursor.description]
+                    rows = cursor.fetchall()
+                    copied[table] = len(rows)
+
+                    if dry_run or not rows:
+                        continue
+
+                    # customer_balances follows via the entries triggers
+                    target_cursor.executemany(
+                        "INSERT OR IGNORE INTO {} ({}) VALUES ({})".format(
+                            table,
+                            ", ".join(columns),
+                            ", ".join("?" * len(columns))
+                        ),
+                        [tuple(row) for row in rows]
+                    )
+
+                if dry_run:
+                    target.rollback()
+                else:
+                    target.commit()
+
+            finally:
+                target.close()
+
+            report[username] = {"shard": os.path.basename(path), "rows": copied}
+
+    finally:
+        source.close()
+
+    return report
+
+
+if __name__ == "__main__":
+
+    # DB_SHARD_MODE=hash python -m app.core.shard_router migrate [--dry-run]
+    from database import init_database, shard_router
+
+    init_database()
+
+    if len(sys.argv) < 2 or sys.argv[1] != "migrate":
+        print("usage: python -m app.core.shard_router migrate [--dry-run]")
+        sys.exit(1)
+
+    for username, info in migrate_to_shards(shard_router, "--dry-run" in sys.argv).items():
+        print(username, "->", info["shard"], info["rows"])
@@ -0,0 +1,277 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from app.core.db_pool import open_connection
+
+
+# =========================
+# WRITER SETTINGS
+# =========================
+
+WRITER_WINDOW_MS = float(os.environ.get("DB_WRITER_WINDOW_MS", "2"))
+WRITER_MAX_BATCH = int(os.environ.get("DB_WRITER_MAX_BATCH", "256"))
+WRITER_WAIT_TIMEOUT = float(os.environ.get("DB_WRITER_WAIT_TIMEOUT", "30"))
+
+# one writer per tenant shard: a writer with no jobs for this long ends
+# its thread and closes its connection, and starts again on the next
+# submit. 0 keeps every writer running
+WRITER_IDLE_TIMEOUT = float(os.environ.get("DB_WRITER_IDLE_TIMEOUT", "300"))
+
+# returned by _collect() when the queue stayed empty for the idle timeout
+_IDLE = object()
+
+
+class WriterStopped(Exception):
+    pass
+
+
+# =========================
+# SINGLE-WRITER SERVICE
+# =========================
+
+class WriterService:
+    """
+    Serialises all writes to one database file through one connection.
+
+    Callers submit fn(conn, *args) and wait on a Future. The writer thread
+    takes the first queued job, keeps collecting for up to
+    WRITER_WINDOW_MS (or WRITER_MAX_BATCH jobs), runs each job in its own
+    SAVEPOINT and commits the whole batch once: one lock acquisition and
+    one WAL sync for many requests. A failing job only rolls back its own
+    savepoint; its caller gets the exception.
+    """
+
+    def __init__(self, path, window_ms=WRITER_WINDOW_MS, max_batch=WRITER_MAX_BATCH,
+                 idle_timeout=WRITER_IDLE_TIMEOUT):
+        self.path = path
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.idle_timeout = idle_timeout or None
+
+        self._queue = queue.Queue()
+        self._stopped = False
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._jobs = 0
+        self._failed = 0
+        self._batches = 0
+        self._last_batch = 0
+        self._max_batch_seen = 0
+        self._commit_time = 0.0
+
+    def _ensure_started(self):
+        """
+        Start the writer thread if none is running; _start_lock held.
+        """
+
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run,
+                name=f"sqlite-writer:{os.path.basename(self.path)}",
+                daemon=True
+            )
+            self._thread.start()
+
+    def submit(self, fn, *args):
+
+        if self._stopped:
+            raise WriterStopped("writer is stopped")
+
+        future = Future()
+
+        # the put and the thread check together: see the idle exit in _run()
+        with self._start_lock:
+            self._queue.put((fn, args, future))
+            self._ensure_started()
+
+        return future
+
+    def execute(self, fn, *args, timeout=WRITER_WAIT_TIMEOUT):
+        """
+        Submit and block until this job's batch is committed.
+        """
+
+        return self.submit(fn, *args).result(timeout)
+
+    def stop(self):
+        self._stopped = True
+        self._queue.put(None)
+
+    # =========================
+    # WRITER LOOP
+    # =========================
+
+    def _collect(self):
+
+        try:
+            first = self._queue.get(timeout=self.idle_timeout)
+        except queue.Empty:
+            return _IDLE
+
+        if first is None:
+            return None
+
+        batch = [first]
+        deadline = time.perf_counter() + self.window
+
+        while len(batch) < self.max_batch:
+
+            remaining = deadline - time.perf_counter()
+
+            try:
+                job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if job is None:
+                self._queue.put(None)
+                break
+
+            batch.append(job)
+
+        return batch
+
+    def _run(self):
+
+        conn = open_connection(self.path)
+
+        # transactions are driven explicitly below
+        conn.isolation_level = None
+
+        while True:
+
+            batch = self._collect()
+
+            if batch is None:
+                break
+
+            if batch is _IDLE:
+
+                # submit() queues and checks the thread under the same
+                # lock, so a job is either seen here or starts a new
+                # thread once this one is marked gone
+                with self._start_lock:
+
+                    if self._queue.empty():
+                        self._thread = None
+                        break
+
+                continue
+
+            self._write_batch(conn, batch)
+
+        conn.close()
+
+    def _write_batch(self, conn, batch):
+
+        outcomes = []
+        started = time.perf_counter()
+
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+
+            for fn, args, future in batch:
+
+                if not future.set_running_or_notify_cancel():
+                    outcomes.append(None)
+                    continue
+
+                conn.execute("SAVEPOINT job")
+
+                try:
+                    result = fn(conn, *args)
+                    conn.execute("RELEASE job")
+                    outcomes.append((True, result))
+
+                except Exception as e:
+                    conn.execute("ROLLBACK TO job")
+                    conn.execute("RELEASE job")
+                    outcomes.append((False, e))
+
+            conn.execute("COMMIT")
+
+        except Exception as e:
+
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+
+            # nothing in this batch was committed
+            outcomes = [None if outcome is None else (False, e) for outcome in outcomes]
+            outcomes += [(False, e)] * (len(batch) - len(outcomes))
+
+        elapsed = time.perf_counter() - started
+
+        with self._stats_lock:
+            self._batches += 1
+            self._jobs += len(batch)
+            self._failed += sum(1 for o in outcomes if o and not o[0])
+            self._last_batch = len(batch)
+            self._max_batch_seen = max(self._max_batch_seen, len(batch))
+            self._commit_time += elapsed
+
+        for (fn, args, future), outcome in zip(batch, outcomes):
+
+            if outcome is None:
+                continue
+
+            ok, value = outcome
+
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def stats(self):
+
+        with self._stats_lock:
+            return {
+                "path": self.path,
+                "running": self._thread is not None,
+                "queue_depth": self._queue.qsize(),
+                "jobs": self._jobs,
+                "failed_jobs": self._failed,
+                "batches": self._batches,
+                "last_batch_size": self._last_batch,
+                "max_batch_size": self._max_batch_seen,
+                "avg_batch_size": round(self._jobs / self._batches, 2) if self._batches else 0,
+                "avg_batch_ms": round(self._commit_time * 1000 / self._batches, 3) if self._batches else 0
+            }
+
+
+# =========================
+# WRITER REGISTRY
+# =========================
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(path):
+    """
+    One writer per database file (and so per shard).
+    """
+
+    key = os.path.abspath(path)
+
+    with _writers_lock:
+
+        writer = _writers.get(key)
+
+        if writer is None:
+            writer = WriterService(key)
+            _writers[key] = writer
+
+        return writer
+
+
+def writer_stats():
+
+    with _writers_lock:
+        writers = list(_writers.values())
+
+    return [writer.stats() for writer in writers]
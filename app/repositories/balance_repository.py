@@ -0,0 +1,107 @@
+import sys
+
+from database import get_db_connection, init_database
+from app.core.migrations import rebuild_customer_balances
+
+
+# rounding noise from incrementally adding REAL amounts
+TOLERANCE = 0.005
+
+
+def rebuild_balances(username=None):
+    """
+    Recompute customer_balances from entries in one transaction.
+    `username` picks the shard when DB_SHARD_MODE is on.
+    """
+
+    with get_db_connection(username=username) as conn:
+        cursor = conn.cursor()
+
+        cursor.execute("BEGIN IMMEDIATE")
+
+        rebuild_customer_balances(cursor)
+
+        cursor.execute("SELECT COUNT(*) AS total FROM customer_balances")
+
+        return {"status": "rebuilt", "rows": cursor.fetchone()["total"]}
+
+
+def verify_balances(username=None):
+    """
+    Compare customer_balances against a fresh aggregate over entries.
+    """
+
+    with get_db_connection(username=username) as conn:
+        cursor = conn.cursor()
+
+        cursor.execute("""
+        SELECT IFNULL(username, '') AS username,
+               customer_id,
+               SUM(CASE WHEN type='credit' THEN amount ELSE 0 END) AS credit_total,
+               SUM(CASE WHEN type='debit' THEN amount ELSE 0 END) AS debit_total,
+               COUNT(*) AS entry_count
+        FROM entries
+        WHERE customer_id IS NOT NULL
+        GROUP BY IFNULL(username, ''), customer_id
+        """)
+
+        expected = {
+            (row["username"], row["customer_id"]): dict(row)
+            for row in cursor.fetchall()
+        }
+
+        cursor.execute("SELECT * FROM customer_balances")
+
+        actual = {
+            (row["username"], row["customer_id"]): dict(row)
+            for row in cursor.fetchall()
+        }
+
+    mismatches = []
+
+    for key in set(expected) | set(actual):
+
+        exp = expected.get(key) or {"credit_total": 0, "debit_total": 0, "entry_count": 0}
+        act = actual.get(key) or {"credit_total": 0, "debit_total": 0, "entry_count": 0, "balance": 0}
+
+        exp_balance = exp["credit_total"] - exp["debit_total"]
+
+        if (
+            abs(exp["credit_total"] - act["credit_total"]) > TOLERANCE
+            or abs(exp["debit_total"] - act["debit_total"]) > TOLERANCE
+            or abs(exp_balance - act.get("balance", 0)) > TOLERANCE
+            or exp["entry_count"] != act["entry_count"]
+        ):
+            mismatches.append({
+                "username": key[0],
+                "customer_id": key[1],
+                "expected": exp,
+                "actual": act
+            })
+
+    return {
+        "ok": not mismatches,
+        "checked": len(expected),
+        "mismatches": mismatches
+    }
+
+
+if __name__ == "__main__":
+
+    # python -m app.repositories.balance_repository rebuild|verify [username]
+    command = sys.argv[1] if len(sys.argv) > 1 else "verify"
+    username = sys.argv[2] if len(sys.argv) > 2 else None
+
+    init_database()
+
+    if command == "rebuild":
+        print(rebuild_balances(username))
+
+    else:
+        result = verify_balances(username)
+        print(f"checked={result['checked']} mismatches={len(result['mismatches'])}")
+
+        for item in result["mismatches"]:
+            print(item)
+
+        sys.exit(0 if result["ok"] else 1)
@@ -1,8 +1,9 @@
 from database import get_db_connection
+from app.core.pagination import fetch_page
 
 
 def create_customer(username, name, phone=None, address=None):
-    with get_db_connection() as conn:
+    with get_db_connection(username=username) as conn:
         cursor = conn.cursor()
 
         cursor.execute("""
@@ -13,23 +14,23 @@ def create_customer(username, name, phone=None, address=None):
         return {"status": "success", "message": "Customer added"}
 
 
-def get_customers(username):
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-
-        cursor.execute("""
-        SELECT * FROM customers
-        WHERE username = ?
-        ORDER BY id DESC
-        """, (username,))
-
-        rows = cursor.fetchall()
-
-        return [dict(row) for row in rows]
+def get_customers(username, cursor=None, limit=None):
+    """
+    Returns (rows, next_cursor) for one keyset page.
+    """
+    with get_db_connection(username=username) as conn:
+        return fetch_page(
+            conn.cursor(),
+            "customers",
+            "username = ?",
+            (username,),
+            page_cursor=cursor,
+            limit=limit
+        )
 
 
-def delete_customer(customer_id):
-    with get_db_connection() as conn:
+def delete_customer(customer_id, username=None):
+    with get_db_connection(username=username) as conn:
         cursor = conn.cursor()
 
         cursor.execute("""
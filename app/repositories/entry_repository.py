@@ -0,0 +1,11 @@
+def insert_entry(conn, username, customer_id, entry_type, amount, note=""):
+    """
+    Writer job: insert one ledger entry on the writer's connection.
+    Runs inside the writer's batch transaction, so it must not commit.
+    """
+    cursor = conn.execute("""
+    INSERT INTO entries (username, customer_id, type, amount, note)
+    VALUES (?, ?, ?, ?, ?)
+    """, (username, customer_id, entry_type, amount, note))
+
+    return cursor.lastrowid
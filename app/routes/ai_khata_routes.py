@@ -1,5 +1,7 @@
 from fastapi import APIRouter
 from app.ai.khata_ai import khata_ai
+from app.core.response import tenant_required_response
+from database import tenant_required
 
 router = APIRouter()
 
@@ -8,7 +10,11 @@ router = APIRouter()
 def ai_khata(data: dict):
 
     question = data.get("question")
+    username = data.get("username")
 
-    result = khata_ai(question)
+    if tenant_required(username):
+        return tenant_required_response()
+
+    result = khata_ai(question, username)
 
     return result
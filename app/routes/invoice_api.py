@@ -10,7 +10,7 @@ def create_invoice(data: dict):
     customer = data.get("customer")
     items = data.get("items")
     note = data.get("note", "")
-    template = data.get("template", "1")
+    template = data.get("template")
     apply_gst = data.get("apply_gst", False)
 
     result = generate_invoice(
@@ -0,0 +1,234 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+# =========================
+# CACHE SETTINGS
+# =========================
+
+INVOICE_CACHE_MAX_MB = float(os.environ.get("INVOICE_CACHE_MAX_MB", "256"))
+
+
+def invoice_key(username, invoice_id):
+    """
+    Cache key for one invoice. Invoice numbers are per tenant, so the
+    tenant is part of the key.
+    """
+
+    return hashlib.sha1(f"{username or ''}\0{invoice_id}".encode()).hexdigest()
+
+
+# =========================
+# PDF DISK CACHE
+# =========================
+
+class InvoiceCache:
+    """
+    Size-bounded LRU over rendered invoice PDFs.
+
+    The database is the source of truth; a PDF here is only a rendering
+    of its rows, so evicting one is always safe - the download endpoint
+    renders it again on the next miss. Files live under 256 two-hex-digit
+    subdirectories (git style) so no single directory grows past a few
+    hundred entries at 100k invoices. Recency is kept in memory and
+    mirrored to the file atime (mtime stays the render time, which is
+    what Last-Modified reports), so a restarted or second worker picks
+    up a sensible eviction order from the directory itself.
+
+    PDFs from before the sharded layout sit flat in the directory as
+    <invoice_id>.pdf. They are never evicted; adopt() copies one into
+    the cache so it is served like any other.
+    """
+
+    def __init__(self, directory, max_bytes=int(INVOICE_CACHE_MAX_MB * 1024 * 1024)):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+        self._files = None
+        self._etags = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.pdf")
+
+    def legacy_path(self, invoice_id):
+        """
+        Where the flat layout kept an invoice's PDF, if it is still there.
+        """
+
+        path = os.path.join(self.directory, f"{invoice_id}.pdf")
+
+        return path if os.path.isfile(path) else None
+
+    def adopt(self, key, source):
+        """
+        Copy an existing PDF into the cache under `key`, keeping its
+        mtime (the time it was rendered); returns the cached path.
+        """
+
+        path = self.prepare(key)
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=key + ".", suffix=".tmp")
+        os.close(fd)
+
+        try:
+            shutil.copy2(source, tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        return self.put(key)
+
+    def prepare(self, key):
+        """
+        Path to render into, with its shard directory created.
+        """
+
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        return path
+
+    def _load(self):
+        """
+        Index what is already on disk, least recently used first.
+        """
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        found = []
+
+        for shard in os.scandir(self.directory):
+
+            if not shard.is_dir() or len(shard.name) != 2:
+                continue
+
+            for entry in os.scandir(shard.path):
+                if entry.is_file() and entry.name.endswith(".pdf"):
+                    stat = entry.stat()
+                    found.append((stat.st_atime, entry.name[:-4], stat.st_size))
+
+        self._files = OrderedDict()
+        self._bytes = 0
+
+        for _, key, size in sorted(found):
+            self._files[key] = size
+            self._bytes += size
+
+    def get(self, key):
+        """
+        Path of the cached PDF, or None on a miss.
+        """
+
+        path = self.path(key)
+
+        with self._lock:
+
+            if self._files is None:
+                self._load()
+
+            if key in self._files and os.path.exists(path):
+                self._files.move_to_end(key)
+                self._hits += 1
+
+                try:
+                    os.utime(path, (time.time(), os.stat(path).st_mtime))
+                except OSError:
+                    pass
+
+                return path
+
+            # evicted by another worker, or never rendered
+            self._bytes -= self._files.pop(key, 0)
+            self._etags.pop(key, None)
+            self._misses += 1
+
+            return None
+
+    def put(self, key):
+        """
+        Record a freshly written PDF and evict down to max_bytes.
+        """
+
+        size = os.path.getsize(self.path(key))
+
+        with self._lock:
+
+            if self._files is None:
+                self._load()
+
+            self._bytes -= self._files.pop(key, 0)
+            self._etags.pop(key, None)
+            self._files[key] = size
+            self._bytes += size
+
+            # never evict the file that was just written
+            while self._bytes > self.max_bytes and len(self._files) > 1:
+
+                oldest, oldest_size = self._files.popitem(last=False)
+                self._bytes -= oldest_size
+                self._etags.pop(oldest, None)
+                self._evictions += 1
+
+                try:
+                    os.remove(self.path(oldest))
+                except OSError:
+                    pass
+
+        return self.path(key)
+
+    def etag(self, key):
+        """
+        Strong ETag: a digest of the PDF bytes, computed once per file.
+        Rendering is deterministic, so a re-rendered PDF keeps its ETag.
+        """
+
+        with self._lock:
+            etag = self._etags.get(key)
+
+        if etag is None:
+
+            digest = hashlib.sha256()
+
+            with open(self.path(key), "rb") as f:
+                for block in iter(lambda: f.read(65536), b""):
+                    digest.update(block)
+
+            etag = f'"{digest.hexdigest()[:32]}"'
+
+            with self._lock:
+                if key in self._files:
+                    self._etags[key] = etag
+
+        return etag
+
+    def stats(self):
+
+        with self._lock:
+
+            lookups = self._hits + self._misses
+
+            return {
+                "directory": self.directory,
+                "files": len(self._files or ()),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0
+            }
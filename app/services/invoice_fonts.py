@@ -0,0 +1,162 @@
+import functools
+import os
+import re
+
+from app.core.features import lazy_import
+
+pdfmetrics = lazy_import("reportlab.pdfbase.pdfmetrics")
+ttfonts = lazy_import("reportlab.pdfbase.ttfonts")
+
+
+# =========================
+# FONT SETTINGS
+# =========================
+#
+# The built-in PDF fonts only cover Latin-1, so Hindi names and the
+# rupee sign come out as boxes. Invoices use one TrueType family that
+# covers Latin, Devanagari and U+20B9 instead: INVOICE_FONT /
+# INVOICE_FONT_BOLD if set, else the first candidate found in
+# INVOICE_FONT_DIRS. reportlab embeds only the glyphs a document uses
+# (subsets of 256), so a PDF grows by the characters on it, not by the
+# whole font. With no such font, invoices keep Helvetica and print
+# "Rs." for the rupee sign.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+INVOICE_FONT = os.environ.get("INVOICE_FONT", "")
+INVOICE_FONT_BOLD = os.environ.get("INVOICE_FONT_BOLD", "")
+
+INVOICE_FONT_DIRS = os.environ.get(
+    "INVOICE_FONT_DIRS",
+    os.pathsep.join([
+        os.path.abspath(os.path.join(BASE_DIR, "../../fonts")),
+        "/usr/share/fonts/truetype",
+        "/usr/share/fonts",
+        "/usr/local/share/fonts"
+    ])
+).split(os.pathsep)
+
+# (regular, bold) file names, best first; bold may be None
+FONT_CANDIDATES = [
+    ("Mukta-Regular.ttf", "Mukta-Bold.ttf"),
+    ("Hind-Regular.ttf", "Hind-Bold.ttf"),
+    ("Lohit-Devanagari.ttf", None),
+    ("FreeSans.ttf", "FreeSansBold.ttf"),
+    ("NirmalaUI.ttf", "NirmalaUIBold.ttf")
+]
+
+UNICODE_FONT = "InvoiceUnicode"
+UNICODE_FONT_BOLD = "InvoiceUnicode-Bold"
+
+RUPEE_FALLBACK = "Rs. "
+
+# scripts whose glyphs need reordering / conjuncts (shaping)
+COMPLEX_SCRIPT = re.compile("[\u0900-\u0DFF]")
+
+
+# =========================
+# DISCOVERY
+# =========================
+
+def _find(name):
+
+    for directory in INVOICE_FONT_DIRS:
+
+        if not os.path.isdir(directory):
+            continue
+
+        for root, _, files in os.walk(directory):
+            if name in files:
+                return os.path.join(root, name)
+
+    return None
+
+
+def font_files():
+    """
+    (regular, bold) paths of the invoice font, (None, None) if none.
+    """
+
+    if INVOICE_FONT:
+        return INVOICE_FONT, INVOICE_FONT_BOLD or None
+
+    for regular, bold in FONT_CANDIDATES:
+
+        path = _find(regular)
+
+        if path:
+            return path, (_find(bold) if bold else None)
+
+    return None, None
+
+
+# =========================
+# REGISTRATION
+# =========================
+
+class InvoiceFonts:
+    """
+    What the renderer needs to know about fonts: the name to use in
+    place of each built-in one, and how to prepare text for it.
+    """
+
+    def __init__(self, mapping, shaping):
+        self.mapping = mapping
+        self.shaping = shaping
+
+    @property
+    def unicode(self):
+        return bool(self.mapping)
+
+    def font(self, name):
+        return self.mapping.get(name, name)
+
+    def literal(self, text):
+        """
+        Template text as drawn: the rupee sign only survives with a
+        Unicode font.
+        """
+
+        return text if self.unicode else text.replace("₹", RUPEE_FALLBACK)
+
+    def shape(self, text, font, size):
+        """
+        Devanagari needs shaping (matras, conjuncts) when uharfbuzz is
+        installed; everything else is passed through untouched.
+        """
+
+        if not self.shaping or text.isascii() or not COMPLEX_SCRIPT.search(text):
+            return text
+
+        return ttfonts.shapeStr(text, font, size)
+
+
+@functools.lru_cache(maxsize=None)
+def invoice_fonts():
+    """
+    Parse and register the TrueType fonts once per process (the first
+    invoice a worker renders); every later invoice reuses them.
+    """
+
+    regular, bold = font_files()
+
+    if not regular:
+        return InvoiceFonts({}, shaping=False)
+
+    font = ttfonts.TTFont(UNICODE_FONT, regular)
+    pdfmetrics.registerFont(font)
+
+    bold_name = UNICODE_FONT
+
+    if bold:
+        pdfmetrics.registerFont(ttfonts.TTFont(UNICODE_FONT_BOLD, bold))
+        bold_name = UNICODE_FONT_BOLD
+
+    mapping = {
+        "Helvetica": UNICODE_FONT,
+        "Helvetica-Oblique": UNICODE_FONT,
+        "Helvetica-Bold": bold_name,
+        "Helvetica-BoldOblique": bold_name
+    }
+
+    return InvoiceFonts(mapping, shaping=font.shapable)
@@ -0,0 +1,307 @@
+import math
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app.services.invoice_cache import invoice_key
+from app.services.invoice_service import invoice_cache, render_invoice, render_invoice_bytes
+
+
+# =========================
+# RENDER POOL SETTINGS
+# =========================
+
+INVOICE_RENDER_WORKERS = int(os.environ.get("INVOICE_RENDER_WORKERS", str(os.cpu_count() or 2)))
+INVOICE_RENDER_MAX_PENDING = int(os.environ.get("INVOICE_RENDER_MAX_PENDING", "256"))
+INVOICE_JOB_HISTORY = int(os.environ.get("INVOICE_JOB_HISTORY", "10000"))
+
+
+class RenderQueueFull(Exception):
+    pass
+
+
+# =========================
+# PROCESS POOL
+# =========================
+#
+# reportlab is pure Python and holds the GIL for the whole render, so
+# threads do not help; worker processes do. Children are spawned (not
+# forked) so they never inherit sqlite connections or the writer
+# threads, and they only ever run the render functions, which do not
+# touch the database.
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+
+    global _executor
+
+    if _executor is None:
+
+        with _executor_lock:
+
+            if _executor is None:
+                _executor = ProcessPoolExecutor(
+                    max_workers=INVOICE_RENDER_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+
+    return _executor
+
+
+def _reset_executor(broken):
+    """
+    Drop a pool whose worker died (OOM kill, segfault) so the next
+    submit starts a fresh one instead of failing forever.
+    """
+
+    global _executor
+
+    with _executor_lock:
+
+        if _executor is broken:
+            _executor = None
+
+    broken.shutdown(wait=False)
+
+
+def _submit(function, *args):
+    """
+    executor.submit(), retried once on a fresh pool if the current one
+    is broken. Returns (executor, future).
+    """
+
+    executor = get_executor()
+
+    try:
+        return executor, executor.submit(function, *args)
+
+    except BrokenProcessPool:
+        _reset_executor(executor)
+        executor = get_executor()
+        return executor, executor.submit(function, *args)
+
+
+def shutdown():
+
+    global _executor
+
+    with _executor_lock:
+
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
+
+# =========================
+# JOB REGISTRY
+# =========================
+
+_jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+_pending = 0
+
+# when the last renders finished, for retry_after()
+_finished = deque(maxlen=64)
+
+
+def _finish(job, key, executor, future):
+
+    global _pending
+
+    error = future.exception()
+
+    if isinstance(error, BrokenProcessPool):
+        _reset_executor(executor)
+
+    if error is None:
+        invoice_cache.put(key)
+
+    with _jobs_lock:
+        job["state"] = "done" if error is None else "failed"
+        job["error"] = None if error is None else str(error)
+        job["finished_at"] = time.time()
+        _finished.append(job["finished_at"])
+        _pending -= 1
+
+    job["done"].set()
+
+
+def render_slots():
+    return max(INVOICE_RENDER_MAX_PENDING - _pending, 0)
+
+
+def render_queue_full():
+    return render_slots() == 0
+
+
+def retry_after():
+    """
+    Seconds until the renders waiting now are likely done, at the
+    recent completion rate (one per second per worker until known).
+    """
+
+    with _jobs_lock:
+        finished = list(_finished)
+        waiting = _pending
+
+    if len(finished) > 1 and finished[-1] > finished[0]:
+        rate = (len(finished) - 1) / (finished[-1] - finished[0])
+    else:
+        rate = INVOICE_RENDER_WORKERS
+
+    return max(1, min(math.ceil(waiting / rate), 60))
+
+
+def submit_render(invoice, items, settings):
+    """
+    Queue the PDF for an already stored invoice on the process pool.
+    Jobs are tracked by cache key (see invoice_key).
+    """
+
+    global _pending
+
+    invoice_id = invoice["invoice_id"]
+    key = invoice_key(invoice["username"], invoice_id)
+
+    with _jobs_lock:
+
+        if _pending >= INVOICE_RENDER_MAX_PENDING:
+            raise RenderQueueFull(f"{INVOICE_RENDER_MAX_PENDING} invoices already waiting")
+
+        job = {
+            "invoice_id": invoice_id,
+            "state": "queued",
+            "error": None,
+            "submitted_at": time.time(),
+            "finished_at": None,
+            "future": None,
+            "done": threading.Event()
+        }
+
+        _pending += 1
+        _jobs[key] = job
+        _jobs.move_to_end(key)
+
+        # forget the oldest finished jobs; their PDFs live on in the cache
+        while len(_jobs) > INVOICE_JOB_HISTORY:
+            oldest = next(iter(_jobs))
+            if _jobs[oldest]["state"] in ("queued", "rendering"):
+                break
+            _jobs.popitem(last=False)
+
+    args = (invoice_cache.prepare(key), invoice, items, settings)
+
+    try:
+        executor, future = _submit(render_invoice, *args)
+
+    except Exception as e:
+        with _jobs_lock:
+            job["state"] = "failed"
+            job["error"] = str(e)
+            _pending -= 1
+        job["done"].set()
+        raise
+
+    job["future"] = future
+    future.add_done_callback(lambda f: _finish(job, key, executor, f))
+
+    return job_status(key)
+
+
+def render_bytes(invoice, items, settings):
+    """
+    Render one invoice to PDF bytes on the pool, for a response body;
+    nothing is cached or tracked as a job. Counts against the same
+    INVOICE_RENDER_MAX_PENDING as stored renders (RenderQueueFull when
+    full). Returns a concurrent.futures.Future of the bytes.
+    """
+
+    global _pending
+
+    with _jobs_lock:
+
+        if _pending >= INVOICE_RENDER_MAX_PENDING:
+            raise RenderQueueFull(f"{INVOICE_RENDER_MAX_PENDING} invoices already waiting")
+
+        _pending += 1
+
+    try:
+        executor, future = _submit(render_invoice_bytes, invoice, items, settings)
+
+    except Exception:
+        with _jobs_lock:
+            _pending -= 1
+        raise
+
+    def finished(future):
+
+        global _pending
+
+        if isinstance(future.exception(), BrokenProcessPool):
+            _reset_executor(executor)
+
+        with _jobs_lock:
+            _finished.append(time.time())
+            _pending -= 1
+
+    future.add_done_callback(finished)
+
+    return future
+
+
+def job_status(key, wait=0):
+    """
+    State of a render job, optionally waiting up to `wait` seconds for
+    it to finish. None if this worker never saw the job.
+    """
+
+    with _jobs_lock:
+        job = _jobs.get(key)
+
+    if job is None:
+        return None
+
+    if wait:
+        job["done"].wait(wait)
+
+    future = job["future"]
+
+    with _jobs_lock:
+
+        state = job["state"]
+
+        if state == "queued" and future is not None and future.running():
+            state = job["state"] = "rendering"
+
+        finished = job["finished_at"]
+
+        return {
+            "invoice_id": job["invoice_id"],
+            "state": state,
+            "error": job["error"],
+            "render_ms": round((finished - job["submitted_at"]) * 1000, 1) if finished else None
+        }
+
+
+def jobs_stats():
+
+    with _jobs_lock:
+
+        states = {}
+
+        for job in _jobs.values():
+            states[job["state"]] = states.get(job["state"], 0) + 1
+
+    return {
+        "workers": INVOICE_RENDER_WORKERS,
+        "pending": _pending,
+        "max_pending": INVOICE_RENDER_MAX_PENDING,
+        "jobs": states
+    }
@@ -0,0 +1,141 @@
+import datetime
+import os
+import threading
+
+from database import get_db_writer
+
+
+# =========================
+# NUMBERING SETTINGS
+# =========================
+#
+# Ids look like INV-2026-27-00042: prefix, Indian financial year
+# (April to March), then a per-tenant counter that restarts every year.
+# Each worker reserves INVOICE_ID_BLOCK numbers per database round trip;
+# numbers reserved by a worker that exits are skipped, so set the block
+# to 1 where the books need a gap-free series.
+
+INVOICE_PREFIX = os.environ.get("INVOICE_PREFIX", "INV")
+INVOICE_ID_BLOCK = int(os.environ.get("INVOICE_ID_BLOCK", "20"))
+
+
+def financial_year(today=None):
+
+    today = today or datetime.date.today()
+    start = today.year if today.month >= 4 else today.year - 1
+
+    return f"{start}-{(start + 1) % 100:02d}"
+
+
+def format_invoice_id(fy, value, prefix=INVOICE_PREFIX):
+    return f"{prefix}-{fy}-{value:05d}"
+
+
+def reserve_block(conn, username, fy, size):
+    """
+    Writer job: claim `size` numbers for (username, fy) and return the
+    first one. One UPSERT under the write lock, so two workers can never
+    be handed overlapping blocks.
+    """
+
+    row = conn.execute(
+        """
+        INSERT INTO invoice_sequences(username, fy, next_value)
+        VALUES(?, ?, 1 + ?)
+        ON CONFLICT(username, fy) DO UPDATE SET
+            next_value = next_value + excluded.next_value - 1,
+            updated_at = CURRENT_TIMESTAMP
+        RETURNING next_value
+        """,
+        (username, fy, size)
+    ).fetchone()
+
+    return row[0] - size
+
+
+# =========================
+# ALLOCATOR
+# =========================
+
+class InvoiceNumberAllocator:
+    """
+    Hands out invoice numbers from blocks reserved in invoice_sequences.
+
+    `writer_for(username)` returns the WriterService for the tenant's
+    database, so reservations go through the same single-writer queue as
+    every other write.
+    """
+
+    def __init__(self, writer_for=get_db_writer, block_size=INVOICE_ID_BLOCK, prefix=INVOICE_PREFIX):
+        self.writer_for = writer_for
+        self.block_size = max(block_size, 1)
+        self.prefix = prefix
+
+        # (username, fy) -> [next, end), each guarded by its own lock so
+        # one tenant's reservation round trip never holds up another's
+        self._blocks = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+        self._reservations = 0
+        self._allocated = 0
+
+    def _key_lock(self, key):
+
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def allocate(self, username, count=1):
+        """
+        `count` new invoice ids for one tenant, in increasing order. A
+        batch that does not fit in what is left of the current block
+        continues in a new one, so its ids may skip the numbers other
+        workers reserved in between.
+        """
+
+        fy = financial_year()
+        key = (username, fy)
+        values = []
+        reservations = 0
+
+        with self._key_lock(key):
+
+            block = self._blocks.get(key)
+
+            while len(values) < count:
+
+                if block is None or block[0] >= block[1]:
+
+                    # a batch takes one reservation big enough for the rest of it
+                    size = max(self.block_size, count - len(values))
+                    first = self.writer_for(username).execute(reserve_block, username, fy, size)
+
+                    block = [first, first + size]
+                    self._blocks[key] = block
+                    reservations += 1
+
+                take = min(count - len(values), block[1] - block[0])
+                values.extend(range(block[0], block[0] + take))
+                block[0] += take
+
+        with self._lock:
+            self._reservations += reservations
+            self._allocated += count
+
+        return [format_invoice_id(fy, value, self.prefix) for value in values]
+
+    def next_id(self, username):
+        return self.allocate(username)[0]
+
+    def stats(self):
+
+        with self._lock:
+            return {
+                "block_size": self.block_size,
+                "allocated": self._allocated,
+                "reservations": self._reservations,
+                "cached_blocks": len(self._blocks)
+            }
+
+
+invoice_numbers = InvoiceNumberAllocator()
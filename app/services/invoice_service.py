@@ -1,11 +1,30 @@
+import functools
+import io
+import itertools
+import json
 import os
+import tempfile
 import time
-import qrcode
-
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
+from urllib.parse import quote
 
 from database import get_db_connection
+from app.core.features import lazy_import
+from app.core.in_query import select_in
+from app.services.invoice_cache import InvoiceCache, invoice_key
+from app.services.invoice_numbers import invoice_numbers
+from app.services.invoice_templates import (
+    ALIGN_METHODS,
+    TemplateFields,
+    compiled_template,
+    template_name
+)
+from app.services.settings_service import get_business_settings
+
+# reportlab loads on the first invoice, not at startup
+canvas = lazy_import("reportlab.pdfgen.canvas")
+pagesizes = lazy_import("reportlab.lib.pagesizes")
+qrencoder = lazy_import("reportlab.graphics.barcode.qrencoder")
+pdfmetrics = lazy_import("reportlab.pdfbase.pdfmetrics")
 
 
 # =========================
@@ -17,6 +36,9 @@ INVOICE_DIR = os.path.abspath(os.path.join(BASE_DIR, "../../invoices"))
 
 os.makedirs(INVOICE_DIR, exist_ok=True)
 
+# rendered PDFs are a cache over the invoices / invoice_items rows
+invoice_cache = InvoiceCache(INVOICE_DIR)
+
 
 # =========================
 # ITEM CLASS
@@ -35,125 +57,595 @@ class ItemObj:
 
 def load_business_settings(username):
 
-    with get_db_connection() as conn:
+    # read-through cache, invalidated on save (see settings_service)
+    settings = get_business_settings(username)
 
-        cur = conn.cursor()
+    if not settings:
+        return {
+            "business_name": "HisabKitab Pro",
+            "gst_number": "",
+            "phone": "",
+            "address": ""
+        }
 
-        cur.execute(
-            "SELECT * FROM business_settings WHERE username=?",
-            (username,)
+    return settings
+
+
+# =========================
+# SAVE INVOICE DB
+# =========================
+
+# business details frozen into each invoice, so later edits to the
+# settings never change an already issued PDF
+SETTINGS_SNAPSHOT_FIELDS = ("business_name", "gst_number", "phone", "address")
+
+
+def settings_snapshot(settings):
+
+    if settings is None:
+        return None
+
+    return json.dumps(
+        {key: settings.get(key, "") for key in SETTINGS_SNAPSHOT_FIELDS},
+        sort_keys=True
+    )
+
+
+def insert_invoices(cur, username, invoices, settings=None):
+    """
+    Insert prepared invoices (see prepare_invoice) and their items with
+    the caller's cursor; the caller owns the transaction.
+    """
+
+    snapshot = settings_snapshot(settings)
+    created_at = time.strftime("%Y-%m-%d %H:%M:%S")
+
+    cur.executemany(
+        """
+        INSERT INTO invoices(
+            username,
+            invoice_id,
+            customer,
+            amount,
+            gst,
+            total,
+            created_at,
+            note,
+            template,
+            apply_gst,
+            settings_json
         )
+        VALUES(?,?,?,?,?,?,?,?,?,?,?)
+        """,
+        [
+            (
+                username,
+                invoice["invoice_id"],
+                invoice["customer"],
+                invoice["amount"],
+                invoice["gst"],
+                invoice["total"],
+                created_at,
+                invoice["note"],
+                # frozen per invoice, like the settings snapshot
+                template_name(invoice["template"], settings),
+                1 if invoice["apply_gst"] else 0,
+                snapshot
+            )
+            for invoice in invoices
+        ]
+    )
 
-        row = cur.fetchone()
+    cur.executemany(
+        "INSERT INTO invoice_items(username, invoice_id, item_name, qty, price) VALUES(?,?,?,?,?)",
+        [
+            (username, invoice["invoice_id"], item.name, item.qty, item.price)
+            for invoice in invoices
+            for item in invoice["items"]
+        ]
+    )
+
+
+def save_invoice_db(
+    username,
+    invoice_id,
+    customer,
+    amount,
+    gst,
+    total,
+    items=(),
+    note=None,
+    template=None,
+    apply_gst=False,
+    settings=None
+):
+
+    invoice = {
+        "invoice_id": invoice_id,
+        "customer": customer,
+        "amount": amount,
+        "gst": gst,
+        "total": total,
+        "note": note,
+        "template": template,
+        "apply_gst": apply_gst,
+        "items": list(items)
+    }
+
+    with get_db_connection(username=username) as conn:
 
-        if not row:
-            return {
-                "business_name": "HisabKitab Pro",
-                "gst_number": "",
-                "phone": "",
-                "address": ""
-            }
+        insert_invoices(conn.cursor(), username, [invoice], settings)
 
-        return dict(row)
+        conn.commit()
 
 
 # =========================
-# SAVE INVOICE DB
+# LOAD INVOICE DB
 # =========================
 
-def save_invoice_db(username, invoice_id, customer, amount, gst, total):
+def load_invoices(invoice_ids, username):
+    """
+    {invoice_id: (invoice row, items)} for one tenant's ids that exist.
+    """
 
-    with get_db_connection() as conn:
+    found = {}
+
+    with get_db_connection(username=username) as conn:
 
         cur = conn.cursor()
 
-        cur.execute(
+        # latest row wins if an old id was ever reused; IS matches the
+        # NULL username of very old rows and still uses the index
+        for row in select_in(
+            cur,
             """
-            INSERT INTO invoices(
-                username,
-                invoice_id,
-                customer,
-                amount,
-                gst,
-                total,
-                created_at
-            )
-            VALUES(?,?,?,?,?,?,?)
+            SELECT * FROM invoices
+            WHERE username IS ? AND invoice_id IN ({})
+            ORDER BY id
             """,
-            (
-                username,
-                invoice_id,
-                customer,
-                amount,
-                gst,
-                total,
-                time.strftime("%Y-%m-%d %H:%M:%S")
-            )
+            (username,),
+            invoice_ids
+        ):
+            found[row["invoice_id"]] = (dict(row), [])
+
+        for r in select_in(
+            cur,
+            """
+            SELECT invoice_id, item_name, qty, price FROM invoice_items
+            WHERE username IS ? AND invoice_id IN ({})
+            ORDER BY invoice_id, id
+            """,
+            (username,),
+            invoice_ids
+        ):
+            if r["invoice_id"] in found:
+                found[r["invoice_id"]][1].append(
+                    ItemObj(r["item_name"], r["qty"], r["price"])
+                )
+
+    return found
+
+
+def invoice_owner(invoice_id):
+    """
+    Tenant of an invoice when the caller did not say (old download
+    links); the newest match wins. Only sees the main database.
+    """
+
+    with get_db_connection() as conn:
+
+        cur = conn.cursor()
+
+        cur.execute(
+            "SELECT username FROM invoices WHERE invoice_id=? ORDER BY id DESC LIMIT 1",
+            (invoice_id,)
         )
 
-        conn.commit()
+        row = cur.fetchone()
+
+    return (True, row["username"]) if row else (False, None)
+
+
+def load_invoice(invoice_id, username=None):
+    """
+    (invoice row, items) for one invoice, or (None, []) if unknown.
+    """
+
+    if username is None:
+
+        found, username = invoice_owner(invoice_id)
+
+        if not found:
+            return None, []
+
+    return load_invoices([invoice_id], username).get(invoice_id, (None, []))
+
+
+def invoice_settings(invoice):
+
+    if invoice.get("settings_json"):
+        return json.loads(invoice["settings_json"])
+
+    # invoices issued before snapshots were stored
+    return load_business_settings(invoice["username"])
 
 
 # =========================
-# HEADER
+# QR CODE
 # =========================
 
-def draw_header(c, settings):
+# quiet zone around the code, in modules
+QR_BORDER = 4
+
+
+@functools.lru_cache(maxsize=1024)
+def qr_runs(data):
+    """
+    (module count, dark runs as (column, row, length)) for `data`.
+    Encoding (mask selection especially) is most of the cost of a QR,
+    so it happens once per distinct payload; repeat totals reuse it.
+    """
+
+    code = qrencoder.QRCode(None, qrencoder.QRErrorCorrectLevel.L)
+    code.addData(data)
+    code.make()
+
+    runs = []
+
+    for row, modules in enumerate(code.modules):
+
+        column = 0
+
+        for dark, group in itertools.groupby(map(bool, modules)):
+
+            length = len(list(group))
+
+            if dark:
+                runs.append((column, row, length))
+
+            column += length
 
-    name = settings.get("business_name", "")
-    phone = settings.get("phone", "")
-    address = settings.get("address", "")
-    gst = settings.get("gst_number", "")
+    return code.getModuleCount(), tuple(runs)
 
-    c.setFont("Helvetica-Bold", 18)
-    c.drawString(50, 820, name)
 
-    c.setFont("Helvetica", 10)
+def draw_qr(c, data, x, y, size):
+    """
+    UPI QR as one vector path of filled runs straight onto the canvas:
+    no PNG encode, no temp file, crisp at any zoom, and none of the
+    per-module shape objects the reportlab widget builds.
+    """
 
-    if address:
-        c.drawString(50, 800, address)
+    count, runs = qr_runs(data)
+    box = size / (count + 2 * QR_BORDER)
+    top = y + size - QR_BORDER * box
 
-    if phone:
-        c.drawString(50, 785, f"Phone: {phone}")
+    path = c.beginPath()
 
-    if gst:
-        c.drawString(50, 770, f"GST: {gst}")
+    for column, row, length in runs:
+        path.rect(x + (column + QR_BORDER) * box, top - (row + 1) * box, length * box, box)
+
+    c.drawPath(path, stroke=0, fill=1)
 
 
 # =========================
-# FOOTER
+# TEMPLATE PROGRAMS
 # =========================
 
-def draw_footer(c):
+def draw_ops(c, ops, values, y=None, step=0):
+    """
+    Run compiled text ops, switching font only when it changes. Ops
+    without a fixed y are stacked downwards from `y`, `step` apart.
+    """
+
+    font = None
+
+    for op in ops:
+
+        text = op.resolve(values)
+
+        if text is None:
+            continue
+
+        if (op.font, op.size) != font:
+            font = (op.font, op.size)
+            c.setFont(*font)
+
+        if op.y is None:
+            getattr(c, op.method)(op.x, y, text)
+            y -= step
+        else:
+            getattr(c, op.method)(op.x, op.y, text)
+
+
+def define_forms(c, template, settings):
+    """
+    Parts that repeat on every page are drawn once into Form XObjects
+    and placed with doForm, so page N costs a reference, not a redraw.
+    """
+
+    c.beginForm("letterhead")
+    draw_ops(c, template.letterhead, settings)
+    c.endForm()
+
+    # column titles drawn at y=10, placed by translating to the row top
+    c.beginForm("columns")
+    c.setFont(*template.header_font)
+    for column in template.columns:
+        getattr(c, ALIGN_METHODS[column.align])(column.x, 10, column.title)
+    c.endForm()
+
+    c.beginForm("footer")
+    draw_ops(c, template.footer, settings)
+    c.endForm()
+
+
+def draw_columns(c, y):
+    c.saveState()
+    c.translate(0, y - 10)
+    c.doForm("columns")
+    c.restoreState()
+
 
-    c.setFont("Helvetica", 9)
+def draw_rows(c, template, rows, top):
+    """
+    One text object per column for the whole page: a handful of PDF
+    operators per row instead of a full drawString each.
+    """
 
-    c.drawString(200, 80, "Thank you for your business")
-    c.drawString(190, 65, "Powered by HisabKitab Pro")
+    font, size = template.row_font
+
+    for column, values in zip(template.columns, zip(*rows)):
+
+        text = c.beginText(column.x, top)
+        text.setFont(font, size)
+        text.setLeading(template.row_height)
+
+        if column.align == "left":
+
+            for value in values:
+                text.textLine(value)
+
+        else:
+
+            share = 1 if column.align == "right" else 0.5
+            y = top
+
+            for value in values:
+                text.setTextOrigin(column.x - share * pdfmetrics.stringWidth(value, font, size), y)
+                text.textOut(value)
+                y -= template.row_height
+
+        c.drawText(text)
+
+
+def finish_page(c, template, page):
+    c.doForm("footer")
+    draw_ops(c, template.page_ops, {"page": page})
 
 
 # =========================
-# GENERATE INVOICE
+# RENDER PDF
 # =========================
 
-def generate_invoice(
-    username,
+def render_invoice_bytes(invoice, items, settings):
+    """
+    Draw one invoice purely from its rows into memory. `invariant` pins
+    the PDF creation date and document id, so the same rows always
+    produce byte-identical output and a re-rendered PDF matches the
+    original.
+
+    The layout comes from the invoice's template (see invoice_templates),
+    compiled once per process. Items are laid out a page at a time: each
+    full page is emitted and compressed before the next one starts, with
+    the running total carried forward, so long wholesale invoices stay
+    linear.
+    """
+
+    template = compiled_template(template_name(invoice.get("template"), settings))
+
+    fields = TemplateFields(invoice)
+    total = invoice["total"]
+
+    qr_data = f"upi://pay?pa=test@upi&pn=HisabKitab&am={total}"
+
+    buffer = io.BytesIO()
+
+    c = canvas.Canvas(buffer, pagesize=pagesizes.A4, invariant=1, pageCompression=1)
+
+    define_forms(c, template, TemplateFields(settings))
+
+    # =========================
+    # FIRST PAGE
+    # =========================
+
+    c.doForm("letterhead")
+
+    draw_ops(c, template.details, fields)
+
+    if template.qr:
+        draw_qr(c, qr_data, *template.qr)
+
+    draw_columns(c, template.header_y)
+
+    page = 1
+    top = y = template.first_top
+    rows = []
+    running = 0
+
+    # =========================
+    # ITEM ROWS
+    # =========================
+
+    for item in items:
+
+        if y < template.bottom:
+
+            draw_rows(c, template, rows, top)
+            rows = []
+
+            if template.carried:
+                draw_ops(c, [template.carried], {"running": running}, y=y)
+
+            finish_page(c, template, page)
+            c.showPage()
+            page += 1
+
+            draw_ops(c, template.continued, fields)
+
+            draw_columns(c, template.continued_header_y)
+
+            if template.brought:
+                draw_ops(c, [template.brought], {"running": running}, y=template.next_top)
+
+            top = y = template.next_top - template.row_height
+
+        item_total = item.qty * item.price
+        running += item_total
+
+        rows.append(template.row(item.name, item.qty, item.price, item_total))
+
+        y -= template.row_height
+
+    if rows:
+        draw_rows(c, template, rows, top)
+
+    # =========================
+    # TOTALS
+    # =========================
+
+    if y - template.totals_height < template.bottom - template.row_height:
+
+        finish_page(c, template, page)
+        c.showPage()
+        page += 1
+
+        draw_ops(c, template.continued, fields)
+
+        y = template.next_top
+
+    if template.rule:
+        c.line(template.rule[0], y, template.rule[1], y)
+
+    draw_ops(c, template.totals, fields, y=y - template.row_height, step=template.row_height)
+
+    finish_page(c, template, page)
+
+    c.save()
+
+    return buffer.getvalue()
+
+
+def render_invoice(pdf_path, invoice, items, settings):
+    """
+    Render and store at pdf_path: one write, swapped in atomically so a
+    concurrent download never sees a half-written file.
+    """
+
+    pdf = render_invoice_bytes(invoice, items, settings)
+
+    # unique per call: threads of one process may render the same key
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(pdf_path) or ".",
+        prefix=os.path.basename(pdf_path) + ".",
+        suffix=".tmp"
+    )
+
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(pdf)
+
+        os.replace(tmp_path, pdf_path)
+
+    finally:
+
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# =========================
+# CACHED PDF
+# =========================
+
+def download_path(username, invoice_id):
+    return f"invoice/download/{quote(invoice_id)}?username={quote(username or '')}"
+
+
+def cache_invoice(invoice, items, settings):
+    """
+    Render a stored invoice into the cache; returns the cache key.
+    """
+
+    key = invoice_key(invoice["username"], invoice["invoice_id"])
+
+    render_invoice(invoice_cache.prepare(key), invoice, items, settings)
+    invoice_cache.put(key)
+
+    return key
+
+
+def resolve_invoice_pdf(invoice_id, username=None):
+    """
+    (cache key, path) of the invoice PDF, re-rendering it from the
+    database when it was evicted. (None, None) if there is no such
+    invoice. With a username a cache hit needs no database access.
+    Invoices issued before settings snapshots were stored keep the PDF
+    the flat layout wrote, which is copied into the cache instead: their
+    rows lack the items, note and settings to draw it again, so without
+    that file the path is None.
+    """
+
+    if username is None:
+
+        found, username = invoice_owner(invoice_id)
+
+        if not found:
+            return None, None
+
+    key = invoice_key(username, invoice_id)
+    path = invoice_cache.get(key)
+
+    if path:
+        return key, path
+
+    invoice, items = load_invoices([invoice_id], username).get(invoice_id, (None, []))
+
+    if invoice is None:
+        return None, None
+
+    if not invoice.get("settings_json") or not items:
+
+        legacy = invoice_cache.legacy_path(invoice_id)
+
+        return key, invoice_cache.adopt(key, legacy) if legacy else None
+
+    cache_invoice(invoice, items, invoice_settings(invoice))
+
+    return key, invoice_cache.path(key)
+
+
+def invoice_pdf(invoice_id, username=None):
+    return resolve_invoice_pdf(invoice_id, username)[1]
+
+
+# =========================
+# PREPARE INVOICE
+# =========================
+
+def prepare_invoice(
+    invoice_id,
     customer_name,
     items,
-    template="1",
+    template=None,
     apply_gst=False,
     note=None
 ):
+    """
+    Totals and item objects for one invoice, ready for insert_invoices.
+    """
 
     if not items:
         raise Exception("Invoice items missing")
 
-    settings = load_business_settings(username)
-
-    invoice_id = f"INV-{int(time.time())}"
-
-    pdf_path = os.path.join(INVOICE_DIR, f"{invoice_id}.pdf")
-
     # convert items
 
     item_objects = []
@@ -180,98 +672,136 @@ def generate_invoice(
 
     total = amount + gst
 
+    return {
+        "invoice_id": invoice_id,
+        "customer": customer_name,
+        "amount": amount,
+        "gst": gst,
+        "total": total,
+        "note": note,
+        "template": template,
+        "apply_gst": apply_gst,
+        "items": item_objects
+    }
 
-    # =========================
-    # QR CODE
-    # =========================
-
-    qr_data = f"upi://pay?pa=test@upi&pn=HisabKitab&am={total}"
-
-    qr = qrcode.make(qr_data)
-
-    qr_path = os.path.join(INVOICE_DIR, f"{invoice_id}.png")
-
-    qr.save(qr_path)
-
-
-    # =========================
-    # CREATE PDF
-    # =========================
-
-    c = canvas.Canvas(pdf_path, pagesize=A4)
-
-    draw_header(c, settings)
-
-    c.setFont("Helvetica-Bold", 16)
-
-    c.drawString(240, 820, "TAX INVOICE")
 
-    c.setFont("Helvetica", 11)
+# =========================
+# CREATE INVOICE RECORD
+# =========================
 
-    c.drawString(50, 740, f"Invoice : {invoice_id}")
-    c.drawString(50, 720, f"Customer : {customer_name}")
+def create_invoice_record(
+    username,
+    customer_name,
+    items,
+    template=None,
+    apply_gst=False,
+    note=None
+):
+    """
+    Store the invoice, its items and the settings snapshot. Returns
+    (invoice row, items, settings) - everything render_invoice needs.
+    """
 
-    if note:
+    if not items:
+        raise Exception("Invoice items missing")
 
-        c.drawString(50, 700, f"Note : {note}")
+    invoice = prepare_invoice(
+        invoice_numbers.next_id(username),
+        customer_name,
+        items,
+        template=template,
+        apply_gst=apply_gst,
+        note=note
+    )
 
-    y = 640
+    settings = load_business_settings(username)
 
-    c.setFont("Helvetica-Bold", 11)
+    with get_db_connection(username=username) as conn:
 
-    c.drawString(50, y, "Item")
-    c.drawString(250, y, "Qty")
-    c.drawString(320, y, "Price")
-    c.drawString(400, y, "Total")
+        insert_invoices(conn.cursor(), username, [invoice], settings)
 
-    y -= 30
+        conn.commit()
 
-    c.setFont("Helvetica", 10)
+    # render from the stored rows (not the request), exactly as a later
+    # cache miss would
+    stored, stored_items = load_invoice(invoice["invoice_id"], username)
 
-    for item in item_objects:
+    return stored, stored_items, invoice_settings(stored)
 
-        item_total = item.qty * item.price
 
-        c.drawString(50, y, item.name)
-        c.drawString(250, y, str(item.qty))
-        c.drawString(320, y, str(item.price))
-        c.drawString(400, y, str(item_total))
+def create_invoice_batch(username, specs):
+    """
+    Store many invoices for one tenant: settings are read once and every
+    invoices / invoice_items row goes in under a single transaction.
+    Returns [(invoice row, items, settings)] in request order.
+    """
 
-        y -= 20
+    settings = load_business_settings(username)
 
-    c.line(50, y, 500, y)
+    # consecutive numbers for the whole batch, one reservation
+    invoice_ids = invoice_numbers.allocate(username, len(specs))
+
+    invoices = [
+        prepare_invoice(
+            invoice_id,
+            spec["customer_name"],
+            spec["items"],
+            template=spec.get("template"),
+            apply_gst=spec.get("apply_gst", False),
+            note=spec.get("note")
+        )
+        for invoice_id, spec in zip(invoice_ids, specs)
+    ]
 
-    c.drawString(320, y - 20, f"Subtotal : ₹{amount}")
+    with get_db_connection(username=username) as conn:
 
-    if gst:
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
 
-        c.drawString(320, y - 40, f"GST : ₹{gst}")
+        insert_invoices(cur, username, invoices, settings)
 
-    else:
+        conn.commit()
 
-        c.drawString(320, y - 40, "GST : Not Applied")
+    stored = load_invoices(invoice_ids, username)
 
-    c.drawString(320, y - 60, f"Total : ₹{total}")
+    return [
+        (stored[i][0], stored[i][1], invoice_settings(stored[i][0]))
+        for i in invoice_ids
+    ]
 
-    c.drawImage(qr_path, 450, 740, width=100, height=100)
 
-    draw_footer(c)
+# =========================
+# GENERATE INVOICE
+# =========================
 
-    c.save()
+def generate_invoice(
+    username,
+    customer_name,
+    items,
+    template=None,
+    apply_gst=False,
+    note=None
+):
+    """
+    Store and render in the calling thread. The API queues the render
+    on the process pool instead (see invoice_jobs).
+    """
 
-    save_invoice_db(
+    invoice, stored_items, settings = create_invoice_record(
         username,
-        invoice_id,
         customer_name,
-        amount,
-        gst,
-        total
+        items,
+        template=template,
+        apply_gst=apply_gst,
+        note=note
     )
 
+    cache_invoice(invoice, stored_items, settings)
+
     return {
 
-        "invoice_id": invoice_id,
+        "invoice_id": invoice["invoice_id"],
 
-        "file_path": f"invoices/{invoice_id}.pdf"
+        "file_path": download_path(username, invoice["invoice_id"])
 
     }
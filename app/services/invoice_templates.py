@@ -0,0 +1,325 @@
+import functools
+import glob
+import json
+import os
+
+from app.services.invoice_fonts import invoice_fonts
+
+
+# =========================
+# TEMPLATE SETTINGS
+# =========================
+#
+# An invoice template is plain data (JSON-compatible), so new layouts
+# need no drawing code. Each one is compiled once per process into flat
+# drawing programs; the renderer in invoice_service only runs them.
+# Extra templates can be dropped into INVOICE_TEMPLATE_DIR as
+# <name>.json and are selected by that name.
+
+INVOICE_TEMPLATE_DIR = os.environ.get("INVOICE_TEMPLATE_DIR", "")
+
+DEFAULT_TEMPLATE = "1"
+
+
+# =========================
+# BUILT-IN TEMPLATES
+# =========================
+#
+# Text elements: {"text": format string, "x", "y", "font", "size"},
+# optional "align" (left / right / centre), "if" (a field that must be
+# set) and "else" (text used when it is not). Letterhead fields come
+# from the business settings, details from the invoice, rows from the
+# item (name, qty, price, total).
+
+CLASSIC = {
+    "letterhead": [
+        {"text": "{business_name}", "x": 50, "y": 820, "font": "Helvetica-Bold", "size": 18},
+        {"text": "{address}", "x": 50, "y": 800, "font": "Helvetica", "size": 10, "if": "address"},
+        {"text": "Phone: {phone}", "x": 50, "y": 785, "font": "Helvetica", "size": 10, "if": "phone"},
+        {"text": "GST: {gst_number}", "x": 50, "y": 770, "font": "Helvetica", "size": 10, "if": "gst_number"},
+        {"text": "TAX INVOICE", "x": 240, "y": 820, "font": "Helvetica-Bold", "size": 16}
+    ],
+    "details": [
+        {"text": "Invoice : {invoice_id}", "x": 50, "y": 740, "font": "Helvetica", "size": 11},
+        {"text": "Customer : {customer}", "x": 50, "y": 720, "font": "Helvetica", "size": 11},
+        {"text": "Note : {note}", "x": 50, "y": 700, "font": "Helvetica", "size": 11, "if": "note"}
+    ],
+    "continued": [
+        {"text": "Invoice : {invoice_id} (continued)", "x": 50, "y": 800, "font": "Helvetica-Bold", "size": 11}
+    ],
+    "qr": {"x": 450, "y": 740, "size": 100},
+    "table": {
+        "header_y": 640,
+        "continued_header_y": 780,
+        "first_top": 610,
+        "next_top": 750,
+        "bottom": 140,
+        "row_height": 20,
+        "header_font": ["Helvetica-Bold", 11],
+        "font": ["Helvetica", 10],
+        "columns": [
+            {"title": "Item", "x": 50, "value": "{name}"},
+            {"title": "Qty", "x": 250, "value": "{qty}"},
+            {"title": "Price", "x": 320, "value": "{price}"},
+            {"title": "Total", "x": 400, "value": "{total}"}
+        ],
+        "carried": {"text": "Carried forward : {running:.2f}", "x": 320, "font": "Helvetica-Bold", "size": 10},
+        "brought": {"text": "Brought forward : {running:.2f}", "x": 320, "font": "Helvetica-Bold", "size": 10}
+    },
+    "totals": {
+        "rule": [50, 500],
+        "lines": [
+            {"text": "Subtotal : ₹{amount}", "x": 320, "font": "Helvetica", "size": 10},
+            {"text": "GST : ₹{gst}", "else": "GST : Not Applied", "if": "gst", "x": 320, "font": "Helvetica", "size": 10},
+            {"text": "Total : ₹{total}", "x": 320, "font": "Helvetica", "size": 10}
+        ]
+    },
+    "footer": [
+        {"text": "Thank you for your business", "x": 200, "y": 80, "font": "Helvetica", "size": 9},
+        {"text": "Powered by HisabKitab Pro", "x": 190, "y": 65, "font": "Helvetica", "size": 9},
+        {"text": "Page {page}", "x": 545, "y": 40, "font": "Helvetica", "size": 8, "align": "right", "per_page": True}
+    ]
+}
+
+# denser rows and right-aligned amounts, for long wholesale bills
+COMPACT = {
+    "letterhead": [
+        {"text": "{business_name}", "x": 40, "y": 810, "font": "Helvetica-Bold", "size": 16},
+        {"text": "{address}", "x": 40, "y": 794, "font": "Helvetica", "size": 9, "if": "address"},
+        {"text": "Phone: {phone}", "x": 40, "y": 782, "font": "Helvetica", "size": 9, "if": "phone"},
+        {"text": "GSTIN: {gst_number}", "x": 40, "y": 770, "font": "Helvetica", "size": 9, "if": "gst_number"},
+        {"text": "TAX INVOICE", "x": 555, "y": 810, "font": "Helvetica-Bold", "size": 14, "align": "right"}
+    ],
+    "details": [
+        {"text": "{invoice_id}", "x": 555, "y": 794, "font": "Helvetica", "size": 10, "align": "right"},
+        {"text": "Bill to : {customer}", "x": 40, "y": 745, "font": "Helvetica-Bold", "size": 10},
+        {"text": "{note}", "x": 40, "y": 731, "font": "Helvetica-Oblique", "size": 9, "if": "note"}
+    ],
+    "continued": [
+        {"text": "{invoice_id} (continued)", "x": 40, "y": 810, "font": "Helvetica-Bold", "size": 10}
+    ],
+    "qr": {"x": 475, "y": 700, "size": 80},
+    "table": {
+        "header_y": 680,
+        "continued_header_y": 790,
+        "first_top": 662,
+        "next_top": 772,
+        "bottom": 110,
+        "row_height": 14,
+        "header_font": ["Helvetica-Bold", 9],
+        "font": ["Helvetica", 9],
+        "columns": [
+            {"title": "Item", "x": 40, "value": "{name}"},
+            {"title": "Qty", "x": 360, "value": "{qty:g}", "align": "right"},
+            {"title": "Rate", "x": 450, "value": "{price:.2f}", "align": "right"},
+            {"title": "Amount", "x": 555, "value": "{total:.2f}", "align": "right"}
+        ],
+        "carried": {"text": "Carried forward : {running:.2f}", "x": 555, "font": "Helvetica-Bold", "size": 9, "align": "right"},
+        "brought": {"text": "Brought forward : {running:.2f}", "x": 555, "font": "Helvetica-Bold", "size": 9, "align": "right"}
+    },
+    "totals": {
+        "rule": [40, 555],
+        "lines": [
+            {"text": "Subtotal : {amount:.2f}", "x": 555, "font": "Helvetica", "size": 9, "align": "right"},
+            {"text": "GST 18% : {gst:.2f}", "if": "gst", "x": 555, "font": "Helvetica", "size": 9, "align": "right"},
+            {"text": "Total : {total:.2f}", "x": 555, "font": "Helvetica-Bold", "size": 11, "align": "right"}
+        ]
+    },
+    "footer": [
+        {"text": "Powered by HisabKitab Pro", "x": 40, "y": 40, "font": "Helvetica", "size": 7},
+        {"text": "Page {page}", "x": 555, "y": 40, "font": "Helvetica", "size": 7, "align": "right", "per_page": True}
+    ]
+}
+
+TEMPLATES = {
+    "1": CLASSIC,
+    "2": COMPACT
+}
+
+
+def _load_template_dir():
+
+    if not INVOICE_TEMPLATE_DIR:
+        return
+
+    for path in sorted(glob.glob(os.path.join(INVOICE_TEMPLATE_DIR, "*.json"))):
+
+        with open(path, encoding="utf-8") as f:
+            TEMPLATES[os.path.splitext(os.path.basename(path))[0]] = json.load(f)
+
+
+_load_template_dir()
+
+
+# =========================
+# SELECTION
+# =========================
+
+def template_name(template=None, settings=None):
+    """
+    The template an invoice uses: the one asked for, else the tenant's
+    default_template, else the classic layout. Unknown names fall back
+    rather than fail an invoice.
+    """
+
+    for name in (template, (settings or {}).get("default_template")):
+        if name and str(name) in TEMPLATES:
+            return str(name)
+
+    return DEFAULT_TEMPLATE
+
+
+class TemplateFields(dict):
+    """
+    Values for a template's format strings; absent or NULL fields
+    render as empty text.
+    """
+
+    def __init__(self, values):
+        super().__init__((key, value) for key, value in values.items() if value is not None)
+
+    def __missing__(self, key):
+        return ""
+
+
+# =========================
+# COMPILE
+# =========================
+
+ALIGN_METHODS = {
+    "left": "drawString",
+    "right": "drawRightString",
+    "centre": "drawCentredString",
+    "center": "drawCentredString"
+}
+
+
+class TextOp:
+    """
+    One compiled text element. `when` gates it on a field; `otherwise`
+    is drawn instead when that field is empty.
+    """
+
+    __slots__ = ("font", "size", "x", "y", "method", "text", "when", "otherwise", "shape")
+
+    def __init__(self, element, name, fonts):
+
+        for key in ("text", "x", "font", "size"):
+            if key not in element:
+                raise ValueError(f"invoice template {name!r}: element {element!r} lacks {key!r}")
+
+        align = element.get("align", "left")
+
+        if align not in ALIGN_METHODS:
+            raise ValueError(f"invoice template {name!r}: unknown align {align!r}")
+
+        self.font = fonts.font(element["font"])
+        self.size = element["size"]
+        self.x = element["x"]
+        self.y = element.get("y")
+        self.method = ALIGN_METHODS[align]
+        self.text = fonts.literal(element["text"])
+        self.when = element.get("if")
+        self.otherwise = fonts.literal(element["else"]) if element.get("else") else None
+        self.shape = fonts.shape
+
+    def resolve(self, values):
+        """
+        Text to draw for these values, or None to skip the element.
+        """
+
+        if self.when and not values.get(self.when):
+            return self.otherwise
+
+        return self.shape(self.text.format_map(values), self.font, self.size)
+
+
+class Column:
+
+    __slots__ = ("title", "x", "align", "value")
+
+    def __init__(self, column, name, fonts):
+
+        align = column.get("align", "left")
+
+        if align not in ALIGN_METHODS:
+            raise ValueError(f"invoice template {name!r}: unknown align {align!r}")
+
+        self.title = fonts.literal(column["title"])
+        self.x = column["x"]
+        self.align = align
+        self.value = column["value"]
+
+
+class CompiledTemplate:
+    """
+    A template turned into flat op lists and page geometry, with fonts
+    already swapped for the registered Unicode ones (see invoice_fonts).
+    Compiling checks every element once, so a bad template fails on its
+    first invoice with a clear message instead of halfway through a page.
+    """
+
+    def __init__(self, name, spec, fonts):
+
+        self.name = name
+        self.fonts = fonts
+
+        def ops(key):
+            return [TextOp(element, name, fonts) for element in spec.get(key, [])]
+
+        self.letterhead = ops("letterhead")
+        self.details = ops("details")
+        self.continued = ops("continued")
+
+        footer = spec.get("footer", [])
+        self.footer = [TextOp(e, name, fonts) for e in footer if not e.get("per_page")]
+        self.page_ops = [TextOp(e, name, fonts) for e in footer if e.get("per_page")]
+
+        qr = spec.get("qr")
+        self.qr = (qr["x"], qr["y"], qr["size"]) if qr else None
+
+        table = spec["table"]
+
+        self.header_y = table["header_y"]
+        self.continued_header_y = table["continued_header_y"]
+        self.first_top = table["first_top"]
+        self.next_top = table["next_top"]
+        self.bottom = table["bottom"]
+        self.row_height = table["row_height"]
+        self.header_font = (fonts.font(table["header_font"][0]), table["header_font"][1])
+        self.row_font = (fonts.font(table["font"][0]), table["font"][1])
+        self.columns = [Column(column, name, fonts) for column in table["columns"]]
+
+        # value format strings joined once; rows split the result
+        self.row_format = "\0".join(column.value for column in self.columns)
+
+        self.carried = TextOp(table["carried"], name, fonts) if table.get("carried") else None
+        self.brought = TextOp(table["brought"], name, fonts) if table.get("brought") else None
+
+        totals = spec.get("totals", {})
+
+        self.rule = tuple(totals.get("rule", ()))
+        self.totals = [TextOp(line, name, fonts) for line in totals.get("lines", [])]
+
+        # room the totals block needs under the last row
+        self.totals_height = (len(self.totals) + 0.5) * self.row_height
+
+    def row(self, name, qty, price, total):
+
+        values = self.row_format.format(name=name, qty=qty, price=price, total=total).split("\0")
+
+        if self.fonts.shaping:
+            font, size = self.row_font
+            values = [self.fonts.shape(value, font, size) for value in values]
+
+        return values
+
+
+@functools.lru_cache(maxsize=None)
+def compiled_template(name):
+    """
+    Compiled once per process (after the fonts are registered); every
+    later invoice reuses the program.
+    """
+
+    return CompiledTemplate(name, TEMPLATES[name], invoice_fonts())
@@ -0,0 +1,180 @@
+import os
+import threading
+
+from app.core.features import lazy_import
+from app.services.ocr_preprocess import OCR_TARGET_DPI
+
+pdfium = lazy_import("pypdfium2")
+
+
+# =========================
+# BATCH SETTINGS
+# =========================
+#
+# One bill can arrive as several photos of a long receipt, or as a
+# multi-page PDF from a wholesale supplier. Every image, and every PDF
+# page, is read as a separate page on the OCR pool. PDF pages are
+# rendered straight to grayscale at OCR_TARGET_DPI, so preprocessing has
+# nothing left to scale. Rendering needs pypdfium2 (optional, like
+# tesseract); without it PDFs are refused and images still work.
+#
+# pdfium is not thread-safe, and concurrent batches pull their pages on
+# whatever executor thread is free, so every pdfium call goes through
+# _pdfium_lock. A page render holds it for tens of milliseconds; OCR of
+# the page, the slow part, runs outside it.
+
+OCR_BATCH_MAX_PAGES = int(os.environ.get("OCR_BATCH_MAX_PAGES", "20"))
+
+PDF_MAGIC = b"%PDF-"
+
+_pdfium_lock = threading.Lock()
+
+
+def is_pdf(contents):
+    return contents[:len(PDF_MAGIC)] == PDF_MAGIC
+
+
+def _pdf_page_count(contents):
+
+    with _pdfium_lock:
+
+        document = pdfium.PdfDocument(contents)
+
+        try:
+            return len(document)
+        finally:
+            document.close()
+
+
+def page_labels(uploads):
+    """
+    (label, photo) for every page of the (filename, contents) uploads,
+    in reading order: ("file", True) for an image, ("file#n", False)
+    for a PDF page. Raises ValueError for an empty batch, an unreadable
+    PDF or more than OCR_BATCH_MAX_PAGES pages.
+    """
+
+    labels = []
+
+    for filename, contents in uploads:
+
+        if not contents:
+            raise ValueError(f"{filename}: empty file")
+
+        if not is_pdf(contents):
+            labels.append((filename, True))
+            continue
+
+        try:
+            count = _pdf_page_count(contents)
+
+        except ImportError:
+            raise ValueError("PDF bills need pypdfium2 installed on the server")
+
+        except Exception as e:
+            raise ValueError(f"{filename}: unreadable PDF ({e})")
+
+        labels.extend((f"{filename}#{n}", False) for n in range(1, count + 1))
+
+    if not labels:
+        raise ValueError("no pages")
+
+    if len(labels) > OCR_BATCH_MAX_PAGES:
+        raise ValueError(f"{len(labels)} pages, at most {OCR_BATCH_MAX_PAGES} per batch")
+
+    return labels
+
+
+def iter_pages(uploads):
+    """
+    Pages in the order of page_labels(): image uploads as they are,
+    PDF pages rendered one at a time as they are pulled.
+    """
+
+    for _, contents in uploads:
+
+        if not is_pdf(contents):
+            yield contents
+            continue
+
+        with _pdfium_lock:
+            document = pdfium.PdfDocument(contents)
+            count = len(document)
+
+        try:
+            for index in range(count):
+                yield _render_page(document, index)
+
+        finally:
+            with _pdfium_lock:
+                document.close()
+
+
+def _render_page(document, index):
+
+    with _pdfium_lock:
+
+        page = document[index]
+
+        try:
+            bitmap = page.render(scale=OCR_TARGET_DPI / 72, grayscale=True)
+
+            # to_pil() shares the bitmap's buffer: copy it out, so the
+            # bitmap is freed here, under the lock, not by a later GC
+            try:
+                return bitmap.to_pil().copy()
+            finally:
+                bitmap.close()
+
+        finally:
+            page.close()
+
+
+# =========================
+# MERGE
+# =========================
+
+def _overlap(previous, current):
+    """
+    Items repeated where two photos of one long receipt overlap: the
+    longest tail of `previous` that `current` starts with.
+    """
+
+    def lines(items):
+        return [(item["name"], item["amount"]) for item in items]
+
+    previous, current = lines(previous), lines(current)
+
+    for size in range(min(len(previous), len(current)), 0, -1):
+        if previous[-size:] == current[:size]:
+            return size
+
+    return 0
+
+
+def merge_pages(pages):
+    """
+    One (items, total) from (items, printed total or None, photo) per
+    page, in page order. Lines shared by consecutive photos (shots of one
+    long receipt overlap) are kept once; PDF pages never overlap. The bill
+    total is the largest total printed on any page (the grand total comes
+    last, page subtotals are smaller), else the sum of the merged items.
+    """
+
+    items = []
+    totals = []
+    previous = []
+
+    for page_items, page_total, photo in pages:
+
+        skip = _overlap(previous, page_items) if photo else 0
+
+        items.extend(page_items[skip:])
+        previous = page_items if photo else []
+
+        if page_total is not None:
+            totals.append(page_total)
+
+    total = max(totals) if totals else sum(item["amount"] for item in items)
+
+    return items, total
@@ -0,0 +1,191 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from app.core.features import lazy_import
+
+Image = lazy_import("PIL.Image")
+
+
+# =========================
+# OCR CACHE SETTINGS
+# =========================
+#
+# The same bill photo is often uploaded twice: a shopkeeper taps again,
+# or a phone retries on a flaky connection and re-sends the whole image.
+# Each upload is remembered by its content hash, and by a perceptual
+# hash of the preprocessed image so that a recompressed copy of the
+# same photo (as chat apps forward it) is recognised too. A repeat is
+# answered from here without running tesseract, and the endpoints do
+# not write it to the ledger twice. The cache is process-local and
+# bounded to OCR_CACHE_ENTRIES, least recently used evicted first.
+
+OCR_CACHE_ENTRIES = int(os.environ.get("OCR_CACHE_ENTRIES", "1024"))
+
+# max differing bits (of HASH_SIZE * HASH_SIZE) for two uploads to count
+# as the same bill; 0 turns near-duplicate matching off. Bills from one
+# shop share a layout and differ only in a few lines, so this is kept
+# tight: it catches a recompressed copy of the same photo, not a
+# second photo of the bill. A false match would drop a real entry.
+OCR_DUPLICATE_DISTANCE = int(os.environ.get("OCR_DUPLICATE_DISTANCE", "4"))
+
+HASH_SIZE = 16
+
+
+def content_key(scope, contents):
+    """
+    Cache key of one upload. `scope` says who read it and how (endpoint,
+    tenant, ...), so one tenant's upload is never a duplicate of another's.
+    """
+
+    if not isinstance(contents, bytes):
+        # an already decoded page, e.g. rendered from a PDF
+        contents = contents.tobytes()
+
+    return scope, hashlib.sha256(contents).hexdigest()
+
+
+def dhash(image):
+    """
+    Difference hash: one bit per horizontally adjacent pair of cells of
+    a HASH_SIZE grid, set where brightness falls. Taken on the
+    preprocessed image (cropped, level, black on white), so it survives
+    recompression of the same photo.
+    """
+
+    small = image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.BOX)
+    pixels = small.tobytes()
+
+    bits = 0
+
+    for row in range(HASH_SIZE):
+
+        offset = row * (HASH_SIZE + 1)
+
+        for col in range(HASH_SIZE):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+
+    return bits
+
+
+# =========================
+# CACHE
+# =========================
+
+class OcrCache:
+    """
+    LRU of OCR results by content key, with a perceptual hash kept per
+    entry for the near-duplicate search. Entries hold the OCR text and
+    the endpoint's parse result, never the image.
+    """
+
+    def __init__(self, max_entries=OCR_CACHE_ENTRIES, distance=OCR_DUPLICATE_DISTANCE):
+        self.max_entries = max_entries
+        self.distance = distance
+
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._similar = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key):
+        """
+        Cached {"text", "parsed"} for exactly this upload, or None.
+        """
+
+        with self._lock:
+
+            entry = self._data.get(key)
+
+            if entry is None:
+                self._misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self._hits += 1
+
+            return entry[1]
+
+    def similar(self, key, fingerprint):
+        """
+        Cached result of an earlier upload in the same scope whose
+        perceptual hash is within `distance` bits, or None. A hit is
+        also stored under `key`, so a retry of this upload is exact.
+        """
+
+        if not self.distance or fingerprint is None:
+            return None
+
+        scope = key[0]
+
+        with self._lock:
+
+            best, best_distance = None, self.distance + 1
+
+            # a linear scan: max_entries XORs is microseconds next to OCR
+            for (entry_scope, _), (entry_fingerprint, value) in self._data.items():
+
+                if entry_scope != scope or entry_fingerprint is None:
+                    continue
+
+                distance = (entry_fingerprint ^ fingerprint).bit_count()
+
+                if distance < best_distance:
+                    best, best_distance = value, distance
+
+            if best is None:
+                return None
+
+            self._similar += 1
+
+        self.put(key, fingerprint, best)
+
+        return best
+
+    def put(self, key, fingerprint, value):
+
+        with self._lock:
+
+            self._data[key] = (fingerprint, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, key):
+        """
+        Forget one upload, e.g. when its result was never recorded.
+        """
+
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+
+        with self._lock:
+
+            lookups = self._hits + self._misses
+
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "distance": self.distance,
+                "hits": self._hits,
+                "similar": self._similar,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": round((self._hits + self._similar) / lookups, 4) if lookups else 0
+            }
+
+
+ocr_cache = OcrCache()
@@ -0,0 +1,508 @@
+import difflib
+import re
+import statistics
+
+
+# =========================
+# EXTRACTION SETTINGS
+# =========================
+#
+# Reading a bill line by line from plain OCR text loses the layout: a
+# quantity is taken for the price, a phone number for the total. One
+# image_to_data pass gives every word with its box and confidence, so
+# the bill can be read as a table instead: words are grouped into rows
+# by their vertical position and into cells by the gaps between them,
+# numeric cells are assigned to qty / price / amount columns by where
+# they sit, and the grand total is taken from its labelled row.
+
+# labels, letters only and lower case; matched fuzzily (OCR drops and
+# swaps letters)
+HEADER_ROLES = {
+    "item": "name", "items": "name", "particulars": "name", "description": "name",
+    "product": "name", "qty": "qty", "quantity": "qty", "nos": "qty",
+    "rate": "price", "price": "price", "mrp": "price",
+    "amount": "amount", "amt": "amount", "value": "amount", "total": "amount"
+}
+
+GRAND_TOTAL_LABELS = [
+    "grandtotal", "nettotal", "netamount", "totalamount", "amountpayable",
+    "netpayable", "billamount", "totalpayable"
+]
+
+TOTAL_LABELS = ["total"]
+SUBTOTAL_LABELS = ["subtotal"]
+
+# rows that carry numbers but are not items; matched exactly (letters
+# only), since "cash" is a few letters from "cashew"
+SKIP_LABELS = {
+    "gst", "cgst", "sgst", "igst", "tax", "vat", "discount", "roundoff",
+    "cash", "change", "paid", "balance", "tendered", "billno", "invoiceno",
+    "ph", "phone", "mob", "mobile", "gstin", "date", "time", "token", "table",
+    "totalqty", "totalitems", "items", "savings"
+}
+
+# "1,250.00", "Rs. 120", "₹80", "120/-"
+NUMBER = re.compile(r"^(?:rs\.?|inr|₹)?\s*(\d[\d,]*(?:\.\d+)?)\s*(?:/-)?$", re.I)
+
+# "2kg", "3 pcs", "2x"
+QUANTITY = re.compile(r"^(\d+(?:\.\d+)?)\s*(?:x|kg|g|gm|l|ltr|ml|pc|pcs|nos)$", re.I)
+
+# "70g", "500 ml": printed right after a name it is the pack size, part
+# of the name ("Maggi 70g"), not a quantity column
+PACK_SIZE = re.compile(r"^\d+(?:\.\d+)?\s*(?:kg|g|gm|gms|l|ltr|ml)$", re.I)
+
+ROLES_BY_COUNT = {1: ["amount"], 2: ["qty", "amount"], 3: ["qty", "price", "amount"]}
+
+MIN_LABEL_MATCH = 0.8
+
+
+def _letters(text):
+    return re.sub(r"[^a-z]", "", text.lower())
+
+
+def _matches(text, labels):
+    """
+    Best similarity of `text` (letters only) to any of `labels`.
+    """
+
+    letters = _letters(text)
+
+    if not letters:
+        return 0
+
+    return max(difflib.SequenceMatcher(None, letters, label).ratio() for label in labels)
+
+
+def _number(value):
+    return int(value) if float(value).is_integer() else round(value, 2)
+
+
+def parse_number(text):
+
+    match = NUMBER.match(text.strip()) or QUANTITY.match(text.strip())
+
+    if not match:
+        return None
+
+    return _number(float(match.group(1).replace(",", "")))
+
+
+# =========================
+# WORDS -> ROWS -> CELLS
+# =========================
+
+class Word:
+
+    __slots__ = ("text", "conf", "left", "top", "right", "bottom", "line")
+
+    def __init__(self, text, conf, left, top, width, height, line):
+        self.text = text
+        self.conf = conf
+        self.left = left
+        self.top = top
+        self.right = left + width
+        self.bottom = top + height
+        self.line = line
+
+    @property
+    def middle(self):
+        return (self.top + self.bottom) / 2
+
+    @property
+    def height(self):
+        return self.bottom - self.top
+
+
+class Cell:
+    """
+    Adjacent words of one row with no column gap between them.
+    """
+
+    __slots__ = ("words", "text", "left", "right", "conf", "number")
+
+    def __init__(self, words):
+        self.words = words
+        self.text = " ".join(word.text for word in words)
+        self.left = words[0].left
+        self.right = words[-1].right
+        self.conf = sum(word.conf for word in words) / len(words)
+        self.number = parse_number(self.text)
+
+    @property
+    def middle(self):
+        return (self.left + self.right) / 2
+
+
+def words_from_data(data):
+    """
+    Words of a pytesseract.image_to_data(output_type=DICT) result,
+    without the empty layout entries (conf -1).
+    """
+
+    words = []
+
+    for i, text in enumerate(data["text"]):
+
+        text = (text or "").strip()
+        conf = float(data["conf"][i])
+
+        if not text or conf < 0:
+            continue
+
+        words.append(Word(
+            text, conf,
+            int(data["left"][i]), int(data["top"][i]),
+            int(data["width"][i]), int(data["height"][i]),
+            (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        ))
+
+    return words
+
+
+def data_text(data):
+    """
+    Plain text of an image_to_data result, in tesseract's line order:
+    what image_to_string would have returned, without a second pass.
+    """
+
+    lines = {}
+
+    for word in words_from_data(data):
+        lines.setdefault(word.line, []).append(word.text)
+
+    return "\n".join(" ".join(line) for line in lines.values())
+
+
+def group_rows(words):
+    """
+    Rows of words by vertical position, top to bottom, each left to
+    right. Boxes rather than tesseract's own lines, which split a
+    receipt row in two when its columns are far apart.
+    """
+
+    if not words:
+        return []
+
+    height = statistics.median(word.height for word in words)
+
+    rows = []
+
+    for word in sorted(words, key=lambda w: w.middle):
+
+        row = rows[-1] if rows else None
+
+        if row and abs(word.middle - sum(w.middle for w in row) / len(row)) <= height / 2:
+            row.append(word)
+        else:
+            rows.append([word])
+
+    return [sorted(row, key=lambda w: w.left) for row in rows]
+
+
+def split_cells(row, height):
+    """
+    Cells of one row. A gap wider than about one character height
+    starts a new column, and a number is always a cell of its own -
+    receipts print "Sugar 2 80" with single spaces - keeping a currency
+    sign before it ("Rs. 80") or a unit after it ("2 kg"). A pack size
+    right after a name stays in the name ("Maggi 70g").
+    """
+
+    cells = []
+
+    for word in row:
+
+        if cells:
+
+            last = cells[-1]
+            text = " ".join(w.text for w in last)
+
+            near = word.left - last[-1].right <= height
+            words = parse_number(word.text) is None and parse_number(text) is None
+
+            if near and (words or parse_number(f"{text} {word.text}") is not None):
+                last.append(word)
+                continue
+
+        cells.append([word])
+
+    merged = []
+
+    for words in cells:
+
+        if merged:
+
+            last = merged[-1]
+            text = " ".join(w.text for w in words)
+            near = words[0].left - last[-1].right <= height
+
+            if near and PACK_SIZE.match(text) and parse_number(" ".join(w.text for w in last)) is None:
+                last.extend(words)
+                continue
+
+        merged.append(words)
+
+    return [Cell(words) for words in merged]
+
+
+# =========================
+# COLUMNS
+# =========================
+
+def _numbers(cells):
+    """
+    (label cells, trailing numeric cells) of a row; a leading serial
+    number before the name is dropped.
+    """
+
+    end = len(cells)
+
+    while end > 0 and cells[end - 1].number is not None:
+        end -= 1
+
+    label, numbers = cells[:end], cells[end:]
+
+    if len(label) > 1 and label[0].number is not None:
+        label = label[1:]
+
+    return label, numbers
+
+
+def header_anchors(row):
+    """
+    {role: (left, right)} if this row of words is a table header (at
+    least two known column titles), else None.
+    """
+
+    anchors = {}
+
+    for word in row:
+
+        best, best_ratio = None, MIN_LABEL_MATCH
+
+        for title, role in HEADER_ROLES.items():
+
+            ratio = difflib.SequenceMatcher(None, _letters(word.text), title).ratio()
+
+            if ratio >= best_ratio:
+                best, best_ratio = role, ratio
+
+        if best and best not in anchors:
+            anchors[best] = (word.left, word.right)
+
+    if len(anchors) < 2:
+        return None
+
+    # the item column comes first: "Total Items" is not a header
+    if "name" in anchors and any(left < anchors["name"][0] for left, _ in anchors.values()):
+        return None
+
+    return anchors
+
+
+def layout_anchors(rows):
+    """
+    {role: (left, right)} from the rows with the most numeric cells,
+    for bills without a header: the column positions of those rows,
+    averaged, named by ROLES_BY_COUNT.
+    """
+
+    counts = [len(numbers) for _, numbers in rows]
+    widest = min(max(counts, default=0), 3)
+
+    if not widest:
+        return {}
+
+    spans = [numbers[-widest:] for _, numbers in rows if len(numbers) >= widest]
+
+    anchors = {}
+
+    for position, role in enumerate(ROLES_BY_COUNT[widest]):
+        anchors[role] = (
+            statistics.mean(cells[position].left for cells in spans),
+            statistics.mean(cells[position].right for cells in spans)
+        )
+
+    return anchors
+
+
+def assign_columns(numbers, anchors):
+    """
+    {role: cell} for the numeric cells of one item row. The last number
+    is the line amount; the others go to the nearest free column, or by
+    position from the right when there are no columns.
+    """
+
+    if not anchors:
+        roles = ROLES_BY_COUNT[min(len(numbers), 3)]
+        return dict(zip(roles, numbers[-len(roles):]))
+
+    assigned = {"amount": numbers[-1]}
+
+    for cell in reversed(numbers[:-1]):
+
+        def distance(role):
+            left, right = anchors[role]
+            # overlap with the column counts as zero distance
+            return max(left - cell.right, cell.left - right, 0) + abs(cell.middle - (left + right) / 2) / 1000
+
+        free = [role for role in anchors if role != "name" and role not in assigned]
+
+        if free:
+            assigned[min(free, key=distance)] = cell
+
+    return assigned
+
+
+# =========================
+# BILL
+# =========================
+
+def _confidence(cells):
+    return round(min(cell.conf for cell in cells) / 100, 2) if cells else 0
+
+
+def _item(label, columns, normalize_name):
+
+    qty = columns["qty"].number if "qty" in columns else None
+    price = columns["price"].number if "price" in columns else None
+    amount = columns["amount"].number if "amount" in columns else None
+
+    # qty x price = amount, when all three were read
+    consistent = None
+
+    if None not in (qty, price, amount):
+        consistent = abs(qty * price - amount) <= max(1, amount * 0.01)
+
+    if amount is None and qty is not None and price is not None:
+        amount = _number(qty * price)
+
+    if amount is None:
+        return None
+
+    if qty is None:
+        qty = _number(round(amount / price, 3)) if price else 1
+
+    if price is None:
+        price = _number(amount / qty) if qty else amount
+
+    name = " ".join(cell.text for cell in label)
+
+    return {
+        "name": normalize_name(name) if normalize_name else name,
+        "qty": qty,
+        "price": price,
+        "amount": amount,
+        "confidence": _confidence(label + list(columns.values())),
+        "consistent": consistent
+    }
+
+
+def extract_bill(data, normalize_name=None):
+    """
+    Items and grand total of one bill from an image_to_data result:
+
+        {"items": [{"name", "qty", "price", "amount", "confidence",
+                    "consistent"}],
+         "total": {"amount", "label", "confidence", "matches_items"} or None,
+         "items_total": sum of the item amounts}
+
+    Confidences are tesseract's word confidences (0-1), the weakest
+    word of the item or total row.
+    """
+
+    words = words_from_data(data)
+
+    if not words:
+        return {"items": [], "total": None, "items_total": 0}
+
+    height = statistics.median(word.height for word in words)
+
+    header = None
+    body = []
+    totals = []
+
+    for row in group_rows(words):
+
+        cells = split_cells(row, height)
+        label, numbers = _numbers(cells)
+        label_text = " ".join(cell.text for cell in label)
+
+        if header is None and not totals and not numbers:
+
+            anchors = header_anchors(row)
+
+            if anchors:
+                # anything above the table header is the shop's letterhead
+                header = anchors
+                body = []
+
+            continue
+
+        if not numbers or not label:
+            continue
+
+        if _matches(label_text, GRAND_TOTAL_LABELS) >= MIN_LABEL_MATCH:
+            totals.append(("grand", label_text, numbers[-1], label))
+
+        elif _matches(label_text, SUBTOTAL_LABELS) >= MIN_LABEL_MATCH:
+            totals.append(("sub", label_text, numbers[-1], label))
+
+        elif _matches(label_text, TOTAL_LABELS) >= MIN_LABEL_MATCH:
+            totals.append(("total", label_text, numbers[-1], label))
+
+        elif not totals and _letters(label_text) not in SKIP_LABELS:
+            # items end where the totals begin
+            body.append((label, numbers))
+
+    anchors = header or layout_anchors(body)
+
+    items = []
+
+    for label, numbers in body:
+
+        item = _item(label, assign_columns(numbers, anchors), normalize_name)
+
+        if item:
+            items.append(item)
+
+    items_total = round(sum(item["amount"] for item in items), 2)
+
+    total = None
+
+    # a grand total label wins; else the last plain "total" row; a
+    # subtotal only when it is all there is
+    for kind in ("grand", "total", "sub"):
+
+        found = [entry for entry in totals if entry[0] == kind]
+
+        if found:
+
+            _, label_text, cell, label = found[-1]
+
+            total = {
+                "amount": cell.number,
+                "label": label_text,
+                "confidence": _confidence(label + [cell]),
+                "matches_items": abs(cell.number - items_total) <= 1
+            }
+
+            break
+
+    return {"items": items, "total": total, "items_total": items_total}
+
+
+class BillExtractor:
+    """
+    extract_bill() as a parse step for ocr_service.run_ocr(parse=...).
+    `structured` asks the pool for image_to_data instead of plain text;
+    `normalize_name` cleans up item names (e.g. spelling correction).
+    """
+
+    structured = True
+
+    def __init__(self, normalize_name=None):
+        self.normalize_name = normalize_name
+
+    def __call__(self, data):
+        return extract_bill(data, self.normalize_name)
@@ -0,0 +1,260 @@
+import os
+
+from app.core.features import lazy_import
+
+Image = lazy_import("PIL.Image")
+ImageChops = lazy_import("PIL.ImageChops")
+ImageFilter = lazy_import("PIL.ImageFilter")
+ImageOps = lazy_import("PIL.ImageOps")
+
+
+# =========================
+# PREPROCESS SETTINGS
+# =========================
+#
+# Phone photos arrive at 12+ megapixels: sideways, with the table
+# around the bill, tilted and unevenly lit. tesseract's run time grows
+# with pixel count. It reads best at about 300 DPI, black on white and
+# level. OCR_PREPROCESS lists the steps to run, in order. Drop one from
+# the list to turn it off.
+
+OCR_PREPROCESS = os.environ.get("OCR_PREPROCESS", "exif,gray,crop,scale,deskew,threshold")
+
+OCR_TARGET_DPI = int(os.environ.get("OCR_TARGET_DPI", "300"))
+
+# printed width assumed for DPI: thermal receipts are 80mm; anything
+# not much taller than wide is taken as an A4 bill
+OCR_RECEIPT_WIDTH_MM = float(os.environ.get("OCR_RECEIPT_WIDTH_MM", "80"))
+OCR_PAGE_WIDTH_MM = float(os.environ.get("OCR_PAGE_WIDTH_MM", "210"))
+
+OCR_MAX_SKEW = float(os.environ.get("OCR_MAX_SKEW", "10"))
+
+# side of the thumbnail the crop and deskew decisions are made on
+ANALYSIS_SIZE = 400
+
+
+# =========================
+# STEPS
+# =========================
+
+def exif_rotate(image):
+    """
+    Apply the camera's orientation tag; tesseract ignores it.
+    """
+
+    return ImageOps.exif_transpose(image)
+
+
+def grayscale(image):
+    return image if image.mode == "L" else image.convert("L")
+
+
+def _otsu(histogram):
+    """
+    Threshold that best splits a 256-bin histogram into two classes.
+    """
+
+    total = sum(histogram)
+    weighted = sum(i * count for i, count in enumerate(histogram))
+
+    best, best_level = -1, 128
+    below = below_weighted = 0
+
+    for level, count in enumerate(histogram):
+
+        below += count
+        below_weighted += level * count
+
+        above = total - below
+
+        if below == 0 or above == 0:
+            continue
+
+        mean_below = below_weighted / below
+        mean_above = (weighted - below_weighted) / above
+        between = below * above * (mean_below - mean_above) ** 2
+
+        if between > best:
+            best, best_level = between, level
+
+    return best_level
+
+
+def crop_receipt(image):
+    """
+    Crop to the paper: the largest bright region, found on a thumbnail.
+    Photos that are already mostly paper are left alone.
+    """
+
+    small = image.copy()
+    small.thumbnail((ANALYSIS_SIZE, ANALYSIS_SIZE))
+
+    level = _otsu(small.histogram())
+
+    # paper white, background black; close the dark text inside the paper
+    mask = small.point(lambda v: 255 if v > level else 0)
+    mask = mask.filter(ImageFilter.MaxFilter(5)).filter(ImageFilter.MinFilter(9))
+
+    box = mask.getbbox()
+
+    if not box:
+        return image
+
+    left, top, right, bottom = box
+    area = (right - left) * (bottom - top) / (small.width * small.height)
+
+    if area > 0.9 or area < 0.03:
+        return image
+
+    scale = image.width / small.width
+    margin = 4
+
+    return image.crop((
+        max(int((left - margin) * scale), 0),
+        max(int((top - margin) * scale), 0),
+        min(int((right + margin) * scale), image.width),
+        min(int((bottom + margin) * scale), image.height)
+    ))
+
+
+def target_width(image):
+
+    width_mm = OCR_RECEIPT_WIDTH_MM if image.height > 1.6 * image.width else OCR_PAGE_WIDTH_MM
+
+    return int(width_mm / 25.4 * OCR_TARGET_DPI)
+
+
+def downscale(image):
+    """
+    Shrink to OCR_TARGET_DPI for the assumed paper width; never enlarge.
+    """
+
+    width = target_width(image)
+
+    if image.width <= width:
+        return image
+
+    height = max(int(image.height * width / image.width), 1)
+
+    # reduce() is a cheap integer box filter for the bulk of the shrink
+    factor = image.width // (2 * width)
+
+    if factor > 1:
+        image = image.reduce(factor)
+
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def _row_contrast(image):
+    """
+    Variance of the row means: highest when text lines run level.
+    """
+
+    rows = list(image.resize((1, image.height), Image.BOX).getdata())
+    mean = sum(rows) / len(rows)
+
+    return sum((value - mean) ** 2 for value in rows)
+
+
+def skew_angle(image):
+    """
+    Projection-profile search on a thresholded thumbnail, so only ink
+    (and the paper's edges, which run with it) counts: 2 degree steps,
+    then 0.5, then 0.25.
+    """
+
+    small = image.copy()
+    small.thumbnail((ANALYSIS_SIZE, ANALYSIS_SIZE))
+
+    # ink white on black, so rotation padding adds nothing
+    ink = ImageOps.invert(adaptive_threshold(small, radius=8))
+
+    def score(angle):
+        return _row_contrast(ink.rotate(angle, resample=Image.NEAREST, expand=True))
+
+    limit = int(OCR_MAX_SKEW)
+    best = max(range(-limit, limit + 1, 2), key=score)
+
+    for step in (0.5, 0.25):
+        best = max((best - 2 * step, best - step, best, best + step, best + 2 * step), key=score)
+
+    return best
+
+
+def deskew(image):
+
+    angle = skew_angle(image)
+
+    if abs(angle) < 0.3:
+        return image
+
+    return image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor="white")
+
+
+def adaptive_threshold(image, radius=15, offset=12):
+    """
+    Black wherever a pixel is `offset` darker than its neighbourhood,
+    white elsewhere: survives shadows that defeat one global threshold.
+    """
+
+    local_mean = image.filter(ImageFilter.BoxBlur(radius))
+    darker = ImageChops.subtract(local_mean, image)
+
+    return darker.point(lambda v: 0 if v > offset else 255)
+
+
+STEPS = {
+    "exif": exif_rotate,
+    "gray": grayscale,
+    "crop": crop_receipt,
+    "scale": downscale,
+    "deskew": deskew,
+    "threshold": adaptive_threshold
+}
+
+
+# =========================
+# PIPELINE
+# =========================
+
+class Preprocessor:
+    """
+    The configured steps as one callable for ocr_service.run_ocr(
+    preprocess=...). `draft_size` lets JPEG decoding skip straight to a
+    reduced scale instead of inflating every camera pixel first.
+    """
+
+    def __init__(self, steps):
+
+        unknown = [step for step in steps if step not in STEPS]
+
+        if unknown:
+            raise ValueError(f"unknown OCR preprocess steps: {', '.join(unknown)}")
+
+        self.steps = list(steps)
+        self._functions = [STEPS[step] for step in steps]
+
+        # JPEG can decode at 1/2, 1/4 or 1/8 scale, and luma only. The
+        # paper is only found after decoding and downscale never
+        # enlarges, so keep the A4 target width on both sides: a page (or
+        # a receipt) that fills less of the frame must still reach
+        # OCR_TARGET_DPI. A 12 MP photo decodes in full, larger sensors
+        # at a reduced scale
+        side = int(OCR_PAGE_WIDTH_MM / 25.4 * OCR_TARGET_DPI)
+
+        self.draft_size = (side, side) if "scale" in self.steps else None
+        self.draft_mode = "L" if "gray" in self.steps else None
+
+    @classmethod
+    def from_spec(cls, spec):
+        return cls([step.strip() for step in spec.split(",") if step.strip()])
+
+    def __call__(self, image):
+
+        for function in self._functions:
+            image = function(image)
+
+        return image
+
+
+preprocess_bill = Preprocessor.from_spec(OCR_PREPROCESS)
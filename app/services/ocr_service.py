@@ -0,0 +1,472 @@
+import asyncio
+import io
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.features import lazy_import
+from app.services.ocr_cache import content_key, dhash, ocr_cache
+from app.services.ocr_extract import data_text
+
+pytesseract = lazy_import("pytesseract")
+Image = lazy_import("PIL.Image")
+
+
+# =========================
+# OCR POOL SETTINGS
+# =========================
+#
+# Every OCR call runs a tesseract process. Without a limit, a burst of
+# phone-camera uploads starts one per request and the box thrashes.
+# OCR_WORKERS bounds the tesseract processes alive at once, and at most
+# OCR_MAX_PENDING scans may wait or run. Past that, requests are turned
+# away with 429 + Retry-After, so the client backs off and nothing piles up.
+
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", str(os.cpu_count() or 2)))
+OCR_MAX_PENDING = int(os.environ.get("OCR_MAX_PENDING", str(OCR_WORKERS * 4)))
+
+# a scan that waited longer than this is dropped; its client has
+# most likely given up already
+OCR_QUEUE_TIMEOUT = float(os.environ.get("OCR_QUEUE_TIMEOUT", "20"))
+
+# hard limit on one tesseract run
+OCR_TIMEOUT = float(os.environ.get("OCR_TIMEOUT", "30"))
+
+OCR_METRICS_WINDOW = int(os.environ.get("OCR_METRICS_WINDOW", "500"))
+
+# one core per tesseract: the pool is the parallelism, and tesseract's
+# own OpenMP threads would only fight each other
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+STAGES = ("queue", "decode", "preprocess", "ocr", "parse", "total")
+
+
+class OcrBusy(Exception):
+    """
+    Queue full: retry after `retry_after` seconds (HTTP 429).
+    """
+
+    def __init__(self, retry_after):
+        super().__init__(f"{OCR_MAX_PENDING} scans already waiting")
+        self.retry_after = retry_after
+
+
+class OcrUnavailable(Exception):
+    """
+    The scan could not be run: shed after waiting too long, tesseract
+    timed out or is not installed (HTTP 503).
+    """
+
+    def __init__(self, message, retry_after=OCR_QUEUE_TIMEOUT):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# =========================
+# METRICS
+# =========================
+
+_lock = threading.Lock()
+_pending = 0
+_running = 0
+
+_counters = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "unavailable": 0, "cancelled": 0, "duplicates": 0}
+_timings = {stage: deque(maxlen=OCR_METRICS_WINDOW) for stage in STAGES}
+
+
+def _percentile(values, fraction):
+
+    ordered = sorted(values)
+
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def _record(timings):
+
+    with _lock:
+        for stage, ms in timings.items():
+            if stage in _timings:
+                _timings[stage].append(ms)
+
+
+def retry_after():
+    """
+    Seconds until a slot is likely free: the queue ahead of a new scan
+    divided among the workers, at the recent average scan time.
+    """
+
+    with _lock:
+        samples = list(_timings["total"])
+        waiting = _pending
+
+    average = (sum(samples) / len(samples) / 1000) if samples else 2.0
+
+    return max(1, min(math.ceil(waiting / OCR_WORKERS * average), 60))
+
+
+def ocr_stats():
+
+    with _lock:
+
+        stages = {}
+
+        for stage, values in _timings.items():
+
+            if not values:
+                continue
+
+            stages[stage] = {
+                "avg_ms": round(sum(values) / len(values), 1),
+                "p50_ms": round(_percentile(values, 0.5), 1),
+                "p95_ms": round(_percentile(values, 0.95), 1)
+            }
+
+        return {
+            "workers": OCR_WORKERS,
+            "max_pending": OCR_MAX_PENDING,
+            "pending": _pending,
+            "running": _running,
+            **_counters,
+            "stages": stages,
+            "cache": ocr_cache.stats()
+        }
+
+
+# =========================
+# WORKER POOL
+# =========================
+#
+# Threads, not processes: tesseract does the work in its own process,
+# and PIL releases the GIL while decoding, so a thread per tesseract
+# is enough and uploads need no pickling.
+
+_executor = ThreadPoolExecutor(max_workers=OCR_WORKERS, thread_name_prefix="ocr")
+
+# cache key -> future of the scan reading it, so a retry that arrives
+# mid-scan waits for that one instead of starting its own
+_inflight = {}
+
+
+def decode_image(contents, preprocess=None):
+    """
+    Decode an upload, letting the preprocessor cut JPEG decoding down
+    to the scale and mode it needs (see ocr_preprocess.Preprocessor).
+    A page that is already an image (a rendered PDF page) passes through.
+    """
+
+    if isinstance(contents, Image.Image):
+        return contents
+
+    image = Image.open(io.BytesIO(contents))
+
+    draft_size = getattr(preprocess, "draft_size", None)
+    draft_mode = getattr(preprocess, "draft_mode", None)
+
+    if draft_size or draft_mode:
+        image.draft(draft_mode or image.mode, draft_size or image.size)
+
+    image.load()
+
+    return image
+
+
+def _pipeline(contents, submitted, preprocess, parse, config, cache_key, similar):
+    """
+    decode -> preprocess -> ocr -> parse on a pool thread, timing each.
+    With a `cache_key`, a near-duplicate of a cached scan stops after
+    preprocess, and a fresh result is cached.
+    """
+
+    global _running
+
+    started = time.perf_counter()
+    timings = {"queue": (started - submitted) * 1000}
+
+    if timings["queue"] > OCR_QUEUE_TIMEOUT * 1000:
+        raise OcrUnavailable("OCR queue wait exceeded", retry_after=retry_after())
+
+    with _lock:
+        _running += 1
+
+    try:
+
+        mark = time.perf_counter()
+
+        image = decode_image(contents, preprocess)
+
+        now = time.perf_counter()
+        timings["decode"] = (now - mark) * 1000
+        mark = now
+
+        if preprocess:
+            image = preprocess(image)
+
+        fingerprint = dhash(image) if cache_key and similar else None
+
+        now = time.perf_counter()
+        timings["preprocess"] = (now - mark) * 1000
+        mark = now
+
+        cached = ocr_cache.similar(cache_key, fingerprint) if fingerprint is not None else None
+
+        if cached is not None:
+            timings["total"] = (now - submitted) * 1000
+            return _result(cached["text"], cached["parsed"], timings, "similar", cache_key), timings
+
+        # a structured parser (ocr_extract.BillExtractor) reads word boxes;
+        # the plain text comes from the same single tesseract pass
+        structured = getattr(parse, "structured", False)
+
+        try:
+            if structured:
+                data = pytesseract.image_to_data(
+                    image, config=config, timeout=OCR_TIMEOUT, output_type=pytesseract.Output.DICT
+                )
+                text = data_text(data)
+            else:
+                text = pytesseract.image_to_string(image, config=config, timeout=OCR_TIMEOUT)
+
+        except pytesseract.TesseractNotFoundError as e:
+            raise OcrUnavailable(f"tesseract not available: {e}")
+
+        except RuntimeError as e:
+            # pytesseract's timeout
+            raise OcrUnavailable(str(e), retry_after=retry_after())
+
+        now = time.perf_counter()
+        timings["ocr"] = (now - mark) * 1000
+        mark = now
+
+        parsed = (parse(data) if structured else parse(text)) if parse else None
+
+        now = time.perf_counter()
+        timings["parse"] = (now - mark) * 1000
+        timings["total"] = (now - submitted) * 1000
+
+        if cache_key:
+            ocr_cache.put(cache_key, fingerprint, {"text": text, "parsed": parsed})
+
+    finally:
+        with _lock:
+            _running -= 1
+
+    return _result(text, parsed, timings, key=cache_key), timings
+
+
+def _result(text, parsed, timings, duplicate=None, key=None):
+
+    return {
+        "text": text,
+        "parsed": parsed,
+        "timings": {f"{stage}_ms": round(ms, 1) for stage, ms in timings.items()},
+        "duplicate": duplicate,
+        "key": key
+    }
+
+
+def _done(future):
+
+    global _pending
+
+    # a scan still queued when its client went away is cancelled
+    cancelled = future.cancelled()
+    error = None if cancelled else future.exception()
+
+    with _lock:
+
+        _pending -= 1
+
+        if cancelled:
+            _counters["cancelled"] += 1
+        elif error is None:
+            _counters["completed"] += 1
+        elif isinstance(error, OcrUnavailable):
+            _counters["unavailable"] += 1
+        else:
+            _counters["failed"] += 1
+
+    if not cancelled and error is None:
+
+        result, timings = future.result()
+
+        _record(timings)
+
+        if result["duplicate"]:
+            with _lock:
+                _counters["duplicates"] += 1
+
+
+def submit(contents, preprocess=None, parse=None, config="", cache_key=None, similar=True):
+    """
+    Queue one scan; returns a concurrent.futures.Future of
+    ({"text", "parsed", "timings", "duplicate"}, raw timings). Raises
+    OcrBusy when OCR_MAX_PENDING scans are already queued or running.
+    """
+
+    global _pending
+
+    with _lock:
+
+        if _pending >= OCR_MAX_PENDING:
+            _counters["rejected"] += 1
+            busy = True
+        else:
+            _pending += 1
+            _counters["submitted"] += 1
+            busy = False
+
+    if busy:
+        raise OcrBusy(retry_after())
+
+    future = _executor.submit(
+        _pipeline, contents, time.perf_counter(), preprocess, parse, config, cache_key, similar
+    )
+    future.add_done_callback(_done)
+
+    return future
+
+
+async def run_ocr(contents, preprocess=None, parse=None, config="", scope=None, similar=True):
+    """
+    Await one scan from an async endpoint: {"text", "parsed", "timings",
+    "duplicate", "key"}.
+
+    With a `scope` (endpoint and tenant, see ocr_cache.content_key) an
+    upload already read in that scope comes back at once, without a
+    tesseract run, with "duplicate" set to "exact" - or to "similar" for
+    a recompressed copy, unless `similar` is off. A retry arriving while
+    the first copy is still being read waits for that scan. "key" is the
+    cache key: an endpoint that then fails to record the result should
+    ocr_cache.invalidate() it, or the retry would count as a duplicate.
+    """
+
+    if scope is None:
+        result, _ = await asyncio.wrap_future(submit(contents, preprocess, parse, config))
+        return result
+
+    started = time.perf_counter()
+    key = content_key(scope, contents)
+
+    cached = ocr_cache.get(key)
+
+    if cached is None:
+
+        with _lock:
+            future = _inflight.get(key)
+
+        if future is None:
+
+            future = submit(contents, preprocess, parse, config, cache_key=key, similar=similar)
+
+            with _lock:
+                _inflight[key] = future
+
+            future.add_done_callback(lambda _: _forget(key))
+
+            # shielded, here and below: the scan is shared with any retry,
+            # so one waiter going away must not cancel it for the others
+            result, _ = await asyncio.shield(asyncio.wrap_future(future))
+
+            return result
+
+        cached, _ = await asyncio.shield(asyncio.wrap_future(future))
+
+    with _lock:
+        _counters["duplicates"] += 1
+
+    timings = {"total": (time.perf_counter() - started) * 1000}
+
+    return _result(cached["text"], cached["parsed"], timings, "exact", key)
+
+
+def _forget(key):
+
+    with _lock:
+        _inflight.pop(key, None)
+
+
+def ocr_capacity():
+    """
+    Scans that can still be queued before OcrBusy.
+    """
+
+    with _lock:
+        return OCR_MAX_PENDING - _pending
+
+
+# =========================
+# BATCHES
+# =========================
+
+async def _batch_page(page, deadline, **options):
+    """
+    One page of a batch. The pool being full is not an error here: the
+    page waits its turn until OCR_QUEUE_TIMEOUT, like a queued scan.
+    """
+
+    while True:
+
+        try:
+            return await run_ocr(page, **options)
+
+        except OcrBusy as e:
+
+            if time.monotonic() + e.retry_after > deadline:
+                raise
+
+            await asyncio.sleep(e.retry_after)
+
+
+async def run_ocr_batch(pages, window=OCR_WORKERS, **options):
+    """
+    Read several pages (upload bytes or decoded images) on the pool,
+    `window` at a time, yielding (index, result) in the order they
+    finish. A page that failed yields its exception as the result.
+
+    `pages` is pulled lazily, off the event loop, only as slots free up,
+    so rendering the next PDF page overlaps OCR of the ones before it.
+    `options` are run_ocr()'s.
+    """
+
+    loop = asyncio.get_running_loop()
+    source = iter(pages)
+
+    running = {}
+    count = 0
+    exhausted = False
+
+    try:
+        while True:
+
+            while not exhausted and len(running) < window:
+
+                page = await loop.run_in_executor(None, next, source, None)
+
+                if page is None:
+                    exhausted = True
+                    break
+
+                deadline = time.monotonic() + OCR_QUEUE_TIMEOUT
+                running[asyncio.ensure_future(_batch_page(page, deadline, **options))] = count
+                count += 1
+
+            if not running:
+                return
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                index = running.pop(task)
+                yield index, task.exception() or task.result()
+
+    finally:
+        # the stream was closed early: drop pages still waiting
+        for task in running:
+            task.cancel()
+
+
+def shutdown():
+    _executor.shutdown(wait=True)
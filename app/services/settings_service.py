@@ -0,0 +1,156 @@
+import os
+import threading
+
+from database import get_db_connection, get_db_writer
+from app.core.cache import TTLCache
+
+
+# =========================
+# CACHE SETTINGS
+# =========================
+#
+# Business settings are read on every invoice and every app open but
+# change a few times a year. Entries are served from memory for
+# SETTINGS_CACHE_TTL seconds; after that one `SELECT version` decides
+# whether the cached copy is still current. Saves bump the version, so
+# other workers pick up a change within one TTL.
+
+SETTINGS_CACHE_TTL = float(os.environ.get("SETTINGS_CACHE_TTL", "30"))
+SETTINGS_CACHE_SIZE = int(os.environ.get("SETTINGS_CACHE_SIZE", "2048"))
+
+SETTINGS_FIELDS = ("business_name", "gst_number", "phone", "address", "logo", "default_template")
+
+settings_cache = TTLCache(max_entries=SETTINGS_CACHE_SIZE, ttl=SETTINGS_CACHE_TTL)
+
+_counters = {"revalidated": 0, "reloaded": 0}
+_counters_lock = threading.Lock()
+
+
+def _count(name):
+    with _counters_lock:
+        _counters[name] += 1
+
+
+# =========================
+# READ
+# =========================
+
+def _load(cur, username):
+
+    cur.execute(
+        "SELECT * FROM business_settings WHERE username=? ORDER BY id DESC LIMIT 1",
+        (username,)
+    )
+
+    row = cur.fetchone()
+
+    if not row:
+        return (0, None)
+
+    row = dict(row)
+
+    return (row.get("version") or 0, row)
+
+
+def get_business_settings(username):
+    """
+    The tenant's business_settings row as a dict, or None if never saved.
+    """
+
+    entry, fresh = settings_cache.get(username)
+
+    if entry is not None and fresh:
+        return dict(entry[1]) if entry[1] else None
+
+    with get_db_connection(username=username) as conn:
+
+        cur = conn.cursor()
+
+        if entry is not None:
+
+            cur.execute(
+                "SELECT version FROM business_settings WHERE username=? ORDER BY id DESC LIMIT 1",
+                (username,)
+            )
+
+            row = cur.fetchone()
+            version = (row["version"] or 0) if row else 0
+
+            if version == entry[0] and (row is None) == (entry[1] is None):
+                settings_cache.touch(username)
+                _count("revalidated")
+                return dict(entry[1]) if entry[1] else None
+
+        entry = _load(cur, username)
+
+    settings_cache.set(username, entry)
+    _count("reloaded")
+
+    return dict(entry[1]) if entry[1] else None
+
+
+# =========================
+# WRITE
+# =========================
+
+def _save(conn, username, values):
+
+    cur = conn.cursor()
+
+    cur.execute(
+        "SELECT id FROM business_settings WHERE username=? ORDER BY id DESC LIMIT 1",
+        (username,)
+    )
+
+    row = cur.fetchone()
+
+    if row:
+
+        cur.execute("""
+        UPDATE business_settings
+        SET business_name=?,
+            gst_number=?,
+            phone=?,
+            address=?,
+            logo=?,
+            default_template=?,
+            updated_at=CURRENT_TIMESTAMP,
+            version=version + 1
+        WHERE id=?
+        """,
+        (*values, row[0]))
+
+    else:
+
+        cur.execute("""
+        INSERT INTO business_settings
+        (username,business_name,gst_number,phone,address,logo,default_template,updated_at,version)
+        VALUES (?,?,?,?,?,?,?,CURRENT_TIMESTAMP,1)
+        """,
+        (username, *values))
+
+
+def save_business_settings(username, data):
+    """
+    Upsert through the tenant's writer and drop this worker's cached
+    copy; other workers see the bumped version on their next revalidation.
+    """
+
+    values = tuple(
+        data.get(field, "1" if field == "default_template" else "")
+        for field in SETTINGS_FIELDS
+    )
+
+    try:
+        get_db_writer(username).execute(_save, username, values)
+
+    finally:
+        settings_cache.invalidate(username)
+
+
+def settings_cache_stats():
+
+    with _counters_lock:
+        counters = dict(_counters)
+
+    return {**settings_cache.stats(), **counters}
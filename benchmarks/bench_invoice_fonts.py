@@ -0,0 +1,125 @@
+"""
+Per-invoice cost of Unicode font embedding.
+
+    python benchmarks/bench_invoice_fonts.py --invoices 200 --font /path/to/Mukta-Regular.ttf
+
+Each configuration runs in a fresh interpreter (fonts are registered
+once per process): built-in Helvetica, then the TrueType font (the
+--font file, else whatever invoice_fonts discovers). For each it prints
+the first invoice (which pays for font parsing and registration), the
+median of the first and last tenth of the run (flat means no per-invoice
+growth), the PDF size with Latin and with Devanagari item names, and
+what parsing the TTF on every request would have cost instead.
+Run from the repository root.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+SETTINGS = {"business_name": "Bench Traders", "gst_number": "27ABCDE1234F1Z5", "phone": "9999999999", "address": "Market Road"}
+
+NAMES = {
+    "latin": ["Basmati rice", "Toor dal", "Sugar", "Mustard oil", "Tea"],
+    "hindi": ["बासमती चावल", "तूर दाल", "चीनी", "सरसों तेल", "चाय पत्ती"]
+}
+
+
+def child(args):
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from app.services.invoice_fonts import font_files, invoice_fonts
+    from app.services.invoice_service import ItemObj, render_invoice_bytes
+
+    def job(n, names):
+
+        items = [ItemObj(names[i % len(names)], i % 7 + 1, 10.5 + i) for i in range(args.items)]
+        amount = sum(item.qty * item.price for item in items) + n
+
+        invoice = {
+            "invoice_id": f"INV-BENCH-{n:06d}", "customer": "ग्राहक {n}".format(n=n) if names is NAMES["hindi"] else f"Customer {n}",
+            "amount": amount, "gst": 0.0, "total": amount, "note": "", "template": "1"
+        }
+
+        return invoice, items
+
+    started = time.perf_counter()
+    render_invoice_bytes(*job(0, NAMES["hindi"]), SETTINGS)
+    first_ms = (time.perf_counter() - started) * 1000
+
+    samples = []
+
+    for n in range(1, args.invoices + 1):
+        invoice, items = job(n, NAMES["hindi"] if n % 2 else NAMES["latin"])
+        started = time.perf_counter()
+        render_invoice_bytes(invoice, items, SETTINGS)
+        samples.append((time.perf_counter() - started) * 1000)
+
+    tenth = max(len(samples) // 10, 1)
+
+    result = {
+        "font": font_files()[0] or "Helvetica (built-in)",
+        "shaping": invoice_fonts().shaping,
+        "first_ms": first_ms,
+        "head_ms": statistics.median(samples[:tenth]),
+        "tail_ms": statistics.median(samples[-tenth:]),
+        "latin_kb": len(render_invoice_bytes(*job(1, NAMES["latin"]), SETTINGS)) / 1024,
+        "hindi_kb": len(render_invoice_bytes(*job(1, NAMES["hindi"]), SETTINGS)) / 1024
+    }
+
+    if font_files()[0]:
+
+        from reportlab.pdfbase.ttfonts import TTFont
+
+        started = time.perf_counter()
+        TTFont("BenchReparse", font_files()[0])
+        result["parse_ms"] = (time.perf_counter() - started) * 1000
+
+    print(json.dumps(result))
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--invoices", type=int, default=200)
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--font", default="")
+    parser.add_argument("--child", action="store_true")
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args)
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    configs = {
+        "built-in": {"INVOICE_FONT": "", "INVOICE_FONT_DIRS": os.devnull},
+        "truetype": {"INVOICE_FONT": args.font} if args.font else {}
+    }
+
+    for name, env in configs.items():
+
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child",
+             "--invoices", str(args.invoices), "--items", str(args.items)],
+            cwd=root, env=dict(os.environ, **env), capture_output=True, text=True, check=True
+        )
+
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+
+        print(f"{name}: {r['font']} (shaping: {r['shaping']})")
+        print(f"  first invoice {r['first_ms']:7.1f}ms   first 10% {r['head_ms']:6.2f}ms   last 10% {r['tail_ms']:6.2f}ms")
+        print(f"  pdf size      latin {r['latin_kb']:6.1f}KB   devanagari {r['hindi_kb']:6.1f}KB")
+
+        if "parse_ms" in r:
+            print(f"  parsing the TTF per request would add {r['parse_ms']:.1f}ms to every invoice")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Invoice render throughput: in-process vs the invoice render pool.
+
+    python benchmarks/bench_invoice_render.py --invoices 200 --items 40
+
+Renders the same synthetic invoices serially with render_invoice() and
+then through app.services.invoice_jobs' process pool, into a temporary
+directory (no database involved), and prints invoices/second for both.
+Run from the repository root.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.invoice_service import ItemObj, render_invoice  # noqa: E402
+from app.services import invoice_jobs  # noqa: E402
+
+
+SETTINGS = {"business_name": "Bench Traders", "gst_number": "27ABCDE1234F1Z5", "phone": "9999999999", "address": "Market Road"}
+
+
+def invoice(n, items):
+
+    amount = sum(item.qty * item.price for item in items)
+
+    return {
+        "invoice_id": f"INV-BENCH-{n:06d}",
+        "customer": f"Customer {n}",
+        "amount": amount,
+        "gst": 0.0,
+        "total": amount,
+        "note": ""
+    }
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--invoices", type=int, default=200)
+    parser.add_argument("--items", type=int, default=20)
+    args = parser.parse_args()
+
+    items = [ItemObj(f"item {i}", i % 7 + 1, 10.5 + i) for i in range(args.items)]
+    jobs = [invoice(n, items) for n in range(args.invoices)]
+
+    with tempfile.TemporaryDirectory() as directory:
+
+        started = time.perf_counter()
+
+        for job in jobs:
+            render_invoice(os.path.join(directory, job["invoice_id"] + ".pdf"), job, items, SETTINGS)
+
+        serial = time.perf_counter() - started
+
+        executor = invoice_jobs.get_executor()
+
+        # spawn the workers and load reportlab in them before timing
+        warmup = [
+            executor.submit(render_invoice, os.path.join(directory, f"warm-{n}.pdf"), jobs[0], items, SETTINGS)
+            for n in range(invoice_jobs.INVOICE_RENDER_WORKERS)
+        ]
+
+        for future in warmup:
+            future.result()
+
+        started = time.perf_counter()
+
+        futures = [
+            executor.submit(render_invoice, os.path.join(directory, "p-" + job["invoice_id"] + ".pdf"), job, items, SETTINGS)
+            for job in jobs
+        ]
+
+        for future in futures:
+            future.result()
+
+        pooled = time.perf_counter() - started
+
+        invoice_jobs.shutdown()
+
+    print(f"serial : {args.invoices / serial:8.1f} invoices/s")
+    print(f"pool   : {args.invoices / pooled:8.1f} invoices/s ({invoice_jobs.INVOICE_RENDER_WORKERS} workers)")
+
+
+if __name__ == "__main__":
+    main()
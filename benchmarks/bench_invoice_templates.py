@@ -0,0 +1,234 @@
+"""
+Per-invoice render time: compiled templates vs the hand-coded layout
+they replaced.
+
+    python benchmarks/bench_invoice_templates.py --invoices 50 --items 5,40,400
+
+hand_coded() below is the renderer as it stood before templates (layout
+in Python, one drawString per field, QR through reportlab's widget),
+kept here only as the baseline; template "1" draws the same page.
+Each invoice has its own total, so every render encodes a fresh QR.
+Run from the repository root.
+"""
+
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab.graphics import renderPDF, shapes  # noqa: E402
+from reportlab.graphics.barcode import qr  # noqa: E402
+from reportlab.lib.pagesizes import A4  # noqa: E402
+from reportlab.pdfgen import canvas  # noqa: E402
+
+from app.services import invoice_templates  # noqa: E402
+from app.services.invoice_service import ItemObj, render_invoice_bytes  # noqa: E402
+
+
+SETTINGS = {"business_name": "Bench Traders", "gst_number": "27ABCDE1234F1Z5", "phone": "9999999999", "address": "Market Road"}
+
+
+# =========================
+# HAND-CODED BASELINE
+# =========================
+
+COLUMNS = (50, 250, 320, 400)
+
+
+def hand_forms(c, settings):
+
+    c.beginForm("letterhead")
+    c.setFont("Helvetica-Bold", 18)
+    c.drawString(50, 820, settings.get("business_name", ""))
+    c.setFont("Helvetica", 10)
+    if settings.get("address"):
+        c.drawString(50, 800, settings["address"])
+    if settings.get("phone"):
+        c.drawString(50, 785, f"Phone: {settings['phone']}")
+    if settings.get("gst_number"):
+        c.drawString(50, 770, f"GST: {settings['gst_number']}")
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(240, 820, "TAX INVOICE")
+    c.endForm()
+
+    c.beginForm("columns")
+    c.setFont("Helvetica-Bold", 11)
+    for x, title in zip(COLUMNS, ("Item", "Qty", "Price", "Total")):
+        c.drawString(x, 10, title)
+    c.endForm()
+
+    c.beginForm("footer")
+    c.setFont("Helvetica", 9)
+    c.drawString(200, 80, "Thank you for your business")
+    c.drawString(190, 65, "Powered by HisabKitab Pro")
+    c.endForm()
+
+
+def hand_qr(c, data, x, y, size):
+
+    widget = qr.QrCodeWidget(data)
+    x0, y0, x1, y1 = widget.getBounds()
+
+    drawing = shapes.Drawing(size, size, transform=[size / (x1 - x0), 0, 0, size / (y1 - y0), 0, 0])
+    drawing.add(widget)
+
+    renderPDF.draw(drawing, c, x, y)
+
+
+def hand_columns(c, y):
+    c.saveState()
+    c.translate(0, y - 10)
+    c.doForm("columns")
+    c.restoreState()
+
+
+def hand_rows(c, rows, top):
+
+    for x, column in zip(COLUMNS, zip(*rows)):
+        text = c.beginText(x, top)
+        text.setFont("Helvetica", 10)
+        text.setLeading(20)
+        for value in column:
+            text.textLine(value)
+        c.drawText(text)
+
+
+def hand_finish(c, page):
+    c.doForm("footer")
+    c.setFont("Helvetica", 8)
+    c.drawRightString(545, 40, f"Page {page}")
+
+
+def hand_coded(invoice, items, settings):
+
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4, invariant=1, pageCompression=1)
+
+    hand_forms(c, settings)
+    c.doForm("letterhead")
+
+    c.setFont("Helvetica", 11)
+    c.drawString(50, 740, f"Invoice : {invoice['invoice_id']}")
+    c.drawString(50, 720, f"Customer : {invoice['customer']}")
+    if invoice.get("note"):
+        c.drawString(50, 700, f"Note : {invoice['note']}")
+
+    hand_qr(c, f"upi://pay?pa=test@upi&pn=HisabKitab&am={invoice['total']}", 450, 740, 100)
+    hand_columns(c, 640)
+
+    page, top, y, rows, running = 1, 610, 610, [], 0
+
+    for item in items:
+
+        if y < 140:
+            hand_rows(c, rows, top)
+            rows = []
+            c.setFont("Helvetica-Bold", 10)
+            c.drawString(320, y, f"Carried forward : {running:.2f}")
+            hand_finish(c, page)
+            c.showPage()
+            page += 1
+            c.setFont("Helvetica-Bold", 11)
+            c.drawString(50, 800, f"Invoice : {invoice['invoice_id']} (continued)")
+            hand_columns(c, 780)
+            c.setFont("Helvetica-Bold", 10)
+            c.drawString(320, 750, f"Brought forward : {running:.2f}")
+            top = y = 730
+
+        item_total = item.qty * item.price
+        running += item_total
+        rows.append((item.name, str(item.qty), str(item.price), str(item_total)))
+        y -= 20
+
+    if rows:
+        hand_rows(c, rows, top)
+
+    if y - 70 < 120:
+        hand_finish(c, page)
+        c.showPage()
+        page += 1
+        c.setFont("Helvetica-Bold", 11)
+        c.drawString(50, 800, f"Invoice : {invoice['invoice_id']} (continued)")
+        y = 750
+
+    c.setFont("Helvetica", 10)
+    c.line(50, y, 500, y)
+    c.drawString(320, y - 20, f"Subtotal : ₹{invoice['amount']}")
+    c.drawString(320, y - 40, f"GST : ₹{invoice['gst']}" if invoice["gst"] else "GST : Not Applied")
+    c.drawString(320, y - 60, f"Total : ₹{invoice['total']}")
+    hand_finish(c, page)
+
+    c.save()
+
+    return buffer.getvalue()
+
+
+# =========================
+# BENCHMARK
+# =========================
+
+def invoice(n, items, template):
+
+    amount = sum(item.qty * item.price for item in items) + n
+
+    return {
+        "invoice_id": f"INV-BENCH-{n:06d}",
+        "customer": f"Customer {n}",
+        "amount": amount,
+        "gst": 0.0,
+        "total": amount,
+        "note": "",
+        "template": template
+    }
+
+
+def per_invoice_ms(render, invoices, items):
+
+    samples = []
+
+    for job in invoices:
+        started = time.perf_counter()
+        render(job, items, SETTINGS)
+        samples.append((time.perf_counter() - started) * 1000)
+
+    return statistics.median(samples)
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--invoices", type=int, default=50)
+    parser.add_argument("--items", default="5,40,400")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    for name in invoice_templates.TEMPLATES:
+        invoice_templates.compiled_template(name)
+    print(f"compile all templates: {(time.perf_counter() - started) * 1000:.2f}ms (once per process)")
+
+    for count in (int(n) for n in args.items.split(",")):
+
+        items = [ItemObj(f"item {i}", i % 7 + 1, 10.5 + i) for i in range(count)]
+
+        # warm reportlab's font and glyph caches
+        hand_coded(invoice(-1, items, "1"), items, SETTINGS)
+        render_invoice_bytes(invoice(-1, items, "1"), items, SETTINGS)
+
+        results = {"hand-coded": per_invoice_ms(hand_coded, [invoice(n, items, "1") for n in range(args.invoices)], items)}
+
+        for name in invoice_templates.TEMPLATES:
+            jobs = [invoice(n + args.invoices * len(results), items, name) for n in range(args.invoices)]
+            results[f"template {name}"] = per_invoice_ms(render_invoice_bytes, jobs, items)
+
+        print(f"{count} items")
+
+        for label, ms in results.items():
+            print(f"  {label:12} {ms:8.2f}ms/invoice")
+
+
+if __name__ == "__main__":
+    main()
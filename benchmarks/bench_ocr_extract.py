@@ -0,0 +1,163 @@
+"""
+Bill extraction accuracy: line regex over plain text vs word boxes.
+
+    python benchmarks/bench_ocr_extract.py --count 24
+    python benchmarks/bench_ocr_extract.py --corpus path/to/photos
+
+Every bill of the corpus (benchmarks/ocr_corpus.py, or a folder with
+its own truth.json) is preprocessed as read-bill does, then read by one
+tesseract pass per extractor:
+
+  regex       image_to_string + the "([A-Za-z]+)\\s+(\\d+)" line match
+              read-bill used before
+  structured  image_to_data + ocr_extract (rows, columns, grand total)
+
+and scored on the share of bills read exactly, item recall by (name,
+amount), quantities and prices right on table bills, and the total.
+A wrong read costs a re-scan, i.e. a second OCR pass. Needs tesseract.
+Run from the repository root.
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytesseract  # noqa: E402
+
+import ocr_corpus  # noqa: E402
+from app.api.v1.ocr import correct_word, bill_totals, read_bill_data  # noqa: E402
+from app.services.ocr_preprocess import preprocess_bill  # noqa: E402
+from app.services.ocr_service import decode_image  # noqa: E402
+
+
+def regex_bill(image):
+    """
+    The line parser read-bill had: first word and first number per line.
+    """
+
+    text = pytesseract.image_to_string(image)
+
+    items = []
+    total = 0
+
+    for line in text.split("\n"):
+
+        match = re.search(r"([A-Za-z]+)\s+(\d+)", line)
+
+        if match:
+
+            name = correct_word(match.group(1))
+            amount = int(match.group(2))
+
+            if name == "total":
+                total = amount
+            else:
+                items.append({"name": name, "qty": 1, "price": amount, "amount": amount})
+
+    return items, total
+
+
+def structured_bill(image):
+
+    data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+
+    return bill_totals(read_bill_data(data))
+
+
+EXTRACTORS = {
+    "regex": regex_bill,
+    "structured": structured_bill
+}
+
+
+def score(items, total, truth):
+
+    found = {(item["name"], item["amount"]) for item in items}
+    expected = {(item["name"], item["amount"]) for item in truth["items"]}
+
+    # qty and price only mean something on table bills
+    columns = {(item["name"], item["qty"], item["price"]) for item in items}
+    expected_columns = {
+        (item["name"], item["qty"], item["price"])
+        for item in truth["items"] if item["qty"] != 1
+    }
+
+    return {
+        "exact": found == expected and total == truth["total"],
+        "items": len(found & expected),
+        "expected": len(expected),
+        "columns": len(columns & expected_columns),
+        "expected_columns": len(expected_columns),
+        "total": total == truth["total"]
+    }
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default="")
+    parser.add_argument("--count", type=int, default=24)
+    args = parser.parse_args()
+
+    if shutil.which(pytesseract.pytesseract.tesseract_cmd) is None:
+        print("tesseract not found: nothing to measure")
+        return
+
+    directory = args.corpus or tempfile.mkdtemp(prefix="ocr-corpus-")
+
+    try:
+
+        if not args.corpus:
+            ocr_corpus.build(directory, args.count)
+
+        with open(os.path.join(directory, "truth.json")) as f:
+            truth = json.load(f)
+
+        images = {}
+
+        for name in truth:
+            with open(os.path.join(directory, name), "rb") as f:
+                images[name] = preprocess_bill(decode_image(f.read(), preprocess_bill))
+
+        print(f"{len(truth)} bills")
+
+        for label, extract in EXTRACTORS.items():
+
+            scores = []
+            times = []
+
+            for name, expected in truth.items():
+
+                started = time.perf_counter()
+                items, total = extract(images[name])
+                times.append((time.perf_counter() - started) * 1000)
+
+                scores.append(score(items, total, expected))
+
+            def ratio(key, of):
+                return sum(s[key] for s in scores) / max(sum(s[of] for s in scores), 1)
+
+            print(
+                f"{label:10} ocr {statistics.median(times):7.1f}ms"
+                f"  exact {sum(s['exact'] for s in scores)}/{len(scores)}"
+                f"  item recall {ratio('items', 'expected'):.0%}"
+                f"  qty+price {ratio('columns', 'expected_columns'):.0%}"
+                f"  total {sum(s['total'] for s in scores)}/{len(scores)}"
+            )
+
+    finally:
+
+        if not args.corpus:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
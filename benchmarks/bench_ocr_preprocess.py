@@ -0,0 +1,164 @@
+"""
+OCR time and extraction accuracy before and after preprocessing.
+
+    python benchmarks/bench_ocr_preprocess.py --count 24
+    python benchmarks/bench_ocr_preprocess.py --corpus path/to/photos
+
+Runs every bill of the corpus (benchmarks/ocr_corpus.py, generated into
+a temporary directory unless --corpus points at a folder with its own
+truth.json) through the two paths read-bill has had:
+
+  before  decode the upload and hand it to tesseract as is
+  after   draft decode + ocr_preprocess.preprocess_bill
+
+and prints, per path and per paper (80mm receipts and A4 bills
+apart), median decode+preprocess time, pixels handed to tesseract, the
+resolution that leaves on the paper (after preprocessing, which crops
+to it), median tesseract time, and accuracy: the share of bills whose
+items and total read-bill's extractor recovers exactly, and item-level
+recall. Without a tesseract binary only time, pixels and DPI are
+measured.
+Run from the repository root.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytesseract  # noqa: E402
+
+import ocr_corpus  # noqa: E402
+from app.api.v1.ocr import bill_totals, read_bill_data  # noqa: E402
+from app.services.ocr_preprocess import (  # noqa: E402
+    OCR_PAGE_WIDTH_MM,
+    OCR_RECEIPT_WIDTH_MM,
+    preprocess_bill
+)
+from app.services.ocr_service import decode_image  # noqa: E402
+
+
+PATHS = {
+    "before": None,
+    "after": preprocess_bill
+}
+
+PAPER_WIDTH_MM = {
+    "receipt": OCR_RECEIPT_WIDTH_MM,
+    "a4": OCR_PAGE_WIDTH_MM
+}
+
+
+def run(path, contents, preprocess, with_ocr):
+
+    started = time.perf_counter()
+
+    image = decode_image(contents, preprocess)
+
+    if preprocess:
+        image = preprocess(image)
+
+    prepared = time.perf_counter()
+
+    result = {
+        "prepare_ms": (prepared - started) * 1000,
+        "pixels": image.width * image.height,
+        "width": image.width
+    }
+
+    if with_ocr:
+        data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+        result["ocr_ms"] = (time.perf_counter() - prepared) * 1000
+        result["parsed"] = bill_totals(read_bill_data(data))
+
+    return result
+
+
+def score(parsed, truth):
+
+    items, total = parsed
+    found = {(item["name"], item["amount"]) for item in items}
+    expected = {(item["name"], item["amount"]) for item in truth["items"]}
+
+    exact = found == expected and total == truth["total"]
+
+    return exact, len(found & expected), len(expected)
+
+
+def paper_line(label, paper, rows, preprocess, with_ocr):
+
+    line = (
+        f"{label:15} n={len(rows):<3} prepare {statistics.median(r['prepare_ms'] for r, _ in rows):7.1f}ms  "
+        f"pixels {statistics.median(r['pixels'] for r, _ in rows) / 1e6:5.2f}MP"
+    )
+
+    # only the preprocessed image is cropped to the paper
+    if preprocess:
+        inches = PAPER_WIDTH_MM[paper] / 25.4
+        line += f"  dpi {statistics.median(r['width'] for r, _ in rows) / inches:4.0f}"
+
+    if with_ocr:
+
+        scores = [score(r["parsed"], e) for r, e in rows]
+
+        line += (
+            f"  ocr {statistics.median(r['ocr_ms'] for r, _ in rows):7.1f}ms"
+            f"  exact {sum(s[0] for s in scores)}/{len(scores)}"
+            f"  item recall {sum(s[1] for s in scores) / max(sum(s[2] for s in scores), 1):.0%}"
+        )
+
+    return line
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default="")
+    parser.add_argument("--count", type=int, default=24)
+    args = parser.parse_args()
+
+    with_ocr = shutil.which(pytesseract.pytesseract.tesseract_cmd) is not None
+
+    directory = args.corpus or tempfile.mkdtemp(prefix="ocr-corpus-")
+
+    try:
+
+        if not args.corpus:
+            ocr_corpus.build(directory, args.count)
+
+        with open(os.path.join(directory, "truth.json")) as f:
+            truth = json.load(f)
+
+        if not with_ocr:
+            print("tesseract not found: measuring decode + preprocess only")
+
+        print(f"{len(truth)} bills")
+
+        for label, preprocess in PATHS.items():
+
+            papers = {}
+
+            for name, expected in truth.items():
+
+                with open(os.path.join(directory, name), "rb") as f:
+                    row = run(name, f.read(), preprocess, with_ocr)
+
+                papers.setdefault(expected.get("paper", "receipt"), []).append((row, expected))
+
+            for paper, rows in sorted(papers.items(), key=lambda p: p[0] != "receipt"):
+                print(paper_line(f"{label} {paper}", paper, rows, preprocess, with_ocr))
+
+    finally:
+
+        if not args.corpus:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Cold-start cost of the two app entrypoints per feature configuration.
+
+    python benchmarks/bench_startup.py --runs 5
+
+Each sample is a fresh interpreter that imports the app module (main or
+app.main) with HISAB_DISABLED_FEATURES set, then reports wall time for
+the import, peak RSS and which heavy libraries ended up in sys.modules.
+Run from the repository root.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+CONFIGS = {
+    "all": "",
+    "no-ocr-voice-pdf": "ocr,voice,pdf",
+    "core-only": "ai,ocr,voice,pdf",
+}
+
+HEAVY_MODULES = [
+    "pytesseract", "PIL.Image", "speech_recognition", "pydub",
+    "reportlab.pdfgen.canvas", "rapidfuzz", "requests",
+]
+
+PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "import_ms": elapsed * 1000,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "loaded": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def sample(module, disabled, cwd):
+
+    env = dict(os.environ, HISAB_DISABLED_FEATURES=disabled)
+
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=cwd, env=env, capture_output=True, text=True, check=True
+    )
+
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--modules", default="main,app.main")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    for module in args.modules.split(","):
+
+        for name, disabled in CONFIGS.items():
+
+            samples = [sample(module, disabled, root) for _ in range(args.runs)]
+
+            import_ms = statistics.median(s["import_ms"] for s in samples)
+            rss_mb = statistics.median(s["rss_mb"] for s in samples)
+
+            print(
+                f"{module:10} {name:18} import={import_ms:7.1f}ms "
+                f"rss={rss_mb:6.1f}MB heavy={','.join(samples[-1]['loaded']) or '-'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Latency of an unrelated endpoint while OCR uploads are in flight.
+
+Run against a live server (uvicorn app.main:app):
+
+    python benchmarks/bench_upload_latency.py --url http://127.0.0.1:8000
+
+It measures GET /api/v1/health/ on its own, then again while --uploads
+threads keep posting bill images to /api/v1/ocr/read-bill. With the OCR,
+file and sqlite work off the event loop, the two distributions should
+match; the script exits non-zero when p95 grows by more than --max-ratio.
+"""
+
+import argparse
+import io
+import statistics
+import threading
+import time
+
+import requests
+from PIL import Image, ImageDraw
+
+
+def bill_image():
+
+    image = Image.new("RGB", (1600, 2200), "white")
+    draw = ImageDraw.Draw(image)
+
+    for i, line in enumerate(["milk 60", "sugar 45", "rice 120", "tea 80", "total 305"]):
+        draw.text((100, 150 + i * 90), line, fill="black")
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=95)
+
+    return buffer.getvalue()
+
+
+def token(url):
+
+    creds = {"username": "bench_user", "password": "bench_pass"}
+
+    requests.post(f"{url}/api/v1/auth/register", json=creds)
+    response = requests.post(f"{url}/api/v1/auth/login", json=creds)
+
+    return response.json()["data"]["access_token"]
+
+
+def probe(url, samples, pause=0.02):
+
+    timings = []
+
+    for _ in range(samples):
+        started = time.perf_counter()
+        requests.get(f"{url}/api/v1/health/")
+        timings.append((time.perf_counter() - started) * 1000)
+        time.sleep(pause)
+
+    return timings
+
+
+def summary(timings):
+
+    ordered = sorted(timings)
+
+    return {
+        "p50": statistics.median(ordered),
+        "p95": ordered[int(len(ordered) * 0.95) - 1],
+        "max": ordered[-1]
+    }
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--samples", type=int, default=100)
+    parser.add_argument("--uploads", type=int, default=8)
+    parser.add_argument("--max-ratio", type=float, default=3.0)
+    args = parser.parse_args()
+
+    headers = {"Authorization": f"Bearer {token(args.url)}"}
+    image = bill_image()
+
+    baseline = summary(probe(args.url, args.samples))
+
+    stop = threading.Event()
+    uploads = []
+
+    def upload_loop():
+        while not stop.is_set():
+            started = time.perf_counter()
+            requests.post(
+                f"{args.url}/api/v1/ocr/read-bill",
+                files={"file": ("bill.jpg", image, "image/jpeg")},
+                headers=headers
+            )
+            uploads.append((time.perf_counter() - started) * 1000)
+
+    workers = [threading.Thread(target=upload_loop) for _ in range(args.uploads)]
+
+    for worker in workers:
+        worker.start()
+
+    try:
+        loaded = summary(probe(args.url, args.samples))
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+    print(f"uploads completed: {len(uploads)}")
+    print("health idle   : p50={p50:.1f}ms p95={p95:.1f}ms max={max:.1f}ms".format(**baseline))
+    print("health loaded : p50={p50:.1f}ms p95={p95:.1f}ms max={max:.1f}ms".format(**loaded))
+
+    # a few ms of absolute slack so a sub-millisecond baseline cannot fail
+    limit = baseline["p95"] * args.max_ratio + 10
+
+    if loaded["p95"] > limit:
+        print(f"FAIL: p95 under upload load exceeds {limit:.1f}ms")
+        raise SystemExit(1)
+
+    print("OK: unrelated endpoint latency stayed flat")
+
+
+if __name__ == "__main__":
+    main()
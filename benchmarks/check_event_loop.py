@@ -0,0 +1,232 @@
+"""
+Self-contained check that slow OCR and sqlite work stay off the event loop.
+
+    python benchmarks/check_event_loop.py
+
+No server, no tesseract: the root app runs in a TestClient, whose
+requests all share one event loop thread, with tesseract replaced by a
+call that blocks for --slow seconds (as the real subprocess call does).
+GET / is timed over and over while, in turn:
+
+  control  an async route that blocks the loop on purpose; the probe
+           must see the stall, or the check proves nothing
+  ocr      POST /ocr/bill-ledger uploads whose tesseract call is slow
+  sqlite   POST /ocr/bill-ledger whose ledger insert waits --slow
+           seconds for a write lock another connection holds
+
+and fails unless the probe's worst latency during ocr and sqlite stays
+under --max-stall of the slow call. Tenant rows go to a temporary shard
+directory; only the main database file is initialised at startup, as
+the app always does.
+Run from the repository root.
+"""
+
+import argparse
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+USERNAME = "loop_check"
+
+
+def bill_image(n):
+    """
+    A distinct upload per call: different enough that the OCR cache's
+    near-duplicate match does not answer it.
+    """
+
+    import random
+
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(n)
+    image = Image.new("L", (400, 300), 255)
+    draw = ImageDraw.Draw(image)
+
+    for _ in range(12):
+        x, y = rng.randrange(360), rng.randrange(260)
+        draw.rectangle((x, y, x + rng.randrange(10, 40), y + rng.randrange(10, 40)), fill=0)
+
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+
+    return buffer.getvalue()
+
+
+def fake_tesseract(delay):
+    """
+    image_to_data / image_to_string stand-ins: block like a tesseract
+    run, then read "Total 305".
+    """
+
+    words = [("Total", 20), ("305", 200)]
+
+    def image_to_data(image, config="", timeout=0, output_type=None, **kwargs):
+        time.sleep(delay[0])
+        n = len(words)
+        return {
+            "level": [5] * n, "page_num": [1] * n, "block_num": [1] * n, "par_num": [1] * n,
+            "line_num": [1] * n, "word_num": list(range(1, n + 1)),
+            "left": [left for _, left in words], "top": [40] * n,
+            "width": [90] * n, "height": [30] * n, "conf": [95] * n,
+            "text": [text for text, _ in words]
+        }
+
+    def image_to_string(image, config="", timeout=0, **kwargs):
+        time.sleep(delay[0])
+        return "Total 305\n"
+
+    return image_to_data, image_to_string
+
+
+def probe(client, stop, pause=0.01):
+    """
+    GET / latencies (ms) until `stop` is set.
+    """
+
+    timings = []
+
+    while not stop.is_set():
+        started = time.perf_counter()
+        client.get("/")
+        timings.append((time.perf_counter() - started) * 1000)
+        time.sleep(pause)
+
+    return timings
+
+
+def during(client, work):
+    """
+    Worst GET / latency (ms) while `work()` runs in another thread.
+    """
+
+    stop = threading.Event()
+    errors = []
+
+    def run():
+        try:
+            work()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            stop.set()
+
+    # let the probe get going first
+    worker = threading.Timer(0.1, run)
+    worker.start()
+
+    timings = probe(client, stop)
+    worker.join()
+
+    if errors:
+        raise errors[0]
+
+    return max(timings), len(timings)
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--slow", type=float, default=1.0, help="seconds each slow call blocks")
+    parser.add_argument("--uploads", type=int, default=3, help="concurrent uploads in the ocr case")
+    parser.add_argument("--max-stall", type=float, default=0.25, help="allowed probe latency, share of --slow")
+    args = parser.parse_args()
+
+    shard_dir = tempfile.mkdtemp(prefix="loop-check-")
+
+    # before the app is imported: the shard router reads these once
+    os.environ["DB_SHARD_MODE"] = "tenant"
+    os.environ["DB_SHARD_DIR"] = shard_dir
+    os.chdir(ROOT)
+
+    import pytesseract
+    from fastapi.testclient import TestClient
+
+    delay = [0.0]
+    pytesseract.image_to_data, pytesseract.image_to_string = fake_tesseract(delay)
+
+    from main import app
+    from database import shard_router
+
+    @app.get("/_check/blocking")
+    async def blocking():
+        time.sleep(args.slow)
+        return {}
+
+    uploads = iter(range(10 ** 6))
+
+    def upload(client):
+        response = client.post(
+            "/ocr/bill-ledger",
+            params={"username": USERNAME, "customer_id": 1},
+            files={"file": ("bill.png", bill_image(next(uploads)), "image/png")}
+        )
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    def ocr_case(client):
+        delay[0] = args.slow
+        threads = [threading.Thread(target=upload, args=(client,)) for _ in range(args.uploads)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    def sqlite_case(client):
+
+        delay[0] = 0
+        path = shard_router.shard_path(USERNAME)
+
+        # hold the shard's write lock; the insert waits for it in sqlite
+        holder = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        holder.execute("BEGIN IMMEDIATE")
+
+        released = threading.Timer(args.slow, holder.rollback)
+        released.start()
+
+        try:
+            body = upload(client)
+            assert body.get("status") == "ledger updated", body
+        finally:
+            released.join()
+            holder.close()
+
+    cases = [
+        ("control", lambda client: client.get("/_check/blocking"), True),
+        ("ocr", ocr_case, False),
+        ("sqlite", sqlite_case, False),
+    ]
+
+    limit = args.slow * 1000 * args.max_stall
+    ok = True
+
+    with TestClient(app) as client:
+
+        # warm up: pools, shard schema, first OCR
+        upload(client)
+
+        for label, work, should_stall in cases:
+
+            worst, samples = during(client, lambda: work(client))
+
+            stalled = worst > limit
+            passed = stalled == should_stall
+            ok = ok and passed
+
+            print(
+                f"{'ok  ' if passed else 'FAIL'} {label:8} worst GET / {worst:7.1f}ms"
+                f" over {samples} probes (limit {limit:.0f}ms, {'must' if should_stall else 'must not'} stall)"
+            )
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
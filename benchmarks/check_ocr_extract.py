@@ -0,0 +1,183 @@
+"""
+Deterministic check of bill extraction, without tesseract.
+
+    python benchmarks/check_ocr_extract.py
+
+Feeds fixed pytesseract.image_to_data(output_type=DICT) results - word
+boxes laid out as tesseract reports them - through both readers:
+read-bill (app/api/v1/ocr.py: items and grand total) and bill-ledger
+(app/api/ocr_bill_api.py: one amount). Bills:
+
+  header    GST invoice with an Item / Qty / Rate / Amount header,
+            subtotal and tax rows, "Rs." total
+  plain     kirana receipt without a header, "name amount" lines, a
+            phone number and a bill number above the items
+  pack      item names ending in a pack size ("Maggi 70g") on a headed
+            and on a headerless bill
+
+Exits non-zero on the first difference from the expected reading.
+Run from the repository root.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api.ocr_bill_api import bill_amount, extract_bill  # noqa: E402
+from app.api.v1.ocr import bill_totals, read_bill_data  # noqa: E402
+
+# glyph width, word height, row pitch (px) of a 300 DPI scan
+CHAR = 18
+HEIGHT = 30
+PITCH = 48
+
+
+def image_data(rows, conf=91):
+    """
+    image_to_data dict for `rows`: each a list of (left, phrase), one
+    tesseract block per phrase, as tesseract splits far-apart columns.
+    Every line also gets its empty layout entry (conf -1).
+    """
+
+    data = {key: [] for key in (
+        "level", "page_num", "block_num", "par_num", "line_num", "word_num",
+        "left", "top", "width", "height", "conf", "text"
+    )}
+
+    def add(level, text, conf, left, top, width, height, block, line, word):
+        for key, value in (
+            ("level", level), ("page_num", 1), ("block_num", block), ("par_num", 1),
+            ("line_num", line), ("word_num", word), ("left", left), ("top", top),
+            ("width", width), ("height", height), ("conf", conf), ("text", text)
+        ):
+            data[key].append(value)
+
+    for number, row in enumerate(rows, 1):
+
+        # rows are never perfectly level
+        top = 100 + number * PITCH + number % 3
+
+        for block, (left, phrase) in enumerate(row, 1):
+
+            add(4, "", -1, left, top, 0, 0, block, number, 0)
+
+            for word_number, word in enumerate(phrase.split(), 1):
+                add(5, word, conf, left, top, len(word) * CHAR, HEIGHT, block, number, word_number)
+                left += len(word) * CHAR + CHAR // 2
+
+    return data
+
+
+HEADER_BILL = [
+    [(60, "SHREE TRADERS")],
+    [(60, "GSTIN 23ABCDE1234F1Z5")],
+    [(60, "Item"), (420, "Qty"), (560, "Rate"), (720, "Amount")],
+    [(60, "Basmati Rice"), (430, "2"), (560, "120"), (730, "240")],
+    [(60, "Toor Dal"), (430, "1 kg"), (560, "150"), (730, "150")],
+    [(60, "Sugar"), (740, "80")],
+    [(60, "Sub Total"), (730, "470")],
+    [(60, "CGST 2.5%"), (730, "11.75")],
+    [(60, "SGST 2.5%"), (730, "11.75")],
+    [(60, "Grand Total"), (720, "Rs. 493.50")],
+    [(60, "Total Items 3")],
+]
+
+PLAIN_BILL = [
+    [(60, "KIRANA STORE")],
+    [(60, "Ph 98765 43210")],
+    [(60, "Bill No 159")],
+    [(60, "sugar 425")],
+    [(60, "oil 279")],
+    [(60, "tea 53")],
+    [(60, "total 757")],
+    [(60, "Thank you")],
+]
+
+PACK_HEADER_BILL = [
+    [(60, "Item"), (420, "Qty"), (560, "Rate"), (720, "Amount")],
+    [(60, "Maggi 70g"), (430, "4"), (560, "14"), (730, "56")],
+    [(60, "Amul Milk 500ml"), (430, "2"), (560, "30"), (730, "60")],
+    [(60, "Total"), (730, "116")],
+]
+
+PACK_PLAIN_BILL = [
+    [(60, "Maggi 70g 14")],
+    [(60, "Tata Salt 1kg 28")],
+    [(60, "Total 42")],
+]
+
+
+def item(name, qty, price, amount):
+    return {"name": name, "qty": qty, "price": price, "amount": amount}
+
+
+# (bill, read-bill items, read-bill total, bill-ledger amount)
+CASES = {
+    "header": (
+        HEADER_BILL,
+        [
+            item("basmati rice", 2, 120, 240),
+            item("toor dal", 1, 150, 150),
+            item("sugar", 1, 80, 80),
+        ],
+        493.5,
+        493.5
+    ),
+    "plain": (
+        PLAIN_BILL,
+        [item("sugar", 1, 425, 425), item("oil", 1, 279, 279), item("tea", 1, 53, 53)],
+        757,
+        757
+    ),
+    "pack header": (
+        PACK_HEADER_BILL,
+        [item("maggi 70g", 4, 14, 56), item("amul milk 500ml", 2, 30, 60)],
+        116,
+        116
+    ),
+    "pack plain": (
+        PACK_PLAIN_BILL,
+        [item("maggi 70g", 1, 14, 14), item("tata salt 1kg", 1, 28, 28)],
+        42,
+        42
+    ),
+}
+
+
+def main():
+
+    failed = 0
+
+    for label, (rows, expected_items, expected_total, expected_amount) in CASES.items():
+
+        data = image_data(rows)
+
+        items, total = bill_totals(read_bill_data(data))
+        found = [{key: entry[key] for key in ("name", "qty", "price", "amount")} for entry in items]
+
+        amount, _ = bill_amount(extract_bill(data))
+
+        problems = []
+
+        if found != expected_items:
+            problems.append(f"items {found}, expected {expected_items}")
+
+        if total != expected_total:
+            problems.append(f"total {total}, expected {expected_total}")
+
+        if amount != expected_amount:
+            problems.append(f"bill-ledger amount {amount}, expected {expected_amount}")
+
+        print(f"{'ok  ' if not problems else 'FAIL'} {label}")
+
+        for problem in problems:
+            print("     ", problem)
+
+        failed += bool(problems)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Sample bill photos with known contents, for the OCR benchmarks.
+
+    python benchmarks/ocr_corpus.py --out /tmp/ocr_corpus --count 24
+
+Writes <out>/bill-NN.jpg|png and <out>/truth.json. The corpus is
+generated (seeded, so every run gives the same images) rather than
+stored: thermal receipts photographed on a dark table at 12 MP, tilted
+up to 7 degrees, with a shadow across the paper, some saved sideways
+with an EXIF orientation tag, plus A4 bills, some photographed the
+same way and some flat scans. Half the bills are "name amount" lines,
+half an Item / Qty / Rate / Amt table. truth.json holds each bill's
+items (name, qty, price, amount), total and paper ("receipt" or "a4").
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+
+ITEMS = ["milk", "rice", "sugar", "oil", "salt", "tea", "coffee", "bread"]
+
+PHOTO_SIZE = (3024, 4032)
+
+# left edge of each table column, as a share of the paper width
+COLUMNS = (0.08, 0.5, 0.64, 0.8)
+
+
+def bill_lines(rng):
+    """
+    Lines of one bill; a tuple is a table row, one entry per column.
+    """
+
+    names = rng.sample(ITEMS, rng.randint(3, 7))
+    table = rng.random() < 0.5
+
+    items = []
+
+    for name in names:
+        qty = rng.randint(1, 4) if table else 1
+        price = rng.randint(5, 120) if table else rng.randint(5, 480)
+        items.append({"name": name, "qty": qty, "price": price, "amount": qty * price})
+
+    total = sum(item["amount"] for item in items)
+
+    lines = [
+        "KIRANA STORE", "Station Road", "Ph 98765 43210", "",
+        "Bill No %d" % rng.randint(100, 999), "Date %02d/10/2026" % rng.randint(1, 28), ""
+    ]
+
+    if table:
+        lines.append(("Item", "Qty", "Rate", "Amt"))
+        lines += [(item["name"], str(item["qty"]), str(item["price"]), str(item["amount"])) for item in items]
+    else:
+        lines += ["%s %d" % (item["name"], item["amount"]) for item in items]
+
+    lines += ["", "total %d" % total, "", "Thank you", "Visit again"]
+
+    return lines, items, total
+
+
+def paper(lines, width, font, line_height):
+
+    height = line_height * (len(lines) + 4)
+    page = Image.new("L", (width, height), 238)
+    draw = ImageDraw.Draw(page)
+
+    for i, line in enumerate(lines):
+
+        y = line_height * (i + 2)
+
+        if isinstance(line, tuple):
+            for column, text in zip(COLUMNS, line):
+                draw.text((int(width * column), y), text, fill=25, font=font)
+        else:
+            draw.text((int(width * COLUMNS[0]), y), line, fill=25, font=font)
+
+    return page
+
+
+def receipt_photo(rng, lines):
+
+    font = ImageFont.load_default(size=44)
+    page = paper(lines, 1100, font, 64)
+
+    return photograph(rng, page, max_angle=7)
+
+
+def a4_photo(rng, lines):
+    """
+    An A4 bill shot from above: the sheet fills most of the frame.
+    """
+
+    font = ImageFont.load_default(size=42)
+    page = paper(lines, 2480, font, 70)
+    page = page.resize((2700, page.height * 2700 // 2480), Image.BICUBIC)
+
+    return photograph(rng, page, max_angle=3)
+
+
+def photograph(rng, page, max_angle):
+
+    photo = Image.new("L", PHOTO_SIZE, rng.randint(40, 90))
+    angle = rng.uniform(-max_angle, max_angle)
+    rotated = page.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=0)
+    mask = Image.new("L", page.size, 255).rotate(angle, expand=True, fillcolor=0)
+
+    x = (PHOTO_SIZE[0] - rotated.width) // 2 + rng.randint(-150, 150)
+    y = (PHOTO_SIZE[1] - rotated.height) // 2 + rng.randint(-200, 200)
+    photo.paste(rotated, (x, y), mask)
+
+    # a shadow falling across one side
+    shadow = Image.linear_gradient("L").resize(PHOTO_SIZE).point(lambda v: 255 - v // 3)
+    if rng.random() < 0.5:
+        shadow = shadow.rotate(90, expand=False)
+    photo = Image.composite(photo, Image.new("L", PHOTO_SIZE, 0), shadow)
+
+    photo = photo.filter(ImageFilter.GaussianBlur(1.2)).convert("RGB")
+
+    exif = Image.Exif()
+
+    if rng.random() < 0.3:
+        # stored sideways, as phones do; orientation 6 = rotate 90 CW to view
+        photo = photo.transpose(Image.Transpose.ROTATE_90)
+        exif[0x0112] = 6
+
+    buffer = io.BytesIO()
+    photo.save(buffer, "JPEG", quality=88, exif=exif.tobytes())
+
+    return buffer.getvalue(), "jpg"
+
+
+def a4_scan(rng, lines):
+
+    font = ImageFont.load_default(size=42)
+    page = paper(lines, 2480, font, 70).point(lambda v: 255 if v > 200 else v)
+
+    buffer = io.BytesIO()
+    page.save(buffer, "PNG")
+
+    return buffer.getvalue(), "png"
+
+
+def build(out, count, seed=7):
+
+    os.makedirs(out, exist_ok=True)
+
+    rng = random.Random(seed)
+    truth = {}
+
+    for n in range(count):
+
+        lines, items, total = bill_lines(rng)
+        if n % 6 == 5:
+            (data, ext), kind = a4_scan(rng, lines), "a4"
+        elif n % 6 == 2:
+            (data, ext), kind = a4_photo(rng, lines), "a4"
+        else:
+            (data, ext), kind = receipt_photo(rng, lines), "receipt"
+
+        name = f"bill-{n:02d}.{ext}"
+
+        with open(os.path.join(out, name), "wb") as f:
+            f.write(data)
+
+        truth[name] = {"items": items, "total": total, "paper": kind}
+
+    with open(os.path.join(out, "truth.json"), "w") as f:
+        json.dump(truth, f, indent=1)
+
+    return truth
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--count", type=int, default=24)
+    args = parser.parse_args()
+
+    truth = build(args.out, args.count)
+
+    print(f"{len(truth)} bills in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
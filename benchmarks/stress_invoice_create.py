@@ -0,0 +1,176 @@
+"""
+Parallel invoice creation through the API.
+
+    python benchmarks/stress_invoice_create.py --processes 2 --threads 8 --per-thread 20
+
+Every process (one uvicorn worker each, in production) mounts the app
+in a TestClient and creates invoices from many threads at once through
+POST /invoice/create, with an occasional POST /invoice/batch, for a few
+tenants. Tenant shards and the rendered PDFs go to a temporary
+directory; only the main database file is initialised at startup, as
+the app always does. The script fails unless every invoice_id
+returned, and every invoice_id stored, is unique per tenant, and every
+create stored exactly one row.
+Run from the repository root.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TENANTS = ["shop_a", "shop_b", "shop_c"]
+
+ITEMS = [{"name": "rice", "qty": 2, "price": 60}, {"name": "sugar", "qty": 1, "price": 45}]
+
+
+def worker(shard_dir, threads, per_thread, batch, queue):
+
+    # before the app is imported: the shard router reads these once
+    os.environ["DB_SHARD_MODE"] = "tenant"
+    os.environ["DB_SHARD_DIR"] = shard_dir
+    os.chdir(ROOT)
+
+    from fastapi.testclient import TestClient
+    from main import app
+    from app.services import invoice_jobs
+    from app.services.invoice_service import invoice_cache
+
+    # render paths are picked here and handed to the render processes
+    invoice_cache.directory = os.path.join(shard_dir, "invoices")
+
+    ids = []
+    errors = []
+    lock = threading.Lock()
+
+    with TestClient(app) as client:
+
+        def run(n):
+
+            mine = []
+
+            for i in range(per_thread):
+
+                username = TENANTS[(n + i) % len(TENANTS)]
+
+                if batch and i % 10 == 0:
+                    response = client.post("/invoice/batch", json={
+                        "username": username,
+                        "invoices": [{"customer_name": f"c{n}-{i}-{k}", "items": ITEMS} for k in range(batch)]
+                    })
+                    body = response.json()
+                    found = [entry["invoice_id"] for entry in body.get("invoices", [])]
+                else:
+                    response = client.post("/invoice/create", json={
+                        "username": username, "customer_name": f"c{n}-{i}", "items": ITEMS
+                    })
+                    body = response.json()
+                    found = [body["invoice_id"]] if "invoice_id" in body else []
+
+                if not found:
+                    with lock:
+                        errors.append(body)
+
+                mine.extend((username, invoice_id) for invoice_id in found)
+
+            with lock:
+                ids.extend(mine)
+
+        pool = [threading.Thread(target=run, args=(n,)) for n in range(threads)]
+
+        for t in pool:
+            t.start()
+
+        for t in pool:
+            t.join()
+
+    # let queued renders finish before the process exits
+    invoice_jobs.shutdown()
+
+    queue.put((ids, errors))
+
+
+def stored_ids(shard_dir):
+
+    rows = []
+
+    for name in os.listdir(shard_dir):
+
+        if not name.endswith(".db"):
+            continue
+
+        conn = sqlite3.connect(os.path.join(shard_dir, name))
+
+        try:
+            rows.extend(conn.execute("SELECT username, invoice_id FROM invoices").fetchall())
+        finally:
+            conn.close()
+
+    return rows
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--per-thread", type=int, default=20)
+    parser.add_argument("--batch", type=int, default=5, help="invoices per occasional /invoice/batch, 0 to disable")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as shard_dir:
+
+        ctx = multiprocessing.get_context("spawn")
+        queue = ctx.Queue()
+
+        started = time.perf_counter()
+
+        procs = [
+            ctx.Process(target=worker, args=(shard_dir, args.threads, args.per_thread, args.batch, queue))
+            for _ in range(args.processes)
+        ]
+
+        for p in procs:
+            p.start()
+
+        results = [queue.get() for _ in procs]
+
+        for p in procs:
+            p.join()
+
+        elapsed = time.perf_counter() - started
+
+        stored = stored_ids(shard_dir)
+
+    ids = [item for result, _ in results for item in result]
+    errors = [error for _, result in results for error in result]
+
+    print(f"created {len(ids)} invoices in {elapsed:.2f}s ({len(ids) / elapsed:.0f}/s), {len(errors)} failed requests")
+
+    for error in errors[:3]:
+        print("  failed:", error)
+
+    print(f"unique returned: {len(set(ids))}/{len(ids)}")
+    print(f"unique stored:   {len(set(stored))}/{len(stored)}")
+
+    ok = (
+        not errors
+        and len(set(ids)) == len(ids)
+        and len(set(stored)) == len(stored)
+        and set(stored) == set(ids)
+    )
+
+    print("ok" if ok else "FAILED")
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Stress test for the per-tenant invoice number allocator.
+
+    python benchmarks/stress_invoice_ids.py --processes 4 --threads 8 --per-thread 250
+
+Every process builds its own InvoiceNumberAllocator (as each uvicorn
+worker would) against one temporary sqlite file and allocates ids from
+many threads at once, for a few tenants. The script fails unless every
+id is unique per tenant and the only unused numbers are the tails of
+each process's last block.
+Run from the repository root.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TENANTS = ["shop_a", "shop_b", "shop_c"]
+
+
+def worker(db_path, threads, per_thread, block, batch, queue):
+
+    from app.core.writer import get_writer
+    from app.services.invoice_numbers import InvoiceNumberAllocator
+
+    allocator = InvoiceNumberAllocator(writer_for=lambda username: get_writer(db_path), block_size=block)
+    ids = []
+    lock = threading.Lock()
+
+    def run(n):
+        mine = []
+        for i in range(per_thread):
+            username = TENANTS[(n + i) % len(TENANTS)]
+            if batch and i % 50 == 0:
+                mine.extend((username, x) for x in allocator.allocate(username, batch))
+            else:
+                mine.append((username, allocator.next_id(username)))
+        with lock:
+            ids.extend(mine)
+
+    pool = [threading.Thread(target=run, args=(n,)) for n in range(threads)]
+
+    for t in pool:
+        t.start()
+
+    for t in pool:
+        t.join()
+
+    queue.put((ids, allocator.stats()))
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--per-thread", type=int, default=250)
+    parser.add_argument("--block", type=int, default=20)
+    parser.add_argument("--batch", type=int, default=25, help="size of the occasional batch allocation, 0 to disable")
+    args = parser.parse_args()
+
+    from app.core.migrations import run_migrations
+
+    with tempfile.TemporaryDirectory() as directory:
+
+        db_path = os.path.join(directory, "ids.db")
+
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE invoices (id INTEGER PRIMARY KEY, username TEXT, invoice_id TEXT, created_at TEXT)")
+        run_migrations(conn)
+        conn.close()
+
+        ctx = multiprocessing.get_context("spawn")
+        queue = ctx.Queue()
+
+        started = time.perf_counter()
+
+        procs = [
+            ctx.Process(target=worker, args=(db_path, args.threads, args.per_thread, args.block, args.batch, queue))
+            for _ in range(args.processes)
+        ]
+
+        for p in procs:
+            p.start()
+
+        results = [queue.get() for _ in procs]
+
+        for p in procs:
+            p.join()
+
+        elapsed = time.perf_counter() - started
+
+    ids = [item for result, _ in results for item in result]
+    reservations = sum(stats["reservations"] for _, stats in results)
+
+    # numbering is per tenant, so (tenant, id) is what must be unique
+    unique = len(set(ids))
+
+    print(f"allocated {len(ids)} ids in {elapsed:.2f}s ({len(ids) / elapsed:.0f}/s), {reservations} db reservations")
+    print(f"unique: {unique}/{len(ids)}")
+
+    ok = unique == len(ids)
+
+    # blocks are handed out back to back, so the only holes allowed are
+    # the unused tail of each process's last block per tenant
+    max_gap = args.processes * args.block
+
+    for tenant in TENANTS:
+        numbers = sorted(int(i.rsplit("-", 1)[1]) for u, i in ids if u == tenant)
+        gaps = (numbers[-1] - len(numbers)) if numbers else 0
+        print(f"{tenant}: {len(numbers)} ids, max {numbers[-1] if numbers else 0}, unused {gaps} (allowed {max_gap})")
+        ok = ok and gaps <= max_gap
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
-import sqlite3
 import os
 
+from app.core.db_pool import get_pool
+from app.core.async_db import AsyncDatabase
+from app.core.migrations import run_migrations
+from app.core.shard_router import ShardRouter
+from app.core.writer import get_writer
+
 # =========================
 # DATABASE PATH
 # =========================
@@ -13,19 +18,34 @@ DB_PATH = os.path.join(BASE_DIR, "hisabkitab_pro.db")
 # DB CONNECTION
 # =========================
 
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
+def get_db_connection(reentrant=True, username=None):
+    # pooled, pragma-tuned connection; close() / end of `with` returns it.
+    # With DB_SHARD_MODE set, `username` selects that tenant's shard file.
+    return shard_router.connection(username, reentrant)
+
+
+def get_db_writer(username=None):
+    # single-writer queue (group commit) for the tenant's database file
+    return get_writer(shard_router.shard_path(username))
+
+
+def tenant_required(username):
+    # with DB_SHARD_MODE set, a call without a username would use the main
+    # database, not the shard that holds the tenant's customers
+    return shard_router.enabled and not username
+
+
+# executor-backed access for async endpoints
+async_db = AsyncDatabase(get_db_connection)
 
 
 # =========================
 # DATABASE INIT
 # =========================
 
-def init_database():
+def init_database(path=DB_PATH):
 
-    conn = get_db_connection()
+    conn = get_pool(path).connection()
     cursor = conn.cursor()
 
     # =========================
@@ -107,11 +127,19 @@ def init_database():
     """)
 
     conn.commit()
+
+    # =========================
+    # SCHEMA MIGRATIONS
+    # =========================
+
+    run_migrations(conn)
+
     conn.close()
 
 
 # =========================
-# AUTO INIT DATABASE
+# SHARD ROUTER
 # =========================
 
-init_database()
+shard_router = ShardRouter(DB_PATH, init_schema=init_database)
+
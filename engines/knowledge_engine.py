@@ -1,4 +1,6 @@
-import requests
+from app.core.features import lazy_import
+
+requests = lazy_import("requests")
 
 
 def fetch_wikipedia(query):
@@ -29,38 +29,33 @@ app.mount("/invoices", StaticFiles(directory=INVOICE_DIR), name="invoices")
 from database import init_database
 
 # =========================
-# ROUTERS IMPORT
-# =========================
-
-from app.api.customer_api import router as customer_router
-from app.api.ledger_api import router as ledger_router
-from app.api.invoice_api import router as invoice_router
-from app.api.billing_api import router as billing_router
-from app.api.voice_api import router as voice_router
-from app.api.ocr_bill_api import router as ocr_bill_router
-from app.api.business_ai_api import router as business_ai_router
-from app.api.risk_ai_api import router as risk_ai_router
-from app.api.ai_router_api import router as ai_router
-from app.api.ai_action_api import router as ai_action_router
-from app.api.ai_voice_control_api import router as ai_voice_router
-from app.api.ai_learning_api import router as ai_learning_router
-
-# =========================
-# INCLUDE ROUTERS
-# =========================
-
-app.include_router(customer_router)
-app.include_router(ledger_router)
-app.include_router(invoice_router)
-app.include_router(billing_router)
-app.include_router(voice_router)
-app.include_router(ocr_bill_router)
-app.include_router(business_ai_router)
-app.include_router(risk_ai_router)
-app.include_router(ai_router)
-app.include_router(ai_action_router)
-app.include_router(ai_voice_router)
-app.include_router(ai_learning_router)
+# ROUTERS
+# =========================
+#
+# (feature group, module, include options); modules are imported only
+# for groups not listed in HISAB_DISABLED_FEATURES
+
+from app.core.features import include_routers
+
+ROUTERS = [
+    ("core", "app.api.customer_api", {}),
+    ("core", "app.api.ledger_api", {}),
+    ("pdf", "app.api.invoice_api", {}),
+    ("core", "app.api.billing_api", {}),
+    ("voice", "app.api.voice_api", {}),
+    ("ocr", "app.api.ocr_bill_api", {}),
+    ("ocr", "app.api.ocr_api", {}),
+    ("ai", "app.api.business_ai_api", {}),
+    ("ai", "app.api.risk_ai_api", {}),
+    ("ai", "app.api.ai_router_api", {}),
+    ("ai", "app.api.ai_action_api", {}),
+    ("voice", "app.api.ai_voice_control_api", {}),
+    ("ai", "app.api.ai_learning_api", {}),
+    ("core", "app.api.export_api", {}),
+    ("core", "app.routes.business_settings", {}),
+]
+
+include_routers(app, ROUTERS)
 
 # =========================
 # CORS